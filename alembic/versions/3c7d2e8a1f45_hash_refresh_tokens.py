@@ -0,0 +1,89 @@
+"""Store refresh tokens as SHA-256 digests
+
+Revision ID: 3c7d2e8a1f45
+Revises: bf3d06fb83af
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+import hashlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c7d2e8a1f45'
+down_revision: Union[str, Sequence[str], None] = 'bf3d06fb83af'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 5000
+
+refresh_tokens = sa.table(
+    'refresh_tokens',
+    sa.column('id', sa.Integer()),
+    sa.column('token', sa.String()),
+    sa.column('token_hash', sa.String()),
+)
+
+
+def _backfill_token_hashes() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute(
+            "UPDATE refresh_tokens "
+            "SET token_hash = encode(sha256(convert_to(btrim(token), 'UTF8')), 'hex')"
+        )
+        return
+
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(refresh_tokens.c.id, refresh_tokens.c.token)
+            .where(refresh_tokens.c.id > last_id)
+            .order_by(refresh_tokens.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+
+        bind.execute(
+            refresh_tokens.update()
+            .where(refresh_tokens.c.id == sa.bindparam('row_id'))
+            .values(token_hash=sa.bindparam('digest')),
+            [
+                {
+                    'row_id': row.id,
+                    'digest': hashlib.sha256(row.token.strip().encode('utf-8')).hexdigest(),
+                }
+                for row in rows
+            ],
+        )
+        last_id = rows[-1].id
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('refresh_tokens', sa.Column('token_hash', sa.String(length=64), nullable=True))
+    _backfill_token_hashes()
+
+    op.drop_index(op.f('ix_refresh_tokens_token'), table_name='refresh_tokens')
+    with op.batch_alter_table('refresh_tokens') as batch_op:
+        batch_op.alter_column('token_hash', existing_type=sa.String(length=64), nullable=False)
+        batch_op.drop_column('token')
+    op.create_index(op.f('ix_refresh_tokens_token_hash'), 'refresh_tokens', ['token_hash'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # The original JWTs cannot be recovered from their digests; the digest is
+    # copied into `token` so existing rows stay unique but can no longer match.
+    op.add_column('refresh_tokens', sa.Column('token', sa.String(length=255), nullable=True))
+    op.execute("UPDATE refresh_tokens SET token = token_hash")
+
+    op.drop_index(op.f('ix_refresh_tokens_token_hash'), table_name='refresh_tokens')
+    with op.batch_alter_table('refresh_tokens') as batch_op:
+        batch_op.alter_column('token', existing_type=sa.String(length=255), nullable=False)
+        batch_op.drop_column('token_hash')
+    op.create_index(op.f('ix_refresh_tokens_token'), 'refresh_tokens', ['token'], unique=True)
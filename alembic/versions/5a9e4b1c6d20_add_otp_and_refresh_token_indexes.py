@@ -0,0 +1,50 @@
+"""Add composite OTP and refresh-token indexes
+
+Revision ID: 5a9e4b1c6d20
+Revises: 3c7d2e8a1f45
+Create Date: 2026-10-18 10:03:27.540931
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a9e4b1c6d20'
+down_revision: Union[str, Sequence[str], None] = '3c7d2e8a1f45'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_otps_identifier_purpose_verified_created',
+        'otps',
+        ['identifier', 'purpose', 'is_verified', 'created_at'],
+        unique=False,
+    )
+    op.create_index('ix_otps_expires_at', 'otps', ['expires_at'], unique=False)
+    # The composite index leads with identifier, so the single-column one is redundant
+    op.drop_index(op.f('ix_otps_identifier'), table_name='otps')
+
+    op.create_index(
+        'ix_refresh_tokens_user_id_active',
+        'refresh_tokens',
+        ['user_id'],
+        unique=False,
+        postgresql_where=sa.text('revoked IS FALSE'),
+        sqlite_where=sa.text('revoked IS 0'),
+    )
+    op.create_index('ix_refresh_tokens_expires_at', 'refresh_tokens', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_refresh_tokens_expires_at', table_name='refresh_tokens')
+    op.drop_index('ix_refresh_tokens_user_id_active', table_name='refresh_tokens')
+    op.create_index(op.f('ix_otps_identifier'), 'otps', ['identifier'], unique=False)
+    op.drop_index('ix_otps_expires_at', table_name='otps')
+    op.drop_index('ix_otps_identifier_purpose_verified_created', table_name='otps')
@@ -0,0 +1,55 @@
+"""Add trigram indexes for user search
+
+Revision ID: d7a3f9c2b815
+Revises: b4c8e1f7d2a6
+Create Date: 2026-10-18 17:38:05.402716
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a3f9c2b815'
+down_revision: Union[str, Sequence[str], None] = 'b4c8e1f7d2a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Other backends search through the in-process prefix index instead
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # CONCURRENTLY so signups and logins keep writing to users while the indexes build
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_users_username_trgm',
+            'users',
+            [sa.text('lower(username) gin_trgm_ops')],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_users_email_trgm',
+            'users',
+            [sa.text('lower(email) gin_trgm_ops')],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_users_email_trgm', table_name='users', postgresql_concurrently=True)
+        op.drop_index('ix_users_username_trgm', table_name='users', postgresql_concurrently=True)
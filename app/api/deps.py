@@ -1,18 +1,28 @@
+import hmac
+from typing import Optional
+
 from fastapi import Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from fastapi.security import APIKeyHeader, HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
+from app.core.cache import principal_cache
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.core.replicas import get_read_db, read_as_user
 from app.core.security import decode_token
 from app.models.user import User
+from app.schemas.user import UserResponse
+from app.services.permission_service import permission_resolver
+from app.services.revocation_service import revocation_store
 
 security = HTTPBearer()
+introspection_api_key = APIKeyHeader(name="X-API-Key", auto_error=False)
 
 
-def get_current_user(
+async def get_token_payload(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db),
-) -> User:
+    db: AsyncSession = Depends(get_async_db),
+) -> dict:
     token = credentials.credentials
     payload = decode_token(token)
 
@@ -30,6 +40,20 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    if await revocation_store.is_revoked(payload, db):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    return payload
+
+
+async def get_current_user(
+    payload: dict = Depends(get_token_payload),
+    db: AsyncSession = Depends(get_read_db),
+) -> UserResponse:
     user_id = int(payload["sub"])
     if user_id is None:
         raise HTTPException(
@@ -38,13 +62,19 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    user = db.query(User).filter(User.id == user_id).first()
+    user = principal_cache.get(user_id)
     if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        read_as_user(db, user_id)
+        db_user = await db.get(User, user_id)
+        if db_user is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+
+        user = UserResponse.model_validate(db_user)
+        principal_cache.set(user_id, user)
 
     if not user.is_active:
         raise HTTPException(
@@ -54,7 +84,35 @@ def get_current_user(
     return user
 
 
-def get_current_active_user(
-    current_user: User = Depends(get_current_user),
-) -> User:
+async def get_current_active_user(
+    current_user: UserResponse = Depends(get_current_user),
+) -> UserResponse:
     return current_user
+
+
+def require_admin_grant(page: str, action: str, detail: str):
+    """Dependency returning the current user if they hold ``page``/``action`` in
+    PERMISSION_ADMIN_APP, 403 with ``detail`` otherwise."""
+
+    async def check_admin_grant(
+        current_user: UserResponse = Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db),
+    ) -> UserResponse:
+        if not await permission_resolver.check(
+            db, current_user.id, settings.PERMISSION_ADMIN_APP, page, action
+        ):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=detail)
+        return current_user
+
+    return check_admin_grant
+
+
+async def verify_introspection_client(
+    api_key: Optional[str] = Depends(introspection_api_key),
+) -> None:
+    if api_key is None or not any(
+        hmac.compare_digest(api_key, key) for key in settings.INTROSPECTION_API_KEYS
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid introspection API key"
+        )
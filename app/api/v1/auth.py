@@ -1,12 +1,22 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app.api.deps import get_current_user
-from app.core.database import get_db
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Form, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.api.deps import get_current_user, get_token_payload, verify_introspection_client
+from app.core.config import settings
+from app.core.constants import OTP_MAX_RESENDS
+from app.core.database import get_async_db
+from app.core.query_counter import query_budget
+from app.core.rate_limit import RateLimit, rate_limit
+from app.core.replicas import get_read_db
 from app.schemas.auth import (
     ChangePasswordRequest,
     ChangePasswordResponse,
     ForgotPasswordRequest,
     ForgotPasswordResponse,
+    IntrospectionBatchRequest,
+    IntrospectionBatchResponse,
+    IntrospectionResponse,
     LoginRequest,
     LoginResponse,
     LogoutRequest,
@@ -23,14 +33,28 @@ from app.schemas.auth import (
     VerifyOTPSchema,
 )
 from app.services.auth_service import AuthService
-from app.models.user import User
+from app.services.introspection_service import IntrospectionService
+from app.schemas.user import UserResponse
 
 router = APIRouter()
 
+# Every OTP email (signup, password reset, resend) draws from the same per-address budget
+OTP_EMAIL_LIMITS = (
+    RateLimit(1, settings.RESEND_COOLDOWN_SECONDS, key="email", bucket="otp-email"),
+    RateLimit(OTP_MAX_RESENDS, settings.OTP_EXPIRE_MINUTES * 60, key="email", bucket="otp-email"),
+)
+
 
-@router.post("/signup/request", response_model=SignupRequestResponse)
+@router.post(
+    "/signup/request",
+    dependencies=[
+        Depends(rate_limit(RateLimit(10, 60), *OTP_EMAIL_LIMITS)),
+        Depends(query_budget(5)),
+    ],
+    response_model=SignupRequestResponse,
+)
 async def request_signup_otp(
-    request: SignupRequestSchema, db: Session = Depends(get_db)
+    request: SignupRequestSchema, db: AsyncSession = Depends(get_read_db)
 ):
     result = await AuthService.request_signup_otp(
         email=request.email, username=request.username, db=db
@@ -38,9 +62,13 @@ async def request_signup_otp(
     return result
 
 
-@router.post("/signup/verify", response_model=SignupCompleteResponse)
+@router.post(
+    "/signup/verify",
+    dependencies=[Depends(rate_limit(RateLimit(20, 60))), Depends(query_budget(5))],
+    response_model=SignupCompleteResponse,
+)
 async def verif_otp_and_complete_signup(
-    request: VerifyOTPSchema, db: Session = Depends(get_db)
+    request: VerifyOTPSchema, db: AsyncSession = Depends(get_async_db)
 ):
     user = await AuthService.verify_otp_and_signup(
         email=request.email,
@@ -58,63 +86,104 @@ async def verif_otp_and_complete_signup(
     }
 
 
-@router.post("/login", response_model=LoginResponse)
-def login(request: LoginRequest, db: Session = Depends(get_db)):
-    result = AuthService.login(email=request.email, password=request.password, db=db)
+@router.post(
+    "/login",
+    dependencies=[
+        Depends(rate_limit(RateLimit(20, 60), RateLimit(5, 60, key="email"))),
+        # App-scoped logins also load the app's catalog and the user's grants
+        Depends(query_budget(7)),
+    ],
+    response_model=LoginResponse,
+)
+async def login(request: LoginRequest, db: AsyncSession = Depends(get_async_db)):
+    result = await AuthService.login(
+        email=request.email, password=request.password, db=db, app=request.app
+    )
 
     return result
 
 
-@router.post("/logout", response_model=LogoutResponse)
-def logout(
+@router.post("/logout", dependencies=[Depends(query_budget(4))], response_model=LogoutResponse)
+async def logout(
     request: LogoutRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user),
+    access_payload: dict = Depends(get_token_payload),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    result = AuthService.logout(
-        refresh_token=request.refresh_token, user_id=str(current_user.id), db=db
+    result = await AuthService.logout(
+        refresh_token=request.refresh_token,
+        user_id=str(current_user.id),
+        db=db,
+        access_payload=access_payload,
     )
     return result
 
 
-@router.post("/refresh", response_model=RefreshTokenResponse)
-def refresh_token(request: RefreshTokenRequest, db: Session = Depends(get_db)):
-    result = AuthService.refresh_access_token(
+@router.post(
+    "/refresh",
+    dependencies=[Depends(rate_limit(RateLimit(60, 60))), Depends(query_budget(9))],
+    response_model=RefreshTokenResponse,
+)
+async def refresh_token(request: RefreshTokenRequest, db: AsyncSession = Depends(get_async_db)):
+    result = await AuthService.refresh_access_token(
         refresh_token=request.refresh_token, db=db
     )
 
     return result
 
 
-@router.post("/forgot-password", response_model=ForgotPasswordResponse)
+@router.post(
+    "/forgot-password",
+    dependencies=[
+        Depends(rate_limit(RateLimit(10, 60), *OTP_EMAIL_LIMITS)),
+        Depends(query_budget(4)),
+    ],
+    response_model=ForgotPasswordResponse,
+)
 async def forgot_password(
-    request: ForgotPasswordRequest, db: Session = Depends(get_db)
+    request: ForgotPasswordRequest, db: AsyncSession = Depends(get_async_db)
 ):
     result = await AuthService.request_password_reset(email=request.email, db=db)
     return result
 
 
-@router.post("/reset-password", response_model=ResetPasswordResponse)
-async def reset_password(request: ResetPasswordRequest, db: Session = Depends(get_db)):
+@router.post(
+    "/reset-password",
+    dependencies=[Depends(rate_limit(RateLimit(20, 60))), Depends(query_budget(7))],
+    response_model=ResetPasswordResponse,
+)
+async def reset_password(request: ResetPasswordRequest, db: AsyncSession = Depends(get_async_db)):
     result = await AuthService.reset_password_with_otp(
         email=request.email, otp=request.otp, new_password=request.new_password, db=db
     )
     return result
 
 
-@router.post("/resend_otp", response_model=ResendOTPResponse)
-async def resend_otp(request: ResendOTPRequest, db: Session = Depends(get_db)):
+@router.post(
+    "/resend_otp",
+    dependencies=[
+        Depends(rate_limit(RateLimit(10, 60), *OTP_EMAIL_LIMITS)),
+        # The SQL OTP store checks the resend cooldown and window before issuing
+        Depends(query_budget(6)),
+    ],
+    response_model=ResendOTPResponse,
+)
+async def resend_otp(request: ResendOTPRequest, db: AsyncSession = Depends(get_async_db)):
     result = await AuthService.resend_otp(
         email=request.email, purpose=request.purpose, db=db
     )
     return result
 
 
-@router.post("/change-password", response_model=ChangePasswordResponse)
+@router.post(
+    "/change-password",
+    dependencies=[Depends(query_budget(6))],
+    response_model=ChangePasswordResponse,
+)
 async def change_password(
     request: ChangePasswordRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
     result = await AuthService.change_password(
         user_id=str(current_user.id),
@@ -123,3 +192,38 @@ async def change_password(
         db=db,
     )
     return result
+
+
+@router.post(
+    "/introspect",
+    dependencies=[Depends(verify_introspection_client), Depends(query_budget(1))],
+    response_model=IntrospectionResponse,
+    response_model_exclude_none=True,
+)
+async def introspect(
+    token: str = Form(...),
+    token_type_hint: Optional[str] = Form(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    # token_type_hint is accepted per RFC 7662; the type is read from the token itself
+    [result] = await IntrospectionService.introspect_many([token], db)
+    return result
+
+
+@router.post(
+    "/introspect/batch",
+    dependencies=[Depends(verify_introspection_client)],
+    response_model=IntrospectionBatchResponse,
+    response_model_exclude_none=True,
+)
+async def introspect_batch(
+    request: IntrospectionBatchRequest, db: AsyncSession = Depends(get_async_db)
+):
+    if len(request.tokens) > settings.INTROSPECTION_MAX_BATCH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.INTROSPECTION_MAX_BATCH} tokens per request",
+        )
+
+    results = await IntrospectionService.introspect_many(request.tokens, db)
+    return {"results": results}
@@ -0,0 +1,110 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_current_user
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.core.query_counter import query_budget
+from app.schemas.permission import (
+    PermissionBatchCheckRequest,
+    PermissionBatchCheckResponse,
+    PermissionCatalogResponse,
+    PermissionCheckResponse,
+)
+from app.schemas.user import UserResponse
+from app.services.permission_service import MASK_ENCODING, encode_mask, permission_resolver
+
+router = APIRouter()
+
+
+@router.get(
+    "/check", dependencies=[Depends(query_budget(6))], response_model=PermissionCheckResponse
+)
+async def check_permission(
+    app: str = Query(..., description="App code"),
+    page: str = Query(..., description="Page route"),
+    action: str = Query(..., description="Action name"),
+    current_user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    permissions = await permission_resolver.permissions(db, current_user.id, app)
+    if permissions is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="App not found")
+
+    return {
+        "app": app,
+        "page": page,
+        "action": action,
+        "allowed": permissions.allows(page, action),
+    }
+
+
+@router.post("/check/batch", response_model=PermissionBatchCheckResponse)
+async def check_permissions_batch(
+    request: PermissionBatchCheckRequest,
+    current_user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    user_id = current_user.id if request.user_id is None else request.user_id
+    if user_id != current_user.id and not await permission_resolver.check(
+        db,
+        current_user.id,
+        settings.PERMISSION_ADMIN_APP,
+        settings.PERMISSION_ADMIN_PAGE,
+        settings.PERMISSION_ADMIN_ACTION,
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not allowed to check other users' permissions",
+        )
+
+    results = await permission_resolver.check_many(
+        db, user_id, ((check.app, check.page, check.action) for check in request.checks)
+    )
+    return {
+        "user_id": user_id,
+        "count": len(request.checks),
+        "encoding": MASK_ENCODING,
+        "results": encode_mask(results),
+    }
+
+
+@router.get(
+    "/apps/{app_code}/catalog",
+    dependencies=[Depends(query_budget(3))],
+    response_model=PermissionCatalogResponse,
+)
+async def permission_catalog(
+    app_code: str,
+    response: Response,
+    version: Optional[str] = Query(None, description="Catalog version from a token's pv claim"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Bit layout used by the ``perms`` claim of app-scoped access tokens.
+
+    Resource servers cache it by version and authorize with a bit test. Only
+    the current layout is served: asked for any other ``version`` this returns
+    404, and a token whose ``pv`` can't be resolved (here or from the resource
+    server's own cache) must be refreshed, which re-encodes it with the current
+    layout.
+    """
+    catalog = await permission_resolver.catalog(db, app_code)
+    if catalog is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Catalog not found")
+    if version is not None and version != catalog.version:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Catalog version is no longer current; refresh the token",
+        )
+
+    response.headers["Cache-Control"] = "public, max-age=300"
+    response.headers["ETag"] = f'"{catalog.version}"'
+    return {
+        "app": catalog.app_code,
+        "version": catalog.version,
+        "encoding": MASK_ENCODING,
+        "pages": list(catalog.pages),
+        "actions": list(catalog.actions),
+    }
@@ -1,16 +1,106 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import Optional
 
-from app.api.deps import get_current_user
-from app.schemas.user import UserResponse, UserUpdate
-from app.models.user import User
-from app.core.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_current_user, require_admin_grant
+from app.schemas.user import (
+    UserImportResponse,
+    UserListPage,
+    UserResponse,
+    UserSearchResponse,
+    UserUpdate,
+)
+from app.models.user import RefreshToken, User
+from app.core.cache import principal_cache
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.core.query_counter import query_budget
+from app.core.replicas import get_read_db
+from app.services.user_directory_service import UserDirectoryService
+from app.services.user_import_service import UserImportService
+from app.services.revocation_service import revocation_store
+from app.services.user_search_service import UserSearchService
 
 router = APIRouter()
 
+IMPORT_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+require_user_list_grant = require_admin_grant(
+    settings.USER_LIST_ADMIN_PAGE, settings.USER_LIST_ADMIN_ACTION, "Not allowed to list users"
+)
+require_user_import_grant = require_admin_grant(
+    settings.USER_IMPORT_ADMIN_PAGE,
+    settings.USER_IMPORT_ADMIN_ACTION,
+    "Not allowed to import users",
+)
+
+
+@router.get("", dependencies=[Depends(query_budget(7))], response_model=UserListPage)
+async def list_users(
+    limit: int = Query(50, ge=1, le=settings.USER_LIST_MAX_LIMIT),
+    after: Optional[int] = Query(None, ge=0, description="next_cursor of the previous page"),
+    is_active: Optional[bool] = Query(None),
+    email_verified: Optional[bool] = Query(None),
+    current_user: UserResponse = Depends(require_user_list_grant),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Users in id order, one page at a time (keyset pagination on id)."""
+    return await UserDirectoryService.list_users(
+        db, limit, after=after, is_active=is_active, email_verified=email_verified
+    )
+
+
+@router.get("/search", dependencies=[Depends(query_budget(8))], response_model=UserSearchResponse)
+async def search_users(
+    q: str = Query(
+        ...,
+        min_length=settings.USER_SEARCH_MIN_LENGTH,
+        description=(
+            "Part of a username or email. On Postgres any substring matches; with the"
+            " prefix backend q must start the username, the email or a word in them"
+            " (after . _ - + or @, e.g. the email domain)"
+        ),
+    ),
+    limit: int = Query(20, ge=1, le=settings.USER_SEARCH_MAX_LIMIT),
+    current_user: UserResponse = Depends(require_user_list_grant),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Users whose username or email matches ``q``, best matches first.
+
+    See USER_SEARCH_BACKEND: the trigram backend (Postgres) matches substrings,
+    the prefix backend matches from the start of the value or of a word in it.
+    """
+    return await UserSearchService.search(db, q, limit)
+
+
+@router.get("/export")
+async def export_users(
+    is_active: Optional[bool] = Query(None),
+    email_verified: Optional[bool] = Query(None),
+    current_user: UserResponse = Depends(require_user_list_grant),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Every matching user as NDJSON, streamed from a server-side cursor."""
+    # The export reads through its own session; don't hold this one while streaming
+    await db.close()
+    return StreamingResponse(
+        UserDirectoryService.export_ndjson(is_active=is_active, email_verified=email_verified),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="users.ndjson"'},
+    )
+
 
-@router.get("/me", response_model=UserResponse)
-def get_current_user_profile(current_user: User = Depends(get_current_user)):
+@router.get("/me", dependencies=[Depends(query_budget(1))], response_model=UserResponse)
+async def get_current_user_profile(
+    current_user: UserResponse = Depends(get_current_user),
+):
     return {
         "id": current_user.id,
         "username": current_user.username,
@@ -21,17 +111,17 @@ def get_current_user_profile(current_user: User = Depends(get_current_user)):
     }
 
 
-@router.put("/me", response_model=UserResponse)
-def update_current_user_profile(
+@router.put("/me", dependencies=[Depends(query_budget(5))], response_model=UserResponse)
+async def update_current_user_profile(
     user_update: UserUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
     if user_update.username:
-        existing = (
-            db.query(User)
-            .filter(User.username == user_update.username, User.id != current_user.id)
-            .first()
+        existing = await db.scalar(
+            select(User).where(
+                User.username == user_update.username, User.id != current_user.id
+            )
         )
 
         if existing:
@@ -39,26 +129,79 @@ def update_current_user_profile(
                 status_code=status.HTTP_400_BAD_REQUEST, detail="Usrename already taken"
             )
 
-        current_user.username = user_update.username
+    user = await db.get(User, current_user.id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
+        )
+
+    if user_update.username:
+        user.username = user_update.username
 
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    await db.refresh(user)
+    principal_cache.invalidate(user.id)
 
     return {
-        "id": current_user.id,
-        "username": current_user.username,
-        "email": current_user.email,
-        "is_active": current_user.is_active,
-        "email_verified": current_user.email_verified,
-        "created_at": current_user.created_at,
+        "id": user.id,
+        "username": user.username,
+        "email": user.email,
+        "is_active": user.is_active,
+        "email_verified": user.email_verified,
+        "created_at": user.created_at,
     }
 
 
-@router.delete("/me")
-def delete_current_user_account(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+@router.delete("/me", dependencies=[Depends(query_budget(4))])
+async def delete_current_user_account(
+    current_user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    current_user.is_active = False
-    db.commit()
+    await db.execute(
+        update(User).where(User.id == current_user.id).values(is_active=False)
+    )
+    # Tokens already issued must stop introspecting as active
+    await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.user_id == current_user.id, RefreshToken.revoked.is_(False))
+        .values(revoked=True)
+    )
+    cutoff = revocation_store.revoke_user(db, current_user.id, spare_current_second=False)
+    await db.commit()
+    revocation_store.remember(cutoff)
+    principal_cache.invalidate(current_user.id)
 
     return {"message": "Account deactivated successfully"}
+
+
+@router.post("/import", response_model=UserImportResponse)
+async def import_users(
+    request: Request,
+    import_format: Optional[str] = Query(
+        None, alias="format", description="csv or ndjson; taken from Content-Type when omitted"
+    ),
+    dry_run: bool = Query(False, description="Validate and check duplicates without creating"),
+    current_user: UserResponse = Depends(require_user_import_grant),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Create users from a CSV (with a header row) or NDJSON request body.
+
+    Columns / keys: email, username, password and optionally is_active and
+    email_verified. The body is streamed and imported in batches; the
+    response counts created, duplicate and invalid rows and lists per-row
+    errors (up to USER_IMPORT_MAX_ERRORS).
+    """
+    # The import opens its own short sessions; don't hold this connection for its duration
+    await db.close()
+
+    if import_format is None:
+        content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+        import_format = IMPORT_CONTENT_TYPES.get(content_type)
+        if import_format is None:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="Send text/csv or application/x-ndjson, or pass ?format=",
+            )
+
+    report = await UserImportService.import_users(request.stream(), import_format, dry_run=dry_run)
+    return report.as_dict()
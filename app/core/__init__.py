@@ -3,8 +3,13 @@ from .database import get_db, Base
 from .security import (
     hash_password,
     verify_password,
+    password_needs_rehash,
     create_access_token,
     create_refresh_token,
+    hash_token,
+    hash_password_async,
+    verify_password_async,
+    password_hasher,
 )
 from .constants import OTPPurposeEnum
 
@@ -14,7 +19,12 @@ __all__ = [
     "Base",
     "hash_password",
     "verify_password",
+    "password_needs_rehash",
     "create_access_token",
     "create_refresh_token",
+    "hash_token",
+    "hash_password_async",
+    "verify_password_async",
+    "password_hasher",
     "OTPPurposeEnum",
 ]
@@ -0,0 +1,15 @@
+from app.core.config import settings
+from app.utils.cache import TTLCache
+
+# Snapshot of the authenticated user (UserResponse) keyed by user id
+principal_cache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE, ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS
+)
+
+# RFC 7662 introspection results keyed by hash_token(token)
+introspection_cache = TTLCache(
+    maxsize=settings.INTROSPECTION_CACHE_SIZE, ttl=settings.TOKEN_CACHE_MAX_TTL_SECONDS
+)
+
+# Verified JWT claims keyed by SHA-256 of the token; entries expire at the token's exp
+token_cache = TTLCache(maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.TOKEN_CACHE_MAX_TTL_SECONDS)
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 import json
 
 
@@ -11,6 +11,12 @@ class Settings(BaseSettings):
 
     # Database
     DATABASE_URL: str
+    # Read replicas for read-only sessions (get_read_db); empty = all reads on the primary
+    DATABASE_REPLICA_URLS: List[str] = []
+    REPLICA_MAX_LAG_SECONDS: float = 5.0
+    REPLICA_HEALTH_INTERVAL_SECONDS: float = 5.0
+    # After a user's row changes, that user's reads stay on the primary this long
+    REPLICA_STICKY_SECONDS: float = 10.0
 
     # JWT Security
     SECRET_KEY: str
@@ -19,6 +25,101 @@ class Settings(BaseSettings):
     REFRESH_TOKEN_EXPIRE_DAYS: int
     OTP_EXPIRE_MINUTES: int
     RESEND_COOLDOWN_SECONDS: int
+    OTP_STORE_BACKEND: str = "sql"  # sql | memory | redis
+    REDIS_URL: Optional[str] = None
+
+    # Asymmetric signing: directory of <kid>.pem keys (RSA / EC). When unset,
+    # tokens are signed with SECRET_KEY and ALGORITHM.
+    JWT_KEYS_DIR: Optional[str] = None
+    JWT_ACTIVE_KID: Optional[str] = None
+
+    # Password hashing (0 workers = one per CPU core)
+    PASSWORD_HASH_WORKERS: int = 0
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    # Scheme for new hashes (bcrypt | argon2id); hashes made with another scheme or
+    # other parameters are upgraded on the next login. Tune with scripts/calibrate_hasher.py
+    PASSWORD_HASH_SCHEME: str = "bcrypt"
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    PASSWORD_ARGON2_TIME_COST: int = 3
+    PASSWORD_ARGON2_MEMORY_COST: int = 65536  # KiB
+    PASSWORD_ARGON2_PARALLELISM: int = 4
+    PASSWORD_REHASH_ON_LOGIN: bool = True
+
+    # Authenticated-user cache used by get_current_user
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 30
+
+    # Verified-token cache used by decode_token
+    TOKEN_CACHE_SIZE: int = 50000
+    TOKEN_CACHE_MAX_TTL_SECONDS: int = 3600
+
+    # Access-token revocation: per-worker Bloom filter synced from revoked_tokens
+    REVOCATION_SYNC_INTERVAL_SECONDS: float = 2.0
+    REVOCATION_REBUILD_INTERVAL_SECONDS: int = 300
+    REVOCATION_BLOOM_CAPACITY: int = 100000
+    REVOCATION_BLOOM_ERROR_RATE: float = 0.001
+
+    # Token introspection for services that can't verify JWTs themselves
+    INTROSPECTION_API_KEYS: List[str] = []
+    INTROSPECTION_MAX_BATCH: int = 100
+    INTROSPECTION_CACHE_SIZE: int = 50000
+    INTROSPECTION_REFRESH_CACHE_TTL_SECONDS: int = 30
+
+    # Materialized (user, app) permission sets used by the permission resolver
+    PERMISSION_CACHE_SIZE: int = 50000
+    PERMISSION_CACHE_TTL_SECONDS: int = 300
+    # Grant that allows checking other users' permissions
+    PERMISSION_ADMIN_APP: str = "auth"
+    PERMISSION_ADMIN_PAGE: str = "/permissions"
+    PERMISSION_ADMIN_ACTION: str = "view"
+    # Grants (in PERMISSION_ADMIN_APP) that allow listing / exporting and bulk importing users
+    USER_LIST_ADMIN_PAGE: str = "/users"
+    USER_LIST_ADMIN_ACTION: str = "view"
+    USER_IMPORT_ADMIN_PAGE: str = "/users"
+    USER_IMPORT_ADMIN_ACTION: str = "import"
+
+    # Admin user listing (page size cap) and NDJSON export (rows fetched per cursor batch)
+    USER_LIST_MAX_LIMIT: int = 500
+    USER_EXPORT_BATCH_SIZE: int = 1000
+
+    # Admin user search: pg_trgm indexes on Postgres ("auto"), else an in-process prefix index
+    USER_SEARCH_BACKEND: str = "auto"  # auto | trigram | prefix
+    USER_SEARCH_MIN_LENGTH: int = 3
+    USER_SEARCH_MAX_LIMIT: int = 50
+    USER_SEARCH_TIMEOUT_MS: int = 250
+    # Prefix index: how often each worker pulls users created / changed elsewhere
+    USER_SEARCH_SYNC_INTERVAL_SECONDS: float = 10.0
+
+    # Bulk user import: rows hashed and inserted per batch, per-row errors reported
+    USER_IMPORT_BATCH_SIZE: int = 1000
+    USER_IMPORT_MAX_ERRORS: int = 1000
+
+    # Background purge of expired OTPs / refresh tokens (0 interval = disabled)
+    PURGE_INTERVAL_SECONDS: int = 3600
+    PURGE_BATCH_SIZE: int = 1000
+    PURGE_THROTTLE_SECONDS: float = 0.1
+
+    # Email outbox dispatcher
+    EMAIL_WORKERS: int = 4
+    EMAIL_BATCH_SIZE: int = 50
+    EMAIL_POLL_INTERVAL_SECONDS: float = 1.0
+    EMAIL_MAX_ATTEMPTS: int = 5
+    EMAIL_RETRY_BASE_SECONDS: float = 2.0
+    # Failed messages are kept this long (for inspection) before the purge job deletes them
+    EMAIL_FAILED_RETENTION_HOURS: int = 168
+
+    # Request rate limiting (limits themselves are declared per route)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"  # memory | redis
+    RATE_LIMIT_MAX_KEYS: int = 100000
+    RATE_LIMIT_TRUST_FORWARDED_FOR: bool = False
+
+    # Prometheus metrics at /metrics plus request / query instrumentation
+    METRICS_ENABLED: bool = True
+
+    # Raise instead of logging when a request goes over its route's query budget
+    # (for the test suite)
+    QUERY_BUDGET_STRICT: bool = False
 
     # CORS - parse JSON string to list
     BACKEND_CORS_ORIGINS: List[str]
@@ -4,3 +4,8 @@ from enum import Enum
 class OTPPurposeEnum(str, Enum):
     SIGNUP = "signup"
     PASSWORD_RESET = "password_reset"
+
+
+# Failed verifications allowed per OTP, and OTPs issued per OTP_EXPIRE_MINUTES window
+OTP_MAX_ATTEMPTS = 5
+OTP_MAX_RESENDS = 3
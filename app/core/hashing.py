@@ -0,0 +1,161 @@
+from abc import ABC, abstractmethod
+from typing import List, Optional
+
+import bcrypt
+
+from app.core.config import settings
+
+
+class PasswordHasher(ABC):
+    """One password hashing scheme with fixed parameters.
+
+    Hashes are stored in modular crypt format (``$2b$12$...``,
+    ``$argon2id$v=19$m=...``), so the scheme and its parameters can be read
+    back from any stored hash.
+    """
+
+    scheme: str
+    # Longest password (UTF-8 bytes) the scheme accepts; None for no limit
+    max_password_bytes: Optional[int] = None
+
+    @abstractmethod
+    def identifies(self, hashed: str) -> bool:
+        """Whether ``hashed`` was produced by this scheme (any parameters)."""
+
+    @abstractmethod
+    def hash(self, password: str) -> str: ...
+
+    @abstractmethod
+    def verify(self, password: str, hashed: str) -> bool: ...
+
+    @abstractmethod
+    def needs_rehash(self, hashed: str) -> bool:
+        """Whether ``hashed`` uses parameters other than this hasher's."""
+
+
+class BcryptHasher(PasswordHasher):
+    scheme = "bcrypt"
+    # bcrypt.hashpw raises ValueError beyond this
+    max_password_bytes = 72
+
+    def __init__(self, rounds: int = 12):
+        self.rounds = rounds
+
+    def identifies(self, hashed: str) -> bool:
+        return hashed[:4] in ("$2a$", "$2b$", "$2y$")
+
+    def hash(self, password: str) -> str:
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        return bcrypt.hashpw(password.encode("utf-8"), salt).decode("utf-8")
+
+    def verify(self, password: str, hashed: str) -> bool:
+        return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+
+    def needs_rehash(self, hashed: str) -> bool:
+        # $2b$<rounds>$<salt+digest>
+        return not self.identifies(hashed) or int(hashed.split("$")[2]) != self.rounds
+
+
+class Argon2Hasher(PasswordHasher):
+    """argon2id via the optional ``argon2-cffi`` package; ``memory_cost`` is in KiB."""
+
+    scheme = "argon2id"
+
+    def __init__(self, time_cost: int = 3, memory_cost: int = 65536, parallelism: int = 4):
+        try:
+            import argon2
+        except ImportError as exc:
+            raise RuntimeError(
+                "argon2id password hashing requires the 'argon2-cffi' package"
+            ) from exc
+
+        self.time_cost = time_cost
+        self.memory_cost = memory_cost
+        self.parallelism = parallelism
+        self._errors = (argon2.exceptions.VerificationError, argon2.exceptions.InvalidHashError)
+        self._hasher = argon2.PasswordHasher(
+            time_cost=time_cost,
+            memory_cost=memory_cost,
+            parallelism=parallelism,
+            type=argon2.Type.ID,
+        )
+
+    def identifies(self, hashed: str) -> bool:
+        return hashed.startswith("$argon2id$")
+
+    def hash(self, password: str) -> str:
+        return self._hasher.hash(password)
+
+    def verify(self, password: str, hashed: str) -> bool:
+        try:
+            return self._hasher.verify(hashed, password)
+        except self._errors:
+            return False
+
+    def needs_rehash(self, hashed: str) -> bool:
+        return not self.identifies(hashed) or self._hasher.check_needs_rehash(hashed)
+
+
+class HasherRegistry:
+    """Hashes new passwords with ``current`` and verifies hashes of every known scheme.
+
+    A hash made by another scheme, or by the current one with other
+    parameters, verifies as usual but reports ``needs_rehash``, so it can be
+    upgraded once the plaintext is known (at login).
+    """
+
+    def __init__(self, current: PasswordHasher, others: Optional[List[PasswordHasher]] = None):
+        self.current = current
+        self.hashers = [current] + [
+            hasher for hasher in others or [] if hasher.scheme != current.scheme
+        ]
+
+    def _hasher_for(self, hashed: str) -> Optional[PasswordHasher]:
+        for hasher in self.hashers:
+            if hasher.identifies(hashed):
+                return hasher
+        return None
+
+    def hash(self, password: str) -> str:
+        return self.current.hash(password)
+
+    def verify(self, password: str, hashed: str) -> bool:
+        hasher = self._hasher_for(hashed)
+        return hasher is not None and hasher.verify(password, hashed)
+
+    def needs_rehash(self, hashed: str) -> bool:
+        return self.current.needs_rehash(hashed)
+
+    def password_error(self, password: str) -> Optional[str]:
+        """Why ``current`` can't hash ``password``, or None if it can."""
+        limit = self.current.max_password_bytes
+        if limit is not None and len(password.encode("utf-8")) > limit:
+            return f"Password must be at most {limit} bytes long"
+        return None
+
+
+def create_hasher(scheme: str) -> PasswordHasher:
+    if scheme == "bcrypt":
+        return BcryptHasher(rounds=settings.PASSWORD_BCRYPT_ROUNDS)
+    if scheme == "argon2id":
+        return Argon2Hasher(
+            time_cost=settings.PASSWORD_ARGON2_TIME_COST,
+            memory_cost=settings.PASSWORD_ARGON2_MEMORY_COST,
+            parallelism=settings.PASSWORD_ARGON2_PARALLELISM,
+        )
+    raise ValueError(f"Unknown PASSWORD_HASH_SCHEME: {scheme}")
+
+
+def create_hasher_registry() -> HasherRegistry:
+    current = create_hasher(settings.PASSWORD_HASH_SCHEME.lower())
+    others = [BcryptHasher(rounds=settings.PASSWORD_BCRYPT_ROUNDS)]
+    if current.scheme != "argon2id":
+        # Still verify argon2id hashes after switching back to bcrypt, if installed
+        try:
+            others.append(create_hasher("argon2id"))
+        except RuntimeError:
+            pass
+    return HasherRegistry(current, others)
+
+
+hasher_registry = create_hasher_registry()
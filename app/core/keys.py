@@ -0,0 +1,117 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from jose import jwk
+from jose.backends.base import Key
+
+from app.core.config import settings
+
+_EC_CURVE_ALGORITHMS = {
+    "secp256r1": "ES256",
+    "secp384r1": "ES384",
+    "secp521r1": "ES512",
+}
+
+
+@dataclass(frozen=True)
+class SigningKey:
+    kid: str
+    algorithm: str
+    verify_key: Key
+    sign_key: Optional[Key] = None
+
+    @property
+    def can_sign(self) -> bool:
+        return self.sign_key is not None
+
+    def to_jwk(self) -> dict:
+        public_jwk = self.verify_key.to_dict()
+        public_jwk.update({"kid": self.kid, "alg": self.algorithm, "use": "sig"})
+        return public_jwk
+
+
+def _algorithm_for(public_key) -> str:
+    if isinstance(public_key, rsa.RSAPublicKey):
+        return "RS256"
+    if isinstance(public_key, ec.EllipticCurvePublicKey):
+        algorithm = _EC_CURVE_ALGORITHMS.get(public_key.curve.name)
+        if algorithm:
+            return algorithm
+    raise ValueError(
+        f"Unsupported JWT key type {type(public_key).__name__}; use RSA or EC P-256/384/521"
+    )
+
+
+def load_signing_key(kid: str, pem: bytes) -> SigningKey:
+    """Build a SigningKey from a private (sign + verify) or public (verify-only) PEM."""
+    if b"PRIVATE KEY" in pem:
+        private_key = serialization.load_pem_private_key(pem, password=None)
+        public_key = private_key.public_key()
+    else:
+        private_key = None
+        public_key = serialization.load_pem_public_key(pem)
+
+    algorithm = _algorithm_for(public_key)
+    public_pem = public_key.public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    return SigningKey(
+        kid=kid,
+        algorithm=algorithm,
+        verify_key=jwk.construct(public_pem, algorithm),
+        sign_key=jwk.construct(pem, algorithm) if private_key is not None else None,
+    )
+
+
+class KeyRing:
+    """Asymmetric JWT keys indexed by ``kid``.
+
+    One key is active for signing; every key in the ring (including retired,
+    public-only ones) is still accepted for verification and published in JWKS.
+    """
+
+    def __init__(self, keys: Dict[str, SigningKey], active_kid: str):
+        active = keys.get(active_kid)
+        if active is None or not active.can_sign:
+            raise ValueError(f"Active JWT key '{active_kid}' needs a private key")
+        self._keys = keys
+        self.active_kid = active_kid
+
+    @classmethod
+    def from_directory(cls, path: str, active_kid: Optional[str] = None) -> "KeyRing":
+        """Load ``<kid>.pem`` files from ``path``."""
+        keys = {
+            pem_file.stem: load_signing_key(pem_file.stem, pem_file.read_bytes())
+            for pem_file in sorted(Path(path).glob("*.pem"))
+        }
+        if active_kid is None:
+            signing = [kid for kid, key in keys.items() if key.can_sign]
+            if len(signing) != 1:
+                raise ValueError(
+                    "Set JWT_ACTIVE_KID when the key directory does not hold "
+                    "exactly one private key"
+                )
+            active_kid = signing[0]
+        return cls(keys, active_kid)
+
+    @property
+    def signing_key(self) -> SigningKey:
+        return self._keys[self.active_kid]
+
+    def get(self, kid: Optional[str]) -> Optional[SigningKey]:
+        if kid is None:
+            return None
+        return self._keys.get(kid)
+
+    def jwks(self) -> dict:
+        return {"keys": [key.to_jwk() for key in self._keys.values()]}
+
+
+key_ring: Optional[KeyRing] = (
+    KeyRing.from_directory(settings.JWT_KEYS_DIR, settings.JWT_ACTIVE_KID or None)
+    if settings.JWT_KEYS_DIR
+    else None
+)
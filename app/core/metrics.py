@@ -0,0 +1,429 @@
+"""In-process metrics in the Prometheus text exposition format.
+
+Metrics are per worker process; Prometheus scrapes each worker (or sums them)
+as usual. Updating a metric costs a dict lookup, a lock and a few additions,
+so instrumentation stays on in production. Component ``stats()`` dicts are
+read only at scrape time through ``StatsCollector``.
+"""
+
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Request latency: 5ms .. 10s
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# JWT and query timings: 50us .. 1s
+FAST_BUCKETS = (
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    1.0,
+)
+# Password hashing including time queued for the hasher pool: 10ms .. 10s
+HASH_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _format_labels(labels: Sequence[Tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels) + "}"
+
+
+class _CounterValue:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeValue(_CounterValue):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        # Per-bucket (not cumulative) counts; the last slot is +Inf
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self) -> "_Timer":
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram: _HistogramValue):
+        self.histogram = histogram
+
+    def __enter__(self) -> "_Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.histogram.observe(time.perf_counter() - self.started)
+
+
+class Metric(ABC):
+    """A named metric family; ``labels(*values)`` returns the child for those values.
+
+    Children are created on first use and cached, so hot paths should hold on
+    to the child rather than call ``labels`` per event where they can.
+    """
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def _new_child(self):
+        """A fresh value holder for one combination of label values."""
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _samples(self, labels: List[Tuple[str, str]], child) -> Iterable[str]:
+        yield f"{self.name}{_format_labels(labels)} {_format_value(child.value)}"
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        for values, child in list(self._children.items()):
+            lines.extend(self._samples(list(zip(self.labelnames, values)), child))
+        return lines
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def _new_child(self) -> _CounterValue:
+        return _CounterValue()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def _new_child(self) -> _GaugeValue:
+        return _GaugeValue()
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def _samples(self, labels: List[Tuple[str, str]], child: _HistogramValue) -> Iterable[str]:
+        with child._lock:
+            counts, total = list(child.counts), child.sum
+
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            bucket_labels = _format_labels(labels + [("le", _format_value(float(bound)))])
+            yield f"{self.name}_bucket{bucket_labels} {cumulative}"
+        yield f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}"
+        yield f"{self.name}_count{_format_labels(labels)} {cumulative}"
+
+
+class StatsCollector:
+    """Exposes components' ``stats()`` dicts as metrics at scrape time.
+
+    ``sources`` maps a value of ``label`` to a stats callable, so several
+    instances (e.g. caches) share one family per key. Numeric top-level keys
+    become ``<prefix>_<key>`` gauges, or ``<prefix>_<key>_total`` counters for
+    keys listed in ``counters``; nested dicts and other values are skipped.
+    """
+
+    def __init__(
+        self,
+        prefix: str,
+        documentation: str,
+        sources: Dict[str, Callable[[], dict]],
+        label: str = "name",
+        counters: Sequence[str] = (),
+    ):
+        self.prefix = prefix
+        self.documentation = documentation
+        self.sources = sources
+        self.label = label
+        self.counters = frozenset(counters)
+
+    def render(self) -> List[str]:
+        families: Dict[str, List[str]] = {}
+        for source, stats in self.sources.items():
+            labels = _format_labels([(self.label, source)])
+            for key, value in stats().items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = (
+                    f"{self.prefix}_{key}_total" if key in self.counters else f"{self.prefix}_{key}"
+                )
+                if name not in families:
+                    kind = "counter" if key in self.counters else "gauge"
+                    families[name] = [
+                        f"# HELP {name} {self.documentation} ({key})",
+                        f"# TYPE {name} {kind}",
+                    ]
+                families[name].append(f"{name}{labels} {_format_value(value)}")
+        return [line for lines in families.values() for line in lines]
+
+
+class PoolCollector:
+    """Connection pool usage of SQLAlchemy engines, read at scrape time."""
+
+    def __init__(self, engines: Dict[str, Engine]):
+        self.engines = engines
+
+    def render(self) -> List[str]:
+        gauges = {
+            "db_pool_size": ("Configured pool size", "size"),
+            "db_pool_checked_out": ("Connections currently checked out", "checkedout"),
+            "db_pool_checked_in": ("Idle connections in the pool", "checkedin"),
+            "db_pool_overflow": ("Connections open beyond pool_size", "overflow"),
+        }
+        lines = []
+        for name, (documentation, attribute) in gauges.items():
+            lines += [f"# HELP {name} {documentation}", f"# TYPE {name} gauge"]
+            for engine_name, engine in self.engines.items():
+                # Pools without a fixed size (NullPool, StaticPool) lack these
+                read = getattr(engine.pool, attribute, None)
+                if read is not None:
+                    # QueuePool.overflow() counts up from -pool_size
+                    value = max(read(), 0) if attribute == "overflow" else read()
+                    labels = _format_labels([("engine", engine_name)])
+                    lines.append(f"{name}{labels} {_format_value(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._collectors: list = []
+
+    def register(self, collector):
+        self._collectors.append(collector)
+        return collector
+
+    def render(self) -> str:
+        lines = []
+        for collector in self._collectors:
+            lines.extend(collector.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(
+    Counter("http_requests_total", "HTTP requests handled", ("method", "route", "status"))
+)
+HTTP_REQUEST_DURATION = REGISTRY.register(
+    Histogram("http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+)
+HTTP_REQUESTS_IN_PROGRESS = REGISTRY.register(
+    Gauge("http_requests_in_progress", "HTTP requests currently being handled", ("method",))
+)
+PASSWORD_HASH_DURATION = REGISTRY.register(
+    Histogram(
+        "password_hash_duration_seconds",
+        "Password hash/verify latency including time queued for the hasher pool",
+        ("op",),
+        buckets=HASH_BUCKETS,
+    )
+)
+PASSWORD_REHASHES = REGISTRY.register(
+    Counter(
+        "password_rehashes_total",
+        "Stored password hashes upgraded to the current hasher at login",
+        ("result",),
+    )
+)
+USER_IMPORT_ROWS = REGISTRY.register(
+    Counter("user_import_rows_total", "Rows processed by bulk user import", ("result",))
+)
+JWT_DURATION = REGISTRY.register(
+    Histogram(
+        "jwt_duration_seconds",
+        "JWT signing and verification time (decode cache hits excluded)",
+        ("op",),
+        buckets=FAST_BUCKETS,
+    )
+)
+DB_QUERY_DURATION = REGISTRY.register(
+    Histogram(
+        "db_query_duration_seconds",
+        "Database statement execution time",
+        ("engine", "statement"),
+        buckets=FAST_BUCKETS,
+    )
+)
+DB_QUERIES_PER_REQUEST = REGISTRY.register(
+    Histogram(
+        "db_queries_per_request",
+        "Database statements run per HTTP request",
+        ("route",),
+        buckets=(0, 1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 50),
+    )
+)
+DB_QUERY_BUDGET_EXCEEDED = REGISTRY.register(
+    Counter(
+        "db_query_budget_exceeded_total",
+        "Requests that ran more statements than their route's query budget",
+        ("route",),
+    )
+)
+
+HTTP_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+STATEMENT_TYPES = frozenset({"SELECT", "INSERT", "UPDATE", "DELETE"})
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status counts and in-flight requests.
+
+    Requests are labelled by route template (``/api/v1/users/{user_id}``), not
+    raw path, to keep label cardinality bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"] if scope["method"] in HTTP_METHODS else "other"
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_progress.dec()
+            # FastAPI puts the matched APIRoute in the scope while routing
+            route = getattr(scope.get("route"), "path", None)
+            if route is None:
+                route = "unmatched" if status_code == 404 else "other"
+            HTTP_REQUEST_DURATION.labels(method, route).observe(elapsed)
+            HTTP_REQUESTS.labels(method, route, str(status_code)).inc()
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """Time every statement run through ``engine`` (pass ``sync_engine`` for async engines)."""
+    histograms: Dict[str, _HistogramValue] = {}
+
+    def histogram(statement: str) -> _HistogramValue:
+        kind = statement.lstrip()[:6].upper()
+        if kind not in STATEMENT_TYPES:
+            kind = "other"
+        if kind not in histograms:
+            histograms[kind] = DB_QUERY_DURATION.labels(name, kind)
+        return histograms[kind]
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        histogram(statement).observe(time.perf_counter() - started)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        connection = context.connection
+        stack = connection.info.get("query_started") if connection is not None else None
+        if stack:
+            started = stack.pop()
+            histogram(context.statement or "").observe(time.perf_counter() - started)
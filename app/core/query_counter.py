@@ -0,0 +1,135 @@
+"""Per-request SQL statement counting and route query budgets.
+
+``QueryCountMiddleware`` opens a counter for each request; engine hooks
+installed by ``count_engine_queries`` increment whichever counter is current
+(a context variable, so it follows the request into dependencies, the
+threadpool and SQLAlchemy's async greenlets). Routes declare an upper bound
+with ``dependencies=[Depends(query_budget(n))]``.
+
+Going over budget logs a warning. With QUERY_BUDGET_STRICT (meant for the
+test suite) the statement that goes over raises ``QueryBudgetExceeded``
+instead, so the request fails with the offending SQL in the traceback.
+"""
+
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.metrics import DB_QUERIES_PER_REQUEST, DB_QUERY_BUDGET_EXCEEDED
+
+logger = logging.getLogger(__name__)
+QUERY_COUNT_HEADER = b"x-query-count"
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+class QueryCounter:
+    def __init__(self, keep_statements: bool = False):
+        self.count = 0
+        self.budget: Optional[int] = None
+        self.statements: Optional[List[str]] = [] if keep_statements else None
+
+    @property
+    def over_budget(self) -> bool:
+        return self.budget is not None and self.count > self.budget
+
+
+_current: ContextVar[Optional[QueryCounter]] = ContextVar("query_counter", default=None)
+
+
+def current_counter() -> Optional[QueryCounter]:
+    return _current.get()
+
+
+@contextmanager
+def count_queries(keep_statements: bool = False) -> Iterator[QueryCounter]:
+    """Count statements run in this context, e.g. in scripts or service-level tests."""
+    counter = QueryCounter(keep_statements)
+    token = _current.set(counter)
+    try:
+        yield counter
+    finally:
+        _current.reset(token)
+
+
+def query_budget(limit: int):
+    """Route dependency declaring that a request may run at most ``limit`` statements."""
+
+    def declare_query_budget() -> None:
+        counter = _current.get()
+        if counter is not None:
+            counter.budget = limit
+
+    return declare_query_budget
+
+
+def count_engine_queries(engine: Engine) -> None:
+    """Attribute statements on ``engine`` to the current counter (sync engine of async ones)."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter = _current.get()
+        if counter is None:
+            return
+        counter.count += 1
+        if counter.statements is not None:
+            counter.statements.append(statement)
+        if settings.QUERY_BUDGET_STRICT and counter.over_budget:
+            raise QueryBudgetExceeded(f"Query budget of {counter.budget} exceeded by: {statement}")
+
+
+class QueryCountMiddleware:
+    """ASGI middleware giving every HTTP request its own ``QueryCounter``.
+
+    In DEBUG the count so far is sent in the ``X-Query-Count`` response header
+    and logged per request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        debug = settings.DEBUG
+        counter = QueryCounter(keep_statements=debug or settings.QUERY_BUDGET_STRICT)
+
+        async def send_wrapper(message):
+            if debug and message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((QUERY_COUNT_HEADER, str(counter.count).encode("ascii")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = _current.set(counter)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            route = getattr(scope.get("route"), "path", None)
+            if route is not None:
+                self._record(scope["method"], route, counter, debug)
+
+    @staticmethod
+    def _record(method: str, route: str, counter: QueryCounter, debug: bool) -> None:
+        DB_QUERIES_PER_REQUEST.labels(route).observe(counter.count)
+        if counter.over_budget:
+            DB_QUERY_BUDGET_EXCEEDED.labels(route).inc()
+            logger.warning(
+                "%s %s ran %d queries, over its budget of %d%s",
+                method,
+                route,
+                counter.count,
+                counter.budget,
+                ":\n" + "\n".join(counter.statements) if counter.statements else "",
+            )
+        elif debug:
+            logger.debug("%s %s ran %d queries", method, route, counter.count)
@@ -0,0 +1,194 @@
+import heapq
+import math
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+
+from app.core.config import settings
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Token bucket allowing ``times`` requests per ``seconds``, refilled continuously.
+
+    ``key`` selects what the bucket is keyed by: ``"ip"`` (client address) or
+    ``"email"`` (the ``email`` field of the JSON body). Buckets are per route
+    unless ``bucket`` names a shared one, so related endpoints can draw from
+    the same budget.
+    """
+
+    times: int
+    seconds: float
+    key: str = "ip"
+    bucket: Optional[str] = None
+
+    @property
+    def refill_rate(self) -> float:
+        return self.times / self.seconds
+
+
+class RateLimitBackend(ABC):
+    @abstractmethod
+    async def hit(self, key: str, capacity: int, refill_rate: float) -> float:
+        """Take one token from the bucket; return 0 if allowed, otherwise the
+        seconds until a token becomes available."""
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """Per-process buckets. ``hit`` never awaits, so it is atomic on the event loop."""
+
+    # Fraction of max_keys kept by a sweep
+    SWEEP_TO = 0.9
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        # key -> (tokens, updated_at, full_at)
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}
+
+    def _sweep(self, now: float) -> None:
+        buckets = {key: bucket for key, bucket in self._buckets.items() if bucket[2] > now}
+        # Free a tenth of the space at once, so a table full of live buckets is
+        # rebuilt once per max_keys / 10 new keys rather than on every new key.
+        # The buckets dropped are the ones closest to refilled anyway.
+        excess = len(buckets) - int(self.max_keys * self.SWEEP_TO)
+        if excess > 0:
+            for key in heapq.nsmallest(excess, buckets, key=lambda key: buckets[key][2]):
+                del buckets[key]
+        self._buckets = buckets
+
+    async def hit(self, key: str, capacity: int, refill_rate: float) -> float:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._sweep(now)
+            tokens = float(capacity)
+        else:
+            tokens, updated_at, _ = bucket
+            tokens = min(capacity, tokens + (now - updated_at) * refill_rate)
+
+        if tokens < 1:
+            self._buckets[key] = (tokens, now, now + (capacity - tokens) / refill_rate)
+            return (1 - tokens) / refill_rate
+
+        tokens -= 1
+        self._buckets[key] = (tokens, now, now + (capacity - tokens) / refill_rate)
+        return 0.0
+
+
+# KEYS: bucket hash; ARGV: capacity, refill_per_ms, now_ms
+_HIT_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1])
+if tokens == nil then
+    tokens = capacity
+else
+    tokens = math.min(capacity, tokens + (now - tonumber(bucket[2])) * rate)
+end
+
+local retry_after = 0
+if tokens < 1 then
+    retry_after = math.ceil((1 - tokens) / rate)
+else
+    tokens = tokens - 1
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate) + 1000)
+return retry_after
+"""
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """Buckets shared by every worker through Redis, updated by a Lua script."""
+
+    KEY_PREFIX = "ratelimit"
+
+    def __init__(self, url: Optional[str] = None, client=None):
+        if client is None:
+            try:
+                from redis import asyncio as redis_asyncio
+            except ImportError as exc:
+                raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package") from exc
+            client = redis_asyncio.from_url(url or settings.REDIS_URL)
+        self._client = client
+        self._hit = client.register_script(_HIT_SCRIPT)
+
+    async def hit(self, key: str, capacity: int, refill_rate: float) -> float:
+        retry_after_ms = await self._hit(
+            keys=[f"{self.KEY_PREFIX}:{key}"],
+            args=[capacity, refill_rate / 1000, int(time.time() * 1000)],
+        )
+        return int(retry_after_ms) / 1000
+
+
+def create_rate_limit_backend() -> RateLimitBackend:
+    backend = settings.RATE_LIMIT_BACKEND.lower()
+    if backend == "memory":
+        return InMemoryRateLimitBackend(settings.RATE_LIMIT_MAX_KEYS)
+    if backend == "redis":
+        return RedisRateLimitBackend()
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {settings.RATE_LIMIT_BACKEND}")
+
+
+rate_limit_backend = create_rate_limit_backend()
+
+
+def client_ip(request: Request) -> str:
+    if settings.RATE_LIMIT_TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+async def _request_email(request: Request) -> Optional[str]:
+    # Starlette caches the body, so this re-reads what FastAPI already received
+    try:
+        body = await request.json()
+    except ValueError:
+        return None
+    email = body.get("email") if isinstance(body, dict) else None
+    return email.strip().lower() if isinstance(email, str) else None
+
+
+def rate_limit(*limits: RateLimit):
+    """Dependency rejecting requests with 429 once any of ``limits`` is exhausted.
+
+    Declare it in the route's ``dependencies`` so it runs before the handler
+    touches the database or the password hasher.
+    """
+
+    async def dependency(request: Request) -> None:
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+
+        email = None
+        for limit in limits:
+            if limit.key == "email":
+                email = email or await _request_email(request)
+                if email is None:
+                    continue
+                subject = email
+            else:
+                subject = client_ip(request)
+
+            bucket = limit.bucket or request.url.path
+            key = f"{bucket}:{limit.times}/{limit.seconds:g}:{limit.key}:{subject}"
+            retry_after = await rate_limit_backend.hit(key, limit.times, limit.refill_rate)
+            if retry_after > 0:
+                retry_after = math.ceil(retry_after)
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail=f"Too many requests. Please try again in {retry_after} seconds.",
+                    headers={"Retry-After": str(retry_after)},
+                )
+
+    return dependency
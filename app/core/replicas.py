@@ -0,0 +1,315 @@
+"""Read-replica routing for read-only sessions.
+
+``get_read_db`` yields a session whose SELECTs go to a healthy replica and
+whose writes (and every read after the session's first write) go to the
+primary. With no DATABASE_REPLICA_URLS it is simply the request's primary
+session.
+
+Read-your-writes: when a commit on any session changes a ``users`` row, that
+user's read sessions stay on the primary for REPLICA_STICKY_SECONDS. Bulk
+UPDATE/DELETE on users can't be attributed to one user, so they pin every
+read session instead. Stickiness is per worker; other workers rely on the
+lag bound below.
+
+A background task measures each replica's lag every
+REPLICA_HEALTH_INTERVAL_SECONDS; replicas that fail the check, lag more than
+REPLICA_MAX_LAG_SECONDS or drop a connection get no reads until a later
+check passes, and with none healthy reads fall back to the primary.
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from typing import AsyncGenerator, Dict, List, Optional, Set
+
+from fastapi import Depends
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select, operators
+from sqlalchemy.sql.elements import BindParameter
+from sqlalchemy.sql.selectable import CompoundSelect
+
+from app.core.config import settings
+from app.core.database import DB_ECHO, async_engine, get_async_db, to_async_url
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Seconds behind the primary; 0 on a primary or a standby that has replayed everything received
+POSTGRES_LAG_SQL = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+    """
+)
+# Other backends (e.g. two SQLite files in development) have no replication to measure
+GENERIC_LAG_SQL = text("SELECT 0")
+
+
+class Replica:
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.engine = create_async_engine(
+            to_async_url(url), echo=DB_ECHO, pool_pre_ping=True, pool_size=10, max_overflow=20
+        )
+        self.healthy = False
+        self.lag: Optional[float] = None
+        self.reads = 0
+        self.failed_checks = 0
+
+        @event.listens_for(self.engine.sync_engine, "handle_error")
+        def _on_error(context) -> None:
+            if context.is_disconnect:
+                self.healthy = False
+
+    async def _measure_lag(self) -> float:
+        lag_sql = POSTGRES_LAG_SQL if self.engine.dialect.name == "postgresql" else GENERIC_LAG_SQL
+        async with self.engine.connect() as conn:
+            return float(await conn.scalar(lag_sql) or 0)
+
+    async def check(self, max_lag: float, timeout: float) -> None:
+        try:
+            lag = await asyncio.wait_for(self._measure_lag(), timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            self.failed_checks += 1
+            if self.healthy:
+                logger.warning("Replica %s failed its health check: %s", self.name, exc)
+            self.healthy, self.lag = False, None
+            return
+
+        self.lag = lag
+        healthy = self.lag <= max_lag
+        if healthy != self.healthy:
+            logger.info(
+                "Replica %s is now %s (lag %.1fs)",
+                self.name,
+                "serving reads" if healthy else "excluded",
+                self.lag,
+            )
+        self.healthy = healthy
+
+    def stats(self) -> dict:
+        return {
+            "healthy": int(self.healthy),
+            "lag_seconds": self.lag if self.lag is not None else -1,
+            "reads": self.reads,
+            "failed_checks": self.failed_checks,
+        }
+
+
+class ReplicaRouter:
+    def __init__(
+        self,
+        primary: AsyncEngine,
+        urls: List[str],
+        max_lag: float,
+        sticky_seconds: float,
+    ):
+        self.primary = primary
+        self.replicas = [Replica(f"replica{i}", url) for i, url in enumerate(urls)]
+        self.max_lag = max_lag
+        self.sticky_seconds = sticky_seconds
+        self._next = itertools.count()
+        # user id -> monotonic deadline until which that user's reads use the primary
+        self._sticky: Dict[int, float] = {}
+        self._sticky_all_until = 0.0
+        self.primary_reads = 0
+
+    # Routing
+
+    def choose(self, user_id: Optional[int] = None) -> Engine:
+        """Engine for a read session's SELECTs (sync engine, as Session binds need)."""
+        now = time.monotonic()
+        if now < self._sticky_all_until or (
+            user_id is not None and self._sticky.get(user_id, 0.0) > now
+        ):
+            self.primary_reads += 1
+            return self.primary.sync_engine
+
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            self.primary_reads += 1
+            return self.primary.sync_engine
+
+        replica = healthy[next(self._next) % len(healthy)]
+        replica.reads += 1
+        return replica.engine.sync_engine
+
+    def mark_written(self, user_ids) -> None:
+        """Pin reads of ``user_ids`` (``None`` among them = everyone) to the primary."""
+        until = time.monotonic() + self.sticky_seconds
+        for user_id in user_ids:
+            if user_id is None:
+                self._sticky_all_until = until
+            else:
+                self._sticky[user_id] = until
+
+        if len(self._sticky) > 10000:
+            now = time.monotonic()
+            self._sticky = {key: value for key, value in self._sticky.items() if value > now}
+
+    # Health
+
+    async def check(self) -> None:
+        timeout = max(settings.REPLICA_HEALTH_INTERVAL_SECONDS, 1.0)
+        await asyncio.gather(*(replica.check(self.max_lag, timeout) for replica in self.replicas))
+
+    async def run_forever(self, interval: Optional[float] = None) -> None:
+        interval = settings.REPLICA_HEALTH_INTERVAL_SECONDS if interval is None else interval
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.check()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Replica health check failed")
+
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def stats(self) -> dict:
+        return {
+            "replicas": len(self.replicas),
+            "healthy": sum(replica.healthy for replica in self.replicas),
+            "primary_reads": self.primary_reads,
+            "sticky_users": len(self._sticky),
+        }
+
+
+replica_router = ReplicaRouter(
+    async_engine,
+    settings.DATABASE_REPLICA_URLS,
+    max_lag=settings.REPLICA_MAX_LAG_SECONDS,
+    sticky_seconds=settings.REPLICA_STICKY_SECONDS,
+)
+
+
+_WROTE_KEY = "replica_wrote"
+_USER_KEY = "replica_user_id"
+_REPLICA_KEY = "replica_bind"
+_STICKY_KEY = "replica_sticky_users"
+
+
+class RoutingSession(Session):
+    """Session sending SELECTs to ``replica_router`` until the session first writes."""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (
+            self._flushing
+            or self.info.get(_WROTE_KEY)
+            or not isinstance(clause, (Select, CompoundSelect))
+        ):
+            return replica_router.primary.sync_engine
+
+        # One replica per session, so a request reads one consistent snapshot
+        bind = self.info.get(_REPLICA_KEY)
+        if bind is None:
+            bind = self.info[_REPLICA_KEY] = replica_router.choose(self.info.get(_USER_KEY))
+        return bind
+
+
+ReadSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+
+async def get_read_db(
+    db: AsyncSession = Depends(get_async_db),
+) -> AsyncGenerator[AsyncSession, None]:
+    """Session for read-mostly dependencies; writes through it still reach the primary."""
+    if not replica_router.replicas:
+        yield db
+        return
+
+    async with ReadSessionLocal() as read_db:
+        yield read_db
+
+
+def read_as_user(db: AsyncSession, user_id: int) -> None:
+    """Route ``db``'s reads as ``user_id``'s, so their recent writes are visible."""
+    db.info[_USER_KEY] = user_id
+
+
+# Read-your-writes bookkeeping, applied once the writing transaction commits
+
+
+def _record_user_write(mapper, connection, target) -> None:
+    session = inspect(target).session
+    if session is not None:
+        session.info.setdefault(_STICKY_KEY, set()).add(target.id)
+
+
+def _mark_session_wrote(session: Session, flush_context) -> None:
+    session.info[_WROTE_KEY] = True
+
+
+def _bulk_user_ids(statement) -> Optional[Set[int]]:
+    """Ids a bulk UPDATE/DELETE of users is limited to by a top-level ``User.id == x``
+    or ``User.id.in_(...)`` condition; None when it may touch anyone."""
+    where = statement.whereclause
+    if where is None:
+        return None
+    criteria = where.clauses if where.operator is operators.and_ else [where]
+    for criterion in criteria:
+        left = getattr(criterion, "left", None)
+        right = getattr(criterion, "right", None)
+        if (
+            getattr(left, "table", None) is not User.__table__
+            or left.key != "id"
+            or not isinstance(right, BindParameter)
+        ):
+            continue
+        if criterion.operator is operators.eq:
+            return {right.value}
+        if criterion.operator is operators.in_op:
+            return set(right.value)
+    return None
+
+
+def _record_bulk_write(orm_execute_state) -> None:
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    orm_execute_state.session.info[_WROTE_KEY] = True
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ is User:
+        # Pin just the users the statement names; everyone when it can't tell
+        user_ids = _bulk_user_ids(orm_execute_state.statement) or {None}
+        orm_execute_state.session.info.setdefault(_STICKY_KEY, set()).update(user_ids)
+
+
+def _apply_sticky(session: Session) -> None:
+    user_ids = session.info.pop(_STICKY_KEY, None)
+    if user_ids:
+        replica_router.mark_written(user_ids)
+
+
+def _discard_sticky(session: Session) -> None:
+    session.info.pop(_STICKY_KEY, None)
+
+
+if replica_router.replicas:
+    for _event in ("after_insert", "after_update", "after_delete"):
+        event.listen(User, _event, _record_user_write)
+    event.listen(RoutingSession, "after_flush", _mark_session_wrote)
+    event.listen(Session, "do_orm_execute", _record_bulk_write)
+    event.listen(Session, "after_commit", _apply_sticky)
+    event.listen(Session, "after_rollback", _discard_sticky)
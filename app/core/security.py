@@ -1,20 +1,176 @@
-from typing import Optional
-import bcrypt
+import asyncio
+import hashlib
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from fastapi import HTTPException, status
+from jose import ExpiredSignatureError, JWTError, jwt
+
+from app.core.cache import token_cache
 from app.core.config import settings
-from jose import jwt, JWTError, ExpiredSignatureError
+from app.core.hashing import hasher_registry
+from app.core.keys import key_ring
+from app.core.metrics import JWT_DURATION, PASSWORD_HASH_DURATION
 
 
 def hash_password(password: str) -> str:
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password.encode("utf-8"), salt)
-    return hashed.decode("utf-8")
+    return hasher_registry.hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return bcrypt.checkpw(
-        plain_password.encode("utf-8"), hashed_password.encode("utf-8")
-    )
+    return hasher_registry.verify(plain_password, hashed_password)
+
+
+def hash_passwords(passwords: List[str]) -> List[str]:
+    return [hasher_registry.hash(password) for password in passwords]
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Whether a verified hash should be replaced with one from the current hasher."""
+    return hasher_registry.needs_rehash(hashed_password)
+
+
+class PasswordHasherPool:
+    """Runs password hashing in a process pool so hashing never blocks the event loop.
+
+    At most ``max_pending`` operations may be queued or running at once; callers
+    beyond that get a 503 instead of piling up behind the pool.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._timings = {
+            op: {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0} for op in ("hash", "verify")
+        }
+        self._histograms = {op: PASSWORD_HASH_DURATION.labels(op) for op in self._timings}
+        self.rejected = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    async def _run(self, op: str, fn, *args):
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy. Please try again shortly.",
+                headers={"Retry-After": "1"},
+            )
+
+        self._pending += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self._pending -= 1
+            elapsed = time.perf_counter() - started
+            timing = self._timings[op]
+            timing["count"] += 1
+            timing["total_seconds"] += elapsed
+            timing["max_seconds"] = max(timing["max_seconds"], elapsed)
+            self._histograms[op].observe(elapsed)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run("verify", verify_password, plain_password, hashed_password)
+
+    async def hash_many(self, passwords: List[str], chunk_size: int = 8) -> List[str]:
+        """Hash many passwords (bulk import) across the pool, returned in order.
+
+        Work goes out in chunks, at most one per worker at a time, so a login
+        queued on the same pool waits behind one chunk at most. Bulk callers
+        wait for a free worker instead of being rejected by ``max_pending``.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        slots = asyncio.Semaphore(self.max_workers)
+        timing = self._timings["hash"]
+        histogram = self._histograms["hash"]
+
+        async def run(chunk: List[str]) -> List[str]:
+            async with slots:
+                self._pending += 1
+                started = time.perf_counter()
+                try:
+                    return await loop.run_in_executor(executor, hash_passwords, chunk)
+                finally:
+                    self._pending -= 1
+                    # Recorded per password, like single hashes
+                    elapsed = (time.perf_counter() - started) / len(chunk)
+                    timing["count"] += len(chunk)
+                    timing["total_seconds"] += elapsed * len(chunk)
+                    timing["max_seconds"] = max(timing["max_seconds"], elapsed)
+                    for _ in chunk:
+                        histogram.observe(elapsed)
+
+        chunks = []
+        for start in range(0, len(passwords), chunk_size):
+            end = start + chunk_size
+            chunks.append(passwords[start:end])
+        hashed = await asyncio.gather(*(run(chunk) for chunk in chunks))
+        return [password_hash for chunk in hashed for password_hash in chunk]
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "rejected": self.rejected,
+            "timings": {op: dict(timing) for op, timing in self._timings.items()},
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasherPool(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
+
+
+async def hash_password_async(password: str) -> str:
+    return await password_hasher.hash(password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.verify(plain_password, hashed_password)
+
+
+_jwt_encode_duration = JWT_DURATION.labels("encode")
+_jwt_decode_duration = JWT_DURATION.labels("decode")
+
+
+def _encode(claims: dict) -> str:
+    with _jwt_encode_duration.time():
+        if key_ring is None:
+            return jwt.encode(claims, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+        signing_key = key_ring.signing_key
+        return jwt.encode(
+            claims,
+            signing_key.sign_key,
+            algorithm=signing_key.algorithm,
+            headers={"kid": signing_key.kid},
+        )
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -26,35 +182,61 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
 
-    to_encode.update({"exp": expire, "type": "access"})
-    encoded_jwt = jwt.encode(
-        to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
+    to_encode.update(
+        {
+            "exp": expire,
+            "iat": datetime.now(timezone.utc),
+            "jti": uuid.uuid4().hex,
+            "type": "access",
+        }
     )
-
-    return encoded_jwt
+    return _encode(to_encode)
 
 
 def create_refresh_token(data: dict) -> str:
     to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + timedelta(
-        days=settings.REFRESH_TOKEN_EXPIRE_DAYS
-    )
-    to_encode.update({"exp": expire, "type": "refresh"})
-    encoded_jwt = jwt.encode(
-        to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
+    expire = datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    to_encode.update(
+        {
+            "exp": expire,
+            "iat": datetime.now(timezone.utc),
+            "jti": uuid.uuid4().hex,
+            "type": "refresh",
+        }
     )
-    return encoded_jwt
+    return _encode(to_encode)
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.strip().encode("utf-8")).hexdigest()
 
 
 def decode_token(token: str) -> Optional[dict]:
+    token = token.strip()
+    cache_key = hashlib.sha256(token.encode("utf-8")).digest()
+    cached = token_cache.get(cache_key)
+    if cached is not None:
+        return dict(cached)
+
+    with _jwt_decode_duration.time():
+        payload = _verify(token)
+    if payload is not None and "exp" in payload:
+        token_cache.set(cache_key, payload, ttl=payload["exp"] - time.time())
+        return dict(payload)
+
+    return payload
+
+
+def _verify(token: str) -> Optional[dict]:
     try:
-        payload = jwt.decode(
-            token.strip(),
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM],
-        )
+        if key_ring is None:
+            return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+
+        key = key_ring.get(jwt.get_unverified_header(token).get("kid"))
+        if key is None:
+            return None
 
-        return payload
+        return jwt.decode(token, key.verify_key, algorithms=[key.algorithm])
 
     except ExpiredSignatureError:
         return None
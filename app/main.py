@@ -1,7 +1,58 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
+from app.core.cache import introspection_cache, principal_cache, token_cache
 from app.core.config import settings
+from app.core.database import async_engine, engine
+from app.core.keys import key_ring
+from app.core.metrics import (
+    CONTENT_TYPE,
+    REGISTRY,
+    MetricsMiddleware,
+    PoolCollector,
+    StatsCollector,
+    instrument_engine,
+)
+from app.core.query_counter import QueryCountMiddleware, count_engine_queries
+from app.core.replicas import replica_router
+from app.core.security import password_hasher
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.v1 import auth, users
+from app.api.v1 import auth, permissions, users
+from app.services.email_queue import email_queue
+from app.services.permission_service import permission_resolver
+from app.services.purge_service import PurgeService
+from app.services.revocation_service import revocation_store
+from app.services.user_search_service import user_search_index
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await revocation_store.rebuild()
+    await replica_router.check()
+    background_tasks = [
+        asyncio.create_task(email_queue.run_forever()),
+        asyncio.create_task(revocation_store.run_forever()),
+    ]
+    if replica_router.replicas:
+        background_tasks.append(asyncio.create_task(replica_router.run_forever()))
+    if user_search_index.enabled:
+        await user_search_index.rebuild()
+        background_tasks.append(asyncio.create_task(user_search_index.run_forever()))
+    if settings.PURGE_INTERVAL_SECONDS > 0:
+        background_tasks.append(
+            asyncio.create_task(PurgeService.run_forever(settings.PURGE_INTERVAL_SECONDS))
+        )
+
+    yield
+
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    password_hasher.shutdown()
+    await replica_router.dispose()
+    await async_engine.dispose()
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -10,6 +61,7 @@ app = FastAPI(
     openapi_url=f"{settings.API_V1_PREFIX}/openapi.json",
     docs_url=f"{settings.API_V1_PREFIX}/docs",
     redoc_url=f"{settings.API_V1_PREFIX}/redoc",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -20,6 +72,98 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(QueryCountMiddleware)
+count_engine_queries(engine)
+count_engine_queries(async_engine.sync_engine)
+for replica in replica_router.replicas:
+    count_engine_queries(replica.engine.sync_engine)
+
+if settings.METRICS_ENABLED:
+    # Outermost, so latency includes every other middleware
+    app.add_middleware(MetricsMiddleware)
+    instrument_engine(engine, "sync")
+    instrument_engine(async_engine.sync_engine, "async")
+    replica_engines = {
+        replica.name: replica.engine.sync_engine for replica in replica_router.replicas
+    }
+    for name, replica_engine in replica_engines.items():
+        instrument_engine(replica_engine, name)
+
+    REGISTRY.register(
+        PoolCollector({"sync": engine, "async": async_engine.sync_engine, **replica_engines})
+    )
+    if replica_router.replicas:
+        REGISTRY.register(
+            StatsCollector(
+                "auth_db_replica",
+                "Read replica",
+                {replica.name: replica.stats for replica in replica_router.replicas},
+                label="replica",
+                counters=("reads", "failed_checks"),
+            )
+        )
+        REGISTRY.register(
+            StatsCollector(
+                "auth_db_read_routing",
+                "Read session routing",
+                {"default": replica_router.stats},
+                label="router",
+                counters=("primary_reads",),
+            )
+        )
+    REGISTRY.register(
+        StatsCollector(
+            "auth_cache",
+            "In-process cache",
+            {
+                "principal": principal_cache.stats,
+                "token": token_cache.stats,
+                "introspection": introspection_cache.stats,
+                "permission": permission_resolver.stats,
+                "permission_catalog": lambda: permission_resolver.stats()["catalogs"],
+            },
+            label="cache",
+            counters=("hits", "misses", "evictions"),
+        )
+    )
+    REGISTRY.register(
+        StatsCollector(
+            "auth_password_hasher",
+            "bcrypt process pool",
+            {"default": password_hasher.stats},
+            label="pool",
+            counters=("rejected",),
+        )
+    )
+    REGISTRY.register(
+        StatsCollector(
+            "auth_email_outbox",
+            "Email outbox dispatcher",
+            {"default": email_queue.stats},
+            label="queue",
+            counters=("sent", "failed", "retried"),
+        )
+    )
+    REGISTRY.register(
+        StatsCollector(
+            "auth_revocation",
+            "Access-token revocation filter",
+            {"default": revocation_store.stats},
+            label="store",
+            counters=("checks", "filter_hits", "confirmed_revoked"),
+        )
+    )
+    if user_search_index.enabled:
+        REGISTRY.register(
+            StatsCollector(
+                "auth_user_search_index",
+                "In-process user search index",
+                {"default": user_search_index.stats},
+                label="index",
+                counters=("searches",),
+            )
+        )
+
 
 # Root endpoint
 @app.get("/", tags=["Root"])
@@ -40,7 +184,26 @@ def health_check():
     return {"status": "healthy", "service": "auth-service", "version": settings.VERSION}
 
 
+# Prometheus scrape target; async so it renders on the event loop that updates the metrics
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+async def metrics():
+    if not settings.METRICS_ENABLED:
+        return Response(status_code=404)
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+# Public signing keys for resource servers verifying tokens locally
+@app.get("/.well-known/jwks.json", tags=["Auth"])
+def jwks(response: Response):
+    """JSON Web Key Set with every key currently accepted for verification"""
+    response.headers["Cache-Control"] = "public, max-age=300"
+    return key_ring.jwks() if key_ring is not None else {"keys": []}
+
+
 app.include_router(auth.router, prefix=f"{settings.API_V1_PREFIX}/auth", tags=["Auth"])
 app.include_router(
     users.router, prefix=f"{settings.API_V1_PREFIX}/users", tags=["User"]
 )
+app.include_router(
+    permissions.router, prefix=f"{settings.API_V1_PREFIX}/permissions", tags=["Permission"]
+)
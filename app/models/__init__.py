@@ -3,6 +3,8 @@ from app.models.app import App, Page
 from app.models.role import Role, UserAppRole
 from app.models.permission import Permission
 from app.models.otp import OTP
+from app.models.email_outbox import EmailOutbox
+from app.models.revoked_token import RevokedToken
 
 __all__ = [
     "User",
@@ -13,4 +15,6 @@ __all__ = [
     "UserAppRole",
     "Permission",
     "OTP",
+    "EmailOutbox",
+    "RevokedToken",
 ]
\ No newline at end of file
@@ -0,0 +1,22 @@
+from sqlalchemy import JSON, Column, DateTime, Index, Integer, String, Text, func
+from app.core.database import Base
+
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(50), nullable=False)
+    recipient = Column(String(255), nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(String(20), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False)
+    last_error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        # Workers claim due rows in id order
+        Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, DateTime, Integer, String, func
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, String, func
 from app.core.database import Base
 
 
@@ -6,10 +6,22 @@ class OTP(Base):
     __tablename__ = "otps"
 
     id = Column(Integer, primary_key=True, index=True)
-    identifier = Column(String(255), nullable=False, index=True)
+    identifier = Column(String(255), nullable=False)
     code = Column(String(6), nullable=False)
     purpose = Column(String(50), nullable=False)
     attempts = Column(Integer, default=0)
     is_verified = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     expires_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        # Matches the "latest unverified OTP for identifier/purpose" lookups
+        Index(
+            "ix_otps_identifier_purpose_verified_created",
+            "identifier",
+            "purpose",
+            "is_verified",
+            "created_at",
+        ),
+        Index("ix_otps_expires_at", "expires_at"),
+    )
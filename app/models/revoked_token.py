@@ -0,0 +1,25 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String
+from app.core.database import Base
+
+
+class RevokedToken(Base):
+    """Revoked access tokens, kept until the token would have expired anyway.
+
+    A row with a ``jti`` revokes that single token. A row without one revokes
+    every token of ``user_id`` issued before ``revoked_at`` (password change
+    or reset).
+    """
+
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    jti = Column(String(64), unique=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    revoked_at = Column(DateTime(timezone=True), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        # Workers sync recent revocations; the purge job drops expired ones
+        Index("ix_revoked_tokens_revoked_at", "revoked_at"),
+        Index("ix_revoked_tokens_expires_at", "expires_at"),
+    )
@@ -1,4 +1,13 @@
-from sqlalchemy import Column, ForeignKey, Integer, String, Boolean, DateTime
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    text,
+)
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -23,6 +32,22 @@ class User(Base):
         "RefreshToken", back_populates="user", cascade="all, delete-orphan"
     )
 
+    __table_args__ = (
+        # Substring / similarity search over users (pg_trgm, Postgres only)
+        Index(
+            "ix_users_username_trgm",
+            func.lower(username).label("username_lower"),
+            postgresql_using="gin",
+            postgresql_ops={"username_lower": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_users_email_trgm",
+            func.lower(email).label("email_lower"),
+            postgresql_using="gin",
+            postgresql_ops={"email_lower": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
+
 
 class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
@@ -31,8 +56,20 @@ class RefreshToken(Base):
     user_id = Column(
         Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
     )
-    token = Column(String(255), unique=True, nullable=False, index=True)
+    # SHA-256 hex digest of the refresh JWT; the token itself is never stored
+    token_hash = Column(String(64), unique=True, nullable=False, index=True)
     expires_at = Column(DateTime(timezone=True), nullable=False)
     revoked = Column(Boolean, default=False)
 
+    __table_args__ = (
+        # Bulk revocation on password change/reset only touches live tokens
+        Index(
+            "ix_refresh_tokens_user_id_active",
+            "user_id",
+            postgresql_where=text("revoked IS FALSE"),
+            sqlite_where=text("revoked IS 0"),
+        ),
+        Index("ix_refresh_tokens_expires_at", "expires_at"),
+    )
+
     user = relationship("User", back_populates="refresh_tokens")
@@ -16,8 +16,27 @@ from .auth import (
     ResetPasswordResponse,
     ResendOTPRequest,
     ResendOTPResponse,
+    IntrospectionResponse,
+    IntrospectionBatchRequest,
+    IntrospectionBatchResponse,
+)
+from .permission import (
+    PermissionBatchCheckRequest,
+    PermissionBatchCheckResponse,
+    PermissionCatalogResponse,
+    PermissionCheckItem,
+    PermissionCheckResponse,
+)
+from .user import (
+    UserResponse,
+    UserUpdate,
+    UserListResponse,
+    UserListPage,
+    UserSearchResponse,
+    UserImportRow,
+    UserImportError,
+    UserImportResponse,
 )
-from .user import UserResponse, UserUpdate, UserListResponse
 
 __all__ = [
     # Auth schemas
@@ -38,8 +57,22 @@ __all__ = [
     "ResetPasswordResponse",
     "ResendOTPRequest",
     "ResendOTPResponse",
+    "IntrospectionResponse",
+    "IntrospectionBatchRequest",
+    "IntrospectionBatchResponse",
+    # Permission schemas
+    "PermissionBatchCheckRequest",
+    "PermissionBatchCheckResponse",
+    "PermissionCatalogResponse",
+    "PermissionCheckItem",
+    "PermissionCheckResponse",
     # User schemas
     "UserResponse",
     "UserUpdate",
     "UserListResponse",
+    "UserListPage",
+    "UserSearchResponse",
+    "UserImportRow",
+    "UserImportError",
+    "UserImportResponse",
 ]
@@ -1,5 +1,23 @@
-from typing import Optional
-from pydantic import BaseModel, EmailStr, Field, field_validator
+from typing import Annotated, List, Optional
+
+from pydantic import AfterValidator, BaseModel, EmailStr, Field, field_validator
+
+from app.core.hashing import hasher_registry
+
+
+def check_new_password(password: str) -> str:
+    """Reject a new password the configured hashing scheme can't take.
+
+    The limit depends on PASSWORD_HASH_SCHEME, so it can't be a ``Field``
+    constraint; every schema that sets a password goes through this.
+    """
+    error = hasher_registry.password_error(password)
+    if error is not None:
+        raise ValueError(error)
+    return password
+
+
+NewPassword = Annotated[str, Field(min_length=8), AfterValidator(check_new_password)]
 
 
 class SignupRequestSchema(BaseModel):
@@ -16,7 +34,7 @@ class SignupRequestResponse(BaseModel):
 class VerifyOTPSchema(BaseModel):
     email: EmailStr
     otp: str = Field(..., min_length=6, max_length=6)
-    password: str = Field(..., min_length=8)
+    password: NewPassword
 
 
 class SignupCompleteResponse(BaseModel):
@@ -29,6 +47,8 @@ class SignupCompleteResponse(BaseModel):
 class LoginRequest(BaseModel):
     email: EmailStr
     password: str
+    # App code; when set, the access token carries the user's grants in that app
+    app: Optional[str] = None
 
 
 class TokenResponse(BaseModel):
@@ -74,7 +94,7 @@ class ForgotPasswordResponse(BaseModel):
 class ResetPasswordRequest(BaseModel):
     email: EmailStr
     otp: str = Field(..., min_length=6, max_length=6)
-    new_password: str = Field(..., min_length=8)
+    new_password: NewPassword
 
 
 class ResetPasswordResponse(BaseModel):
@@ -92,6 +112,21 @@ class ResendOTPResponse(BaseModel):
     retry_after: Optional[int] = None
 
 
+class IntrospectionResponse(BaseModel):
+    active: bool
+    sub: Optional[str] = None
+    exp: Optional[int] = None
+    type: Optional[str] = None
+
+
+class IntrospectionBatchRequest(BaseModel):
+    tokens: List[str] = Field(..., min_length=1)
+
+
+class IntrospectionBatchResponse(BaseModel):
+    results: List[IntrospectionResponse]
+
+
 class ChangePasswordRequest(BaseModel):
     current_password: str
     new_password: str
@@ -100,9 +135,9 @@ class ChangePasswordRequest(BaseModel):
     @field_validator("new_password")
     @classmethod
     def validate_new_password(cls, v: str) -> str:
-        if len(v) > 8:
+        if len(v) < 8:
             raise ValueError("New password must be at least 8 characters long")
-        return v
+        return check_new_password(v)
 
     @field_validator("confirm_new_password")
     @classmethod
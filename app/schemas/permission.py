@@ -0,0 +1,39 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class PermissionCheckResponse(BaseModel):
+    app: str
+    page: str
+    action: str
+    allowed: bool
+
+
+class PermissionCatalogResponse(BaseModel):
+    app: str
+    version: str
+    encoding: str
+    # Bit for (page, action) = pages.index(page) * len(actions) + actions.index(action)
+    pages: List[str]
+    actions: List[str]
+
+
+class PermissionCheckItem(BaseModel):
+    app: str
+    page: str
+    action: str
+
+
+class PermissionBatchCheckRequest(BaseModel):
+    # Defaults to the token's user; checking someone else requires the admin grant
+    user_id: Optional[int] = None
+    checks: List[PermissionCheckItem] = Field(..., min_length=1, max_length=1000)
+
+
+class PermissionBatchCheckResponse(BaseModel):
+    user_id: int
+    count: int
+    encoding: str
+    # Bit i answers checks[i]
+    results: str
@@ -1,7 +1,10 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
+
 from pydantic import BaseModel, EmailStr
 
+from app.schemas.auth import NewPassword, SignupRequestSchema
+
 
 class UserResponse(BaseModel):
     id: int
@@ -24,3 +27,41 @@ class UserListResponse(BaseModel):
     username: str
     email: EmailStr
     is_active: bool
+    email_verified: bool
+    created_at: Optional[datetime] = None
+
+
+class UserListPage(BaseModel):
+    items: List[UserListResponse]
+    # Pass as ``after`` to get the next page; null on the last page
+    next_cursor: Optional[int] = None
+
+
+class UserSearchResponse(BaseModel):
+    items: List[UserListResponse]
+    # More users matched than were returned; refine the query
+    truncated: bool
+
+
+class UserImportRow(SignupRequestSchema):
+    """One row of a bulk import; same rules as signup (email, username) and password."""
+
+    password: NewPassword
+    is_active: bool = True
+    # Imported accounts come from a customer's own directory, so they skip OTP verification
+    email_verified: bool = True
+
+
+class UserImportError(BaseModel):
+    line: int
+    error: str
+
+
+class UserImportResponse(BaseModel):
+    dry_run: bool
+    processed: int
+    created: int
+    duplicates: int
+    invalid: int
+    errors: List[UserImportError]
+    errors_truncated: bool
@@ -1,7 +1,24 @@
 from .auth_service import AuthService
+from .email_queue import EmailQueue
 from .email_service import EmailService
+from .introspection_service import IntrospectionService
+from .permission_service import PermissionResolver
+from .purge_service import PurgeService
+from .revocation_service import RevocationStore
+from .user_directory_service import UserDirectoryService
+from .user_search_service import UserSearchIndex, UserSearchService
+from .user_import_service import UserImportService
 
 __all__ = [
     "AuthService",
+    "EmailQueue",
     "EmailService",
+    "IntrospectionService",
+    "PermissionResolver",
+    "PurgeService",
+    "RevocationStore",
+    "UserDirectoryService",
+    "UserSearchIndex",
+    "UserSearchService",
+    "UserImportService",
 ]
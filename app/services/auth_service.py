@@ -1,54 +1,100 @@
+import asyncio
+import contextvars
+import logging
 from datetime import datetime, timedelta, timezone
-from sqlalchemy.orm import Session
+from typing import Optional, Set
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.user import RefreshToken, User
-from app.models.otp import OTP
+from app.core.cache import principal_cache
 from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import PASSWORD_REHASHES
 from fastapi import HTTPException, status
 
+from app.services.email_queue import EmailQueue, email_queue
 from app.services.email_service import EmailService
+from app.services.introspection_service import IntrospectionService
+from app.services.otp_store import (
+    OTPIssueStatus,
+    OTPVerification,
+    OTPVerifyStatus,
+    otp_store,
+)
+from app.services.permission_service import permission_resolver
+from app.services.revocation_service import revocation_store
 from app.core.security import (
     create_access_token,
     create_refresh_token,
     decode_token,
-    hash_password,
-    verify_password,
+    hash_password_async,
+    hash_token,
+    password_needs_rehash,
+    verify_password_async,
 )
-from app.core.constants import OTPPurposeEnum
+from app.core.constants import OTP_MAX_ATTEMPTS, OTP_MAX_RESENDS, OTPPurposeEnum
+from app.utils.datetime_utils import ensure_utc
+
+logger = logging.getLogger(__name__)
+
+# The event loop only keeps weak references to tasks; hold fire-and-forget ones here
+_background_tasks: Set[asyncio.Task] = set()
 
 
 class AuthService:
     @staticmethod
-    async def request_signup_otp(email: str, username: str, db: Session) -> dict:
-        existing_user = db.query(User).filter(User.email == email).first()
+    def _raise_for_otp(verification: OTPVerification, expired_detail: str) -> None:
+        if verification.status == OTPVerifyStatus.NOT_FOUND:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="OTP not found or already used",
+            )
+
+        if verification.status == OTPVerifyStatus.EXPIRED:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=expired_detail
+            )
+
+        if verification.status == OTPVerifyStatus.TOO_MANY_ATTEMPTS:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many failed attempts. Please request a new OTP.",
+            )
+
+        if verification.status == OTPVerifyStatus.INVALID:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid OTP. {verification.attempts_remaining} attempts remaining.",
+            )
+
+    @staticmethod
+    async def request_signup_otp(email: str, username: str, db: AsyncSession) -> dict:
+        existing_user = await db.scalar(select(User).where(User.email == email))
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already registered",
             )
 
-        existing_username = db.query(User).filter(User.username == username).first()
+        existing_username = await db.scalar(select(User).where(User.username == username))
         if existing_username:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST, detail="Username already taken"
             )
 
         otp_code = EmailService.generate_otp()
-
-        db.query(OTP).filter(
-            OTP.identifier == email, OTP.purpose == OTPPurposeEnum.SIGNUP
-        ).delete()
-
-        otp_record = OTP(
-            identifier=email,
-            code=otp_code,
-            purpose=OTPPurposeEnum.SIGNUP,
-            expires_at=datetime.now(timezone.utc)
-            + timedelta(minutes=settings.OTP_EXPIRE_MINUTES),
+        await otp_store.issue(
+            email,
+            OTPPurposeEnum.SIGNUP,
+            otp_code,
+            ttl_seconds=settings.OTP_EXPIRE_MINUTES * 60,
         )
-        db.add(otp_record)
-        db.commit()
 
-        await EmailService.send_otp_email(email, otp_code, OTPPurposeEnum.SIGNUP)
+        EmailQueue.enqueue(
+            db, "otp", email, otp=otp_code, purpose=OTPPurposeEnum.SIGNUP.value
+        )
+        await db.commit()
+        email_queue.notify()
 
         return {
             "message": "OTP sent to your email",
@@ -58,65 +104,64 @@ class AuthService:
 
     @staticmethod
     async def verify_otp_and_signup(
-        email: str, otp: str, password: str, username: str, db: Session
+        email: str, otp: str, password: str, username: str, db: AsyncSession
     ) -> User:
-        otp_record = (
-            db.query(OTP)
-            .filter(
-                OTP.identifier == email,
-                OTP.purpose == OTPPurposeEnum.SIGNUP,
-                OTP.is_verified.is_(False),
-            )
-            .order_by(OTP.created_at.desc())
-            .first()
+        # Hashed before verify takes the OTP locks, which are held until commit
+        password_hash = await hash_password_async(password)
+        verification = await otp_store.verify(
+            email, OTPPurposeEnum.SIGNUP, otp, max_attempts=OTP_MAX_ATTEMPTS, db=db
         )
-
-        if not otp_record:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="OTP not found or already used",
-            )
-
-        if datetime.now(timezone.utc) > otp_record.expires_at:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="OTP has expired. Please request a new OTP.",
-            )
-
-        if otp_record.attempts >= 5:
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail="Too many failed attempts. Please request a new OTP.",
-            )
-
-        if otp_record.code != otp:
-            otp_record.attempts += 1
-            db.commit()
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Invalid OTP. {5 - otp_record.attempts} attempts remaining.",
-            )
-
-        new_user = User(
-            username=username,
-            email=email,
-            password_hash=hash_password(password),
-            is_active=True,
-            email_verified=True,
+        AuthService._raise_for_otp(
+            verification, expired_detail="OTP has expired. Please request a new OTP."
         )
-        db.add(new_user)
-
-        otp_record.is_verified = True
-        db.commit()
-        db.refresh(new_user)
 
-        await EmailService.send_welcome_email(email, username)
+        # The code stays used up only if the user is created
+        try:
+            new_user = User(
+                username=username,
+                email=email,
+                password_hash=password_hash,
+                is_active=True,
+                email_verified=True,
+            )
+            db.add(new_user)
+            EmailQueue.enqueue(db, "welcome", email, username=username)
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            await otp_store.restore(email, OTPPurposeEnum.SIGNUP, verification)
+            raise
+        email_queue.notify()
+        await db.refresh(new_user)
 
         return new_user
 
     @staticmethod
-    def login(email: str, password: str, db: Session) -> dict:
-        user = db.query(User).filter(User.email == email).first()
+    async def _token_claims(user_id: int, app: Optional[str], db: AsyncSession) -> tuple:
+        """Claims for an access/refresh token pair, scoped to ``app`` when given.
+
+        App-scoped access tokens carry the user's grants in that app as a bitset
+        over the app's published permission catalog; the refresh token keeps the
+        app so refreshed access tokens are re-scoped with current grants.
+        """
+        access_claims = {"sub": str(user_id)}
+        refresh_claims = {"sub": str(user_id)}
+        if app is None:
+            return access_claims, refresh_claims
+
+        permissions = await permission_resolver.permissions(db, user_id, app)
+        if permissions is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="App not found")
+
+        access_claims.update(permissions.to_claims())
+        refresh_claims["app"] = app
+        return access_claims, refresh_claims
+
+    @staticmethod
+    async def login(
+        email: str, password: str, db: AsyncSession, app: Optional[str] = None
+    ) -> dict:
+        user = await db.scalar(select(User).where(User.email == email))
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid credentials"
@@ -128,7 +173,7 @@ class AuthService:
                 detail="Please verify your email first",
             )
 
-        if not verify_password(password, str(user.password_hash)):
+        if not await verify_password_async(password, str(user.password_hash)):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials"
             )
@@ -138,17 +183,28 @@ class AuthService:
                 status_code=status.HTTP_403_FORBIDDEN, detail="Account is deactivated"
             )
 
-        access_token = create_access_token(data={"sub": str(user.id)})
-        refresh_token = create_refresh_token(data={"sub": str(user.id)})
+        if settings.PASSWORD_REHASH_ON_LOGIN and password_needs_rehash(str(user.password_hash)):
+            # Off the request path, in a fresh context so its queries aren't
+            # charged to this request's query budget
+            task = asyncio.create_task(
+                AuthService._upgrade_password_hash(user.id, str(user.password_hash), password),
+                context=contextvars.Context(),
+            )
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+
+        access_claims, refresh_claims = await AuthService._token_claims(user.id, app, db)
+        access_token = create_access_token(data=access_claims)
+        refresh_token = create_refresh_token(data=refresh_claims)
 
         refresh_token_record = RefreshToken(
             user_id=user.id,
-            token=refresh_token,
+            token_hash=hash_token(refresh_token),
             expires_at=datetime.now(timezone.utc)
             + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
         )
         db.add(refresh_token_record)
-        db.commit()
+        await db.commit()
 
         return {
             "message": "Login successful",
@@ -161,7 +217,33 @@ class AuthService:
         }
 
     @staticmethod
-    def logout(refresh_token: str, user_id: str, db: Session) -> dict:
+    async def _upgrade_password_hash(user_id: int, old_hash: str, password: str) -> None:
+        """Re-hash with the current hasher unless the password changed in the meantime."""
+        try:
+            new_hash = await hash_password_async(password)
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    update(User)
+                    .where(User.id == user_id, User.password_hash == old_hash)
+                    .values(password_hash=new_hash)
+                )
+                await db.commit()
+        except HTTPException:
+            # Hasher pool saturated; the next login tries again
+            PASSWORD_REHASHES.labels("deferred").inc()
+        except Exception:
+            PASSWORD_REHASHES.labels("failed").inc()
+            logger.exception("Password rehash for user %s failed", user_id)
+        else:
+            PASSWORD_REHASHES.labels("upgraded" if result.rowcount else "skipped").inc()
+
+    @staticmethod
+    async def logout(
+        refresh_token: str,
+        user_id: str,
+        db: AsyncSession,
+        access_payload: Optional[dict] = None,
+    ) -> dict:
         payload = decode_token(refresh_token)
         if not payload:
             raise HTTPException(
@@ -173,23 +255,28 @@ class AuthService:
                 status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token type"
             )
 
-        token_record = (
-            db.query(RefreshToken)
-            .filter(
-                RefreshToken.token == refresh_token,
-                RefreshToken.user_id == user_id,
+        token_record = await db.scalar(
+            select(RefreshToken)
+            .where(
+                RefreshToken.token_hash == hash_token(refresh_token),
+                RefreshToken.user_id == int(user_id),
                 RefreshToken.revoked.is_(False),
             )
-            .first()
         )
 
         token_record.revoked = True
-        db.commit()
+        revoked_access = None
+        if access_payload and access_payload.get("jti"):
+            revoked_access = revocation_store.revoke(db, access_payload)
+        await db.commit()
+        IntrospectionService.invalidate(refresh_token)
+        if revoked_access is not None:
+            revocation_store.remember(revoked_access)
 
         return {"message": "Logged out successfully"}
 
     @staticmethod
-    def refresh_access_token(refresh_token: str, db: Session) -> dict:
+    async def refresh_access_token(refresh_token: str, db: AsyncSession) -> dict:
         payload = decode_token(refresh_token)
         if not payload:
             raise HTTPException(
@@ -208,14 +295,13 @@ class AuthService:
                 status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload"
             )
 
-        token_record = (
-            db.query(RefreshToken)
-            .filter(
-                RefreshToken.token == refresh_token,
+        token_record = await db.scalar(
+            select(RefreshToken)
+            .where(
+                RefreshToken.token_hash == hash_token(refresh_token),
                 RefreshToken.user_id == user_id,
                 RefreshToken.revoked.is_(False),
             )
-            .first()
         )
 
         if not token_record:
@@ -224,13 +310,13 @@ class AuthService:
                 detail="Refresh token not found or has been revoked",
             )
 
-        if datetime.now(timezone.utc) > token_record.expires_at:
+        if datetime.now(timezone.utc) > ensure_utc(token_record.expires_at):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Refresh token has expired. Please login again.",
             )
 
-        user = db.query(User).filter(User.id == user_id).first()
+        user = await db.scalar(select(User).where(User.id == user_id))
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
@@ -241,20 +327,24 @@ class AuthService:
                 status_code=status.HTTP_403_FORBIDDEN, detail="User account is inactive"
             )
 
-        new_access_token = create_access_token(data={"sub": str(user.id)})
+        access_claims, refresh_claims = await AuthService._token_claims(
+            user.id, payload.get("app"), db
+        )
+        new_access_token = create_access_token(data=access_claims)
 
-        new_refresh_token = create_refresh_token(data={"sub": str(user.id)})
+        new_refresh_token = create_refresh_token(data=refresh_claims)
 
         token_record.revoked = True
 
         new_token_record = RefreshToken(
             user_id=user.id,
-            token=new_refresh_token,
+            token_hash=hash_token(new_refresh_token),
             expires_at=datetime.now(timezone.utc)
             + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
         )
         db.add(new_token_record)
-        db.commit()
+        await db.commit()
+        IntrospectionService.invalidate(refresh_token)
 
         return {
             "access_token": new_access_token,
@@ -263,8 +353,8 @@ class AuthService:
         }
 
     @staticmethod
-    async def request_password_reset(email: str, db: Session) -> dict:
-        user = db.query(User).filter(User.email == email).first()
+    async def request_password_reset(email: str, db: AsyncSession) -> dict:
+        user = await db.scalar(select(User).where(User.email == email))
 
         if not user:
             return {
@@ -274,22 +364,16 @@ class AuthService:
             }
 
         otp_code = EmailService.generate_otp()
-
-        db.query(OTP).filter(
-            OTP.identifier == email, OTP.purpose == OTPPurposeEnum.PASSWORD_RESET
-        ).delete()
-
-        otp_record = OTP(
-            identifier=email,
-            code=otp_code,
-            purpose=OTPPurposeEnum.PASSWORD_RESET,
-            expires_at=datetime.now(timezone.utc)
-            + timedelta(minutes=settings.OTP_EXPIRE_MINUTES),
+        await otp_store.issue(
+            email,
+            OTPPurposeEnum.PASSWORD_RESET,
+            otp_code,
+            ttl_seconds=settings.OTP_EXPIRE_MINUTES * 60,
         )
-        db.add(otp_record)
-        db.commit()
 
-        await EmailService.send_otp_email(email, otp_code, "password reset")
+        EmailQueue.enqueue(db, "otp", email, otp=otp_code, purpose="password reset")
+        await db.commit()
+        email_queue.notify()
 
         return {
             "message": "If your email is registered, you will receive a password reset code",
@@ -299,69 +383,53 @@ class AuthService:
 
     @staticmethod
     async def reset_password_with_otp(
-        email: str, otp: str, new_password: str, db: Session
+        email: str, otp: str, new_password: str, db: AsyncSession
     ) -> dict:
-        user = db.query(User).filter(User.email == email).first()
+        # Hashed before the session opens a transaction and verify takes the OTP
+        # locks, both held until commit
+        password_hash = await hash_password_async(new_password)
+        user = await db.scalar(select(User).where(User.email == email))
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
             )
 
-        otp_record = (
-            db.query(OTP)
-            .filter(
-                OTP.identifier == email,
-                OTP.purpose == OTPPurposeEnum.PASSWORD_RESET,
-                OTP.is_verified.is_(False),
-            )
-            .order_by(OTP.created_at.desc())
-            .first()
+        verification = await otp_store.verify(
+            email, OTPPurposeEnum.PASSWORD_RESET, otp, max_attempts=OTP_MAX_ATTEMPTS, db=db
+        )
+        AuthService._raise_for_otp(
+            verification, expired_detail="OTP has expired. Please request a new one."
         )
 
-        if not otp_record:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="OTP not found or already used",
-            )
-
-        if datetime.now(timezone.utc) > otp_record.expires_at:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="OTP has expired. Please request a new one.",
-            )
+        # The code stays used up only if the new password is saved
+        try:
+            user.password_hash = password_hash
 
-        if otp_record.attempts >= 5:
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail="Too many failed attempts. Please request a new OTP.",
+            await db.execute(
+                update(RefreshToken)
+                .where(RefreshToken.user_id == user.id, RefreshToken.revoked.is_(False))
+                .values(revoked=True)
             )
+            cutoff = revocation_store.revoke_user(db, user.id)
 
-        if otp_record.code != otp:
-            otp_record.attempts += 1
-            db.commit()
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Invalid OTP. {5 - otp_record.attempts} attempts remaining.",
+            EmailQueue.enqueue(
+                db, "password_reset_confirmation", email, username=str(user.username)
             )
-
-        user.password_hash = hash_password(new_password)
-
-        otp_record.is_verified = True
-
-        db.query(RefreshToken).filter(
-            RefreshToken.user_id == user.id, RefreshToken.revoked.is_(False)
-        ).update({"revoked": True})
-
-        db.commit()
-
-        await EmailService.send_password_reset_confirmation(email, str(user.username))
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            await otp_store.restore(email, OTPPurposeEnum.PASSWORD_RESET, verification)
+            raise
+        email_queue.notify()
+        revocation_store.remember(cutoff)
+        principal_cache.invalidate(user.id)
 
         return {
             "message": "Password reset successful. Please login with your new password."
         }
 
     @staticmethod
-    async def resend_otp(email: str, purpose: str, db: Session) -> dict:
+    async def resend_otp(email: str, purpose: str, db: AsyncSession) -> dict:
         if purpose not in [OTPPurposeEnum.SIGNUP, OTPPurposeEnum.PASSWORD_RESET]:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -369,7 +437,7 @@ class AuthService:
             )
 
         if purpose == OTPPurposeEnum.SIGNUP:
-            existing_user = db.query(User).filter(User.email == email).first()
+            existing_user = await db.scalar(select(User).where(User.email == email))
             if existing_user and existing_user.email_verified:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
@@ -377,96 +445,67 @@ class AuthService:
                 )
 
         if purpose == OTPPurposeEnum.PASSWORD_RESET:
-            user = db.query(User).filter(User.email == email).first()
+            user = await db.scalar(select(User).where(User.email == email))
             if not user:
                 return {
+                    "success": True,
                     "message": "If your email is registered, a new OTP has been sent",
-                    "email": email,
-                    "expires_in_minutes": 10,
+                    "retry_after": settings.RESEND_COOLDOWN_SECONDS,
                 }
 
-        existing_otp = (
-            db.query(OTP)
-            .filter(
-                OTP.identifier == email,
-                OTP.purpose == purpose,
-                OTP.is_verified.is_(False),
-            )
-            .order_by(OTP.created_at.desc())
-            .first()
+        # Enforced here whatever the rate limiter's settings; the route's limits
+        # only add per-address throttling across all OTP emails
+        otp_code = EmailService.generate_otp()
+        issued = await otp_store.issue(
+            email,
+            purpose,
+            otp_code,
+            ttl_seconds=settings.OTP_EXPIRE_MINUTES * 60,
+            cooldown_seconds=settings.RESEND_COOLDOWN_SECONDS,
+            max_issues=OTP_MAX_RESENDS,
+            window_seconds=settings.OTP_EXPIRE_MINUTES * 60,
         )
 
-        if existing_otp:
-            time_since_last = datetime.now(timezone.utc) - existing_otp.created_at
-            if time_since_last < timedelta(seconds=settings.RESEND_COOLDOWN_SECONDS):
-                retry_after = settings.RESEND_COOLDOWN_SECONDS - int(
-                    time_since_last.total_second()
-                )
-                raise HTTPException(
-                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                    detail=f"Please wait {retry_after} seconds before requesting another OTP",
-                )
-
-        recent_otps_count = (
-            db.query(OTP)
-            .filter(
-                OTP.identifier == email,
-                OTP.purpose == purpose,
-                OTP.created_at
-                > datetime.now(timezone.utc)
-                - timedelta(minutes=settings.OTP_EXPIRE_MINUTES),
+        if issued.status == OTPIssueStatus.COOLDOWN:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Please wait {issued.retry_after} seconds before requesting another OTP",
+                headers={"Retry-After": str(issued.retry_after)},
             )
-            .count()
-        )
 
-        if recent_otps_count >= 3:
+        if issued.status == OTPIssueStatus.LIMITED:
             raise HTTPException(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail="Too many OTP requests. Please try again in 10 minutes.",
+                detail=f"Too many OTP requests. Please try again in {issued.retry_after} seconds.",
+                headers={"Retry-After": str(issued.retry_after)},
             )
 
-        otp_code = EmailService.generate_otp()
-
-        db.query(OTP).filter(
-            OTP.identifier == email,
-            OTP.purpose == purpose,
-            OTP.is_verified.is_(False),
-        ).delete()
-
-        otp_record = OTP(
-            identifier=email,
-            code=otp_code,
-            purpose=purpose,
-            expires_at=datetime.now(timezone.utc)
-            + timedelta(minutes=settings.OTP_EXPIRE_MINUTES),
-        )
-        db.add(otp_record)
-        db.commit()
-
         purpose_text = (
             OTPPurposeEnum.SIGNUP
             if purpose == OTPPurposeEnum.SIGNUP
             else OTPPurposeEnum.PASSWORD_RESET
         )
-        await EmailService.send_otp_email(email, otp_code, purpose_text)
+        EmailQueue.enqueue(db, "otp", email, otp=otp_code, purpose=purpose_text.value)
+        await db.commit()
+        email_queue.notify()
 
         return {
+            "success": True,
             "message": f"A new OTP has been sent to {email}",
-            "email": email,
-            "expires_in_minutes": 10,
+            "retry_after": settings.RESEND_COOLDOWN_SECONDS,
         }
 
     @staticmethod
     async def change_password(
-        user_id: str, current_password: str, new_password: str, db: Session
+        user_id: str, current_password: str, new_password: str, db: AsyncSession
     ) -> dict:
-        user = db.query(User).filter(User.id == user_id).first()
+        user = await db.scalar(select(User).where(User.id == int(user_id)))
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
             )
 
-        if not verify_password(current_password, str(user.password_hash)):
+        if not await verify_password_async(current_password, str(user.password_hash)):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Current password is incorrect",
@@ -478,24 +517,31 @@ class AuthService:
                 detail="New password must be at least 8 characters long",
             )
 
-        if verify_password(new_password, str(user.password_hash)):
+        # current_password already matched the stored hash, so comparing the
+        # plaintexts is equivalent to a second bcrypt check and much cheaper
+        if new_password == current_password:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="New password must be different from current password",
             )
 
-        user.password_hash = hash_password(new_password)
+        user.password_hash = await hash_password_async(new_password)
         user.updated_at = datetime.now(timezone.utc)
 
-        db.query(RefreshToken).filter(
-            RefreshToken.user_id == user.id, RefreshToken.revoked.is_(False)
-        ).update({"revoked": True})
-
-        db.commit()
+        await db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.user_id == user.id, RefreshToken.revoked.is_(False))
+            .values(revoked=True)
+        )
+        cutoff = revocation_store.revoke_user(db, user.id)
 
-        await EmailService.send_password_changed_email(
-            email=str(user.email), username=str(user.username)
+        EmailQueue.enqueue(
+            db, "password_changed", str(user.email), username=str(user.username)
         )
+        await db.commit()
+        email_queue.notify()
+        revocation_store.remember(cutoff)
+        principal_cache.invalidate(user.id)
 
         return {
             "message": "Password changed successfully. Please login again with your new password."
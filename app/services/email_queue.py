@@ -0,0 +1,205 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.email_outbox import EmailOutbox
+from app.services.email_service import EmailService
+from app.utils.datetime_utils import ensure_utc
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+SENT = "sent"
+FAILED = "failed"
+
+# Outbox kind -> EmailService sender; payload items are passed as keyword arguments
+SENDERS = {
+    "otp": EmailService.send_otp_email,
+    "welcome": EmailService.send_welcome_email,
+    "password_reset_confirmation": EmailService.send_password_reset_confirmation,
+    "password_changed": EmailService.send_password_changed_email,
+}
+
+# Payload items only needed to send the message; dropped once it is sent or has failed
+SECRET_PAYLOAD_KEYS = frozenset({"otp"})
+
+
+def _scrub(payload: dict) -> dict:
+    return {key: value for key, value in payload.items() if key not in SECRET_PAYLOAD_KEYS}
+
+
+class EmailQueue:
+    """Transactional outbox for outgoing email.
+
+    ``enqueue`` adds the message to the caller's session, so it is committed
+    (or rolled back) together with the caller's other writes in that session.
+    OTP codes are not among them: ``otp_store.issue`` commits the code on its
+    own (its own session, or Redis) before the OTP email is enqueued, so a
+    request that fails in between leaves an issued code with no email; the
+    user asks for a new one. A background dispatcher claims due rows in
+    batches, sends them concurrently and retries failures with exponential
+    backoff. Secrets (the OTP) are removed from the payload once a message is
+    sent or has failed for good.
+    """
+
+    def __init__(
+        self,
+        concurrency: int,
+        batch_size: int,
+        poll_interval: float,
+        max_attempts: int,
+        retry_base_seconds: float,
+        session_factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal,
+    ):
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self._session_factory = session_factory
+        self._wakeup: Optional[asyncio.Event] = None
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self._send_timing = {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+        self._delivery_timing = {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+
+    @staticmethod
+    def enqueue(db: AsyncSession, kind: str, recipient: str, **payload) -> EmailOutbox:
+        if kind not in SENDERS:
+            raise ValueError(f"Unknown email kind '{kind}'")
+        message = EmailOutbox(
+            kind=kind,
+            recipient=recipient,
+            payload=payload,
+            status=PENDING,
+            attempts=0,
+            next_attempt_at=datetime.now(timezone.utc),
+        )
+        db.add(message)
+        return message
+
+    def notify(self) -> None:
+        """Wake the dispatcher after committing newly enqueued messages."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def depth(self) -> int:
+        async with self._session_factory() as db:
+            return await db.scalar(
+                select(func.count()).select_from(EmailOutbox).where(EmailOutbox.status == PENDING)
+            )
+
+    def stats(self) -> dict:
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "send_timing": dict(self._send_timing),
+            "delivery_timing": dict(self._delivery_timing),
+        }
+
+    @staticmethod
+    def _observe(timing: dict, seconds: float) -> None:
+        timing["count"] += 1
+        timing["total_seconds"] += seconds
+        timing["max_seconds"] = max(timing["max_seconds"], seconds)
+
+    async def _claim_batch(self) -> list:
+        now = datetime.now(timezone.utc)
+        async with self._session_factory() as db:
+            messages = (
+                await db.scalars(
+                    select(EmailOutbox)
+                    .where(EmailOutbox.status == PENDING, EmailOutbox.next_attempt_at <= now)
+                    .order_by(EmailOutbox.id)
+                    .limit(self.batch_size)
+                    .with_for_update(skip_locked=True)
+                )
+            ).all()
+            # Lease the rows so another process will not pick them up while we
+            # send; if this process dies they become due again after the lease.
+            for message in messages:
+                message.next_attempt_at = now + timedelta(minutes=5)
+            await db.commit()
+            return list(messages)
+
+    async def _send(self, message: EmailOutbox) -> Optional[str]:
+        started = time.perf_counter()
+        try:
+            delivered = await SENDERS[message.kind](message.recipient, **message.payload)
+            return None if delivered else "Sender reported failure"
+        except Exception as exc:
+            logger.warning("Email %s to %s failed: %s", message.id, message.recipient, exc)
+            return str(exc) or type(exc).__name__
+        finally:
+            self._observe(self._send_timing, time.perf_counter() - started)
+
+    async def _deliver_batch(self, messages: list) -> None:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def send(message: EmailOutbox) -> Optional[str]:
+            async with semaphore:
+                return await self._send(message)
+
+        errors = await asyncio.gather(*(send(message) for message in messages))
+
+        now = datetime.now(timezone.utc)
+        async with self._session_factory() as db:
+            for message, error in zip(messages, errors):
+                message = await db.merge(message, load=False)
+                message.attempts += 1
+                if error is None:
+                    message.status = SENT
+                    message.sent_at = now
+                    message.payload = _scrub(message.payload)
+                    self.sent += 1
+                    if message.created_at is not None:
+                        self._observe(
+                            self._delivery_timing,
+                            (now - ensure_utc(message.created_at)).total_seconds(),
+                        )
+                elif message.attempts >= self.max_attempts:
+                    message.status = FAILED
+                    message.last_error = error
+                    message.payload = _scrub(message.payload)
+                    self.failed += 1
+                else:
+                    backoff = min(self.retry_base_seconds * 2 ** (message.attempts - 1), 300)
+                    message.next_attempt_at = now + timedelta(seconds=backoff)
+                    message.last_error = error
+                    self.retried += 1
+            await db.commit()
+
+    async def run_forever(self) -> None:
+        self._wakeup = asyncio.Event()
+        while True:
+            try:
+                messages = await self._claim_batch()
+                if messages:
+                    await self._deliver_batch(messages)
+                    continue
+            except Exception:
+                logger.exception("Email dispatch failed")
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+
+email_queue = EmailQueue(
+    concurrency=settings.EMAIL_WORKERS,
+    batch_size=settings.EMAIL_BATCH_SIZE,
+    poll_interval=settings.EMAIL_POLL_INTERVAL_SECONDS,
+    max_attempts=settings.EMAIL_MAX_ATTEMPTS,
+    retry_base_seconds=settings.EMAIL_RETRY_BASE_SECONDS,
+)
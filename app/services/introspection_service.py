@@ -0,0 +1,94 @@
+import time
+from datetime import datetime, timezone
+from typing import Dict, List
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import introspection_cache
+from app.core.config import settings
+from app.core.security import decode_token, hash_token
+from app.models.user import RefreshToken
+from app.services.revocation_service import revocation_store
+from app.utils.datetime_utils import ensure_utc
+
+INACTIVE = {"active": False}
+
+
+class IntrospectionService:
+    """RFC 7662-style token introspection for services that can't verify JWTs.
+
+    Access tokens are active while their signature and ``exp`` check out and
+    they aren't revoked; both checks are in-memory (decode_token's cache and the
+    revocation filter). Refresh tokens must also be present in
+    ``refresh_tokens`` and not revoked; those results are cached by token digest
+    for at most INTROSPECTION_REFRESH_CACHE_TTL_SECONDS since they can be
+    revoked in bulk, and single revocations invalidate immediately.
+    """
+
+    @staticmethod
+    def _claims(payload: dict) -> dict:
+        return {
+            "active": True,
+            "sub": payload.get("sub"),
+            "exp": int(payload["exp"]),
+            "type": payload.get("type"),
+        }
+
+    @staticmethod
+    def invalidate(token: str) -> None:
+        introspection_cache.invalidate(hash_token(token))
+
+    @staticmethod
+    async def introspect_many(tokens: List[str], db: AsyncSession) -> List[dict]:
+        """Introspect ``tokens``, answering in request order.
+
+        Access tokens and cached results cost no query; uncached refresh tokens
+        are looked up together in a single ``IN`` query.
+        """
+        digests = [hash_token(token) for token in tokens]
+        results: Dict[str, dict] = {}
+        refresh_payloads: Dict[str, dict] = {}
+
+        for token, digest in zip(tokens, digests):
+            if digest in results or digest in refresh_payloads:
+                continue
+
+            cached = introspection_cache.get(digest)
+            if cached is not None:
+                results[digest] = cached
+                continue
+
+            payload = decode_token(token)
+            if payload is None or "exp" not in payload or "sub" not in payload:
+                results[digest] = INACTIVE
+            elif payload.get("type") == "refresh":
+                refresh_payloads[digest] = payload
+            elif await revocation_store.is_revoked(payload, db):
+                results[digest] = INACTIVE
+            else:
+                results[digest] = IntrospectionService._claims(payload)
+
+        if refresh_payloads:
+            rows = await db.execute(
+                select(RefreshToken.token_hash, RefreshToken.expires_at).where(
+                    RefreshToken.token_hash.in_(list(refresh_payloads)),
+                    RefreshToken.revoked.is_(False),
+                )
+            )
+            now = datetime.now(timezone.utc)
+            live = {token_hash for token_hash, expires_at in rows if ensure_utc(expires_at) > now}
+
+            for digest, payload in refresh_payloads.items():
+                result = IntrospectionService._claims(payload) if digest in live else INACTIVE
+                results[digest] = result
+                introspection_cache.set(
+                    digest,
+                    result,
+                    ttl=min(
+                        payload["exp"] - time.time(),
+                        settings.INTROSPECTION_REFRESH_CACHE_TTL_SECONDS,
+                    ),
+                )
+
+        return [results[digest] for digest in digests]
@@ -0,0 +1,507 @@
+import hashlib
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.otp import OTP
+from app.utils.datetime_utils import ensure_utc
+
+
+class OTPIssueStatus(str, Enum):
+    ISSUED = "issued"
+    COOLDOWN = "cooldown"
+    LIMITED = "limited"
+
+
+class OTPVerifyStatus(str, Enum):
+    VALID = "valid"
+    NOT_FOUND = "not_found"
+    EXPIRED = "expired"
+    TOO_MANY_ATTEMPTS = "too_many_attempts"
+    INVALID = "invalid"
+
+
+@dataclass(frozen=True)
+class OTPIssueResult:
+    status: OTPIssueStatus
+    retry_after: int = 0
+
+
+@dataclass(frozen=True)
+class OTPVerification:
+    status: OTPVerifyStatus
+    attempts_remaining: int = 0
+    # Store-specific state of a consumed code, for ``OTPStore.restore``
+    consumed: Any = field(default=None, compare=False, repr=False)
+
+
+def _purpose_value(purpose: str) -> str:
+    return purpose.value if isinstance(purpose, Enum) else purpose
+
+
+class OTPStore(ABC):
+    """Storage for one-time codes keyed by (identifier, purpose).
+
+    ``issue`` and ``verify`` are each atomic: the cooldown/limit checks and the
+    replacement of the active code happen together, as do the attempt-counter
+    check, increment and consumption of a code.
+
+    A verified code must only stay used up if the write it authorizes (the new
+    user, the new password) commits. Callers pass their session to ``verify``:
+    the SQL store consumes the code in that transaction, so it commits or rolls
+    back with the write. The other stores consume it at once, and callers call
+    ``restore`` when the write fails.
+    """
+
+    @abstractmethod
+    async def issue(
+        self,
+        identifier: str,
+        purpose: str,
+        code: str,
+        ttl_seconds: int,
+        cooldown_seconds: int = 0,
+        max_issues: int = 0,
+        window_seconds: int = 0,
+    ) -> OTPIssueResult:
+        """Replace the active code, unless the previous one was issued less than
+        ``cooldown_seconds`` ago or ``max_issues`` codes were already issued in
+        the last ``window_seconds``."""
+
+    @abstractmethod
+    async def verify(
+        self,
+        identifier: str,
+        purpose: str,
+        code: str,
+        max_attempts: int,
+        db: Optional[AsyncSession] = None,
+    ) -> OTPVerification:
+        """Check ``code`` against the active one, consuming it on success and
+        counting a failed attempt otherwise (failed attempts are always saved)."""
+
+    async def restore(self, identifier: str, purpose: str, verification: OTPVerification) -> None:
+        """Make a code consumed by ``verify`` usable again, unless a newer one was issued."""
+
+
+class SQLOTPStore(OTPStore):
+    """Keeps codes in the ``otps`` table (the original behavior).
+
+    Superseded codes are expired rather than deleted so issue counts over the
+    window stay accurate; the purge worker removes them later. On Postgres each
+    operation holds a transaction-scoped advisory lock for its key.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal):
+        self._session_factory = session_factory
+
+    @staticmethod
+    async def _lock(db: AsyncSession, identifier: str, purpose: str) -> None:
+        if db.bind.dialect.name != "postgresql":
+            return
+        digest = hashlib.sha256(f"otp:{purpose}:{identifier}".encode("utf-8")).digest()
+        lock_key = int.from_bytes(digest[:8], "big", signed=True)
+        await db.execute(select(func.pg_advisory_xact_lock(lock_key)))
+
+    async def issue(
+        self,
+        identifier: str,
+        purpose: str,
+        code: str,
+        ttl_seconds: int,
+        cooldown_seconds: int = 0,
+        max_issues: int = 0,
+        window_seconds: int = 0,
+    ) -> OTPIssueResult:
+        purpose = _purpose_value(purpose)
+        now = datetime.now(timezone.utc)
+        async with self._session_factory() as db:
+            await self._lock(db, identifier, purpose)
+
+            if cooldown_seconds:
+                last_created = await db.scalar(
+                    select(OTP.created_at)
+                    .where(
+                        OTP.identifier == identifier,
+                        OTP.purpose == purpose,
+                        OTP.is_verified.is_(False),
+                    )
+                    .order_by(OTP.created_at.desc())
+                    .limit(1)
+                )
+                if last_created is not None:
+                    elapsed = (now - ensure_utc(last_created)).total_seconds()
+                    if elapsed < cooldown_seconds:
+                        return OTPIssueResult(
+                            OTPIssueStatus.COOLDOWN, cooldown_seconds - int(elapsed)
+                        )
+
+            if max_issues:
+                window_start = now - timedelta(seconds=window_seconds)
+                issued, oldest = (
+                    await db.execute(
+                        select(func.count(), func.min(OTP.created_at)).where(
+                            OTP.identifier == identifier,
+                            OTP.purpose == purpose,
+                            OTP.created_at > window_start,
+                        )
+                    )
+                ).one()
+                if issued >= max_issues:
+                    retry_after = (ensure_utc(oldest) - window_start).total_seconds()
+                    return OTPIssueResult(OTPIssueStatus.LIMITED, max(int(retry_after), 1))
+
+            await db.execute(
+                update(OTP)
+                .where(
+                    OTP.identifier == identifier,
+                    OTP.purpose == purpose,
+                    OTP.is_verified.is_(False),
+                )
+                .values(expires_at=now)
+            )
+            db.add(
+                OTP(
+                    identifier=identifier,
+                    code=code,
+                    purpose=purpose,
+                    created_at=now,
+                    expires_at=now + timedelta(seconds=ttl_seconds),
+                )
+            )
+            await db.commit()
+
+        return OTPIssueResult(OTPIssueStatus.ISSUED)
+
+    async def verify(
+        self,
+        identifier: str,
+        purpose: str,
+        code: str,
+        max_attempts: int,
+        db: Optional[AsyncSession] = None,
+    ) -> OTPVerification:
+        if db is None:
+            async with self._session_factory() as own_db:
+                verification = await self._verify(own_db, identifier, purpose, code, max_attempts)
+                await own_db.commit()
+            return verification
+        return await self._verify(db, identifier, purpose, code, max_attempts)
+
+    async def _verify(
+        self, db: AsyncSession, identifier: str, purpose: str, code: str, max_attempts: int
+    ) -> OTPVerification:
+        """Verify in ``db``'s transaction; a consumed code is flushed, not committed."""
+        purpose = _purpose_value(purpose)
+        await self._lock(db, identifier, purpose)
+        otp_record = await db.scalar(
+            select(OTP)
+            .where(
+                OTP.identifier == identifier,
+                OTP.purpose == purpose,
+                OTP.is_verified.is_(False),
+            )
+            .order_by(OTP.created_at.desc())
+            .limit(1)
+            .with_for_update()
+        )
+
+        if otp_record is None:
+            return OTPVerification(OTPVerifyStatus.NOT_FOUND)
+
+        if datetime.now(timezone.utc) > ensure_utc(otp_record.expires_at):
+            return OTPVerification(OTPVerifyStatus.EXPIRED)
+
+        if otp_record.attempts >= max_attempts:
+            return OTPVerification(OTPVerifyStatus.TOO_MANY_ATTEMPTS)
+
+        if otp_record.code != code:
+            otp_record.attempts += 1
+            # Saved even though the caller's request fails
+            await db.commit()
+            return OTPVerification(OTPVerifyStatus.INVALID, max_attempts - otp_record.attempts)
+
+        otp_record.is_verified = True
+        await db.flush()
+        return OTPVerification(OTPVerifyStatus.VALID)
+
+
+@dataclass
+class _MemoryOTP:
+    code: str
+    created_at: float
+    expires_at: float
+    attempts: int = 0
+
+
+@dataclass
+class _MemoryKey:
+    active: Optional[_MemoryOTP] = None
+    issued: Deque[float] = field(default_factory=deque)
+    last_used: float = 0.0
+
+
+class InMemoryOTPStore(OTPStore):
+    """Per-process store for development and single-worker deployments.
+
+    The methods never await, so each call runs to completion without
+    interleaving on the event loop and is atomic by construction.
+    """
+
+    SWEEP_EVERY = 1024
+
+    def __init__(self):
+        self._keys: Dict[Tuple[str, str], _MemoryKey] = {}
+        self._issues_since_sweep = 0
+        self._retention = 0.0
+
+    def _sweep(self, now: float) -> None:
+        self._keys = {
+            key: entry
+            for key, entry in self._keys.items()
+            if now - entry.last_used < self._retention
+        }
+        self._issues_since_sweep = 0
+
+    async def issue(
+        self,
+        identifier: str,
+        purpose: str,
+        code: str,
+        ttl_seconds: int,
+        cooldown_seconds: int = 0,
+        max_issues: int = 0,
+        window_seconds: int = 0,
+    ) -> OTPIssueResult:
+        now = time.time()
+        self._retention = max(self._retention, ttl_seconds, window_seconds)
+        self._issues_since_sweep += 1
+        if self._issues_since_sweep >= self.SWEEP_EVERY:
+            self._sweep(now)
+
+        entry = self._keys.setdefault((identifier, _purpose_value(purpose)), _MemoryKey())
+        entry.last_used = now
+
+        if cooldown_seconds and entry.active is not None:
+            elapsed = now - entry.active.created_at
+            if elapsed < cooldown_seconds:
+                return OTPIssueResult(OTPIssueStatus.COOLDOWN, cooldown_seconds - int(elapsed))
+
+        while entry.issued and entry.issued[0] <= now - self._retention:
+            entry.issued.popleft()
+        if max_issues:
+            recent = [issued for issued in entry.issued if issued > now - window_seconds]
+            if len(recent) >= max_issues:
+                retry_after = recent[0] + window_seconds - now
+                return OTPIssueResult(OTPIssueStatus.LIMITED, max(int(retry_after), 1))
+
+        entry.active = _MemoryOTP(code=code, created_at=now, expires_at=now + ttl_seconds)
+        entry.issued.append(now)
+        return OTPIssueResult(OTPIssueStatus.ISSUED)
+
+    async def verify(
+        self,
+        identifier: str,
+        purpose: str,
+        code: str,
+        max_attempts: int,
+        db: Optional[AsyncSession] = None,
+    ) -> OTPVerification:
+        entry = self._keys.get((identifier, _purpose_value(purpose)))
+        otp = entry.active if entry is not None else None
+        if otp is None:
+            return OTPVerification(OTPVerifyStatus.NOT_FOUND)
+
+        if time.time() > otp.expires_at:
+            return OTPVerification(OTPVerifyStatus.EXPIRED)
+
+        if otp.attempts >= max_attempts:
+            return OTPVerification(OTPVerifyStatus.TOO_MANY_ATTEMPTS)
+
+        if otp.code != code:
+            otp.attempts += 1
+            return OTPVerification(OTPVerifyStatus.INVALID, max_attempts - otp.attempts)
+
+        entry.active = None
+        return OTPVerification(OTPVerifyStatus.VALID, consumed=otp)
+
+    async def restore(self, identifier: str, purpose: str, verification: OTPVerification) -> None:
+        entry = self._keys.get((identifier, _purpose_value(purpose)))
+        if entry is not None and entry.active is None and verification.consumed is not None:
+            entry.active = verification.consumed
+
+
+# KEYS: active code hash, issue log (sorted set)
+# ARGV: code, now_ms, ttl_ms, cooldown_ms, max_issues, window_ms, retention_ms
+_ISSUE_SCRIPT = """
+local now = tonumber(ARGV[2])
+local cooldown = tonumber(ARGV[4])
+local max_issues = tonumber(ARGV[5])
+local window = tonumber(ARGV[6])
+
+if cooldown > 0 then
+    local created = redis.call('HGET', KEYS[1], 'created_at')
+    if created and now - tonumber(created) < cooldown then
+        return {1, cooldown - (now - tonumber(created))}
+    end
+end
+
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now - tonumber(ARGV[7]))
+local window_start = '(' .. (now - window)
+if max_issues > 0 and redis.call('ZCOUNT', KEYS[2], window_start, '+inf') >= max_issues then
+    local oldest = redis.call('ZRANGEBYSCORE', KEYS[2], window_start, '+inf',
+                              'WITHSCORES', 'LIMIT', 0, 1)
+    return {2, tonumber(oldest[2]) + window - now}
+end
+
+redis.call('DEL', KEYS[1])
+redis.call('HSET', KEYS[1], 'code', ARGV[1], 'created_at', now,
+           'expires_at', now + tonumber(ARGV[3]), 'attempts', 0)
+redis.call('PEXPIRE', KEYS[1], ARGV[7])
+redis.call('ZADD', KEYS[2], now, ARGV[2] .. ':' .. ARGV[1])
+redis.call('PEXPIRE', KEYS[2], ARGV[7])
+return {0, 0}
+"""
+
+# KEYS: active code hash; ARGV: code, now_ms, max_attempts
+_VERIFY_SCRIPT = """
+local otp = redis.call('HMGET', KEYS[1], 'code', 'expires_at', 'attempts')
+if not otp[1] then
+    return {1, 0}
+end
+if tonumber(ARGV[2]) > tonumber(otp[2]) then
+    return {2, 0}
+end
+local max_attempts = tonumber(ARGV[3])
+if tonumber(otp[3]) >= max_attempts then
+    return {3, 0}
+end
+if otp[1] ~= ARGV[1] then
+    local attempts = redis.call('HINCRBY', KEYS[1], 'attempts', 1)
+    return {4, max_attempts - attempts}
+end
+local state = redis.call('HGETALL', KEYS[1])
+local pttl = redis.call('PTTL', KEYS[1])
+redis.call('DEL', KEYS[1])
+return {0, 0, pttl, state}
+"""
+
+# KEYS: active code hash; ARGV: pttl, then the hash's field / value pairs
+_RESTORE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+for i = 2, #ARGV, 2 do
+    redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+if tonumber(ARGV[1]) > 0 then
+    redis.call('PEXPIRE', KEYS[1], ARGV[1])
+end
+return 1
+"""
+
+_VERIFY_RESULTS = [
+    OTPVerifyStatus.VALID,
+    OTPVerifyStatus.NOT_FOUND,
+    OTPVerifyStatus.EXPIRED,
+    OTPVerifyStatus.TOO_MANY_ATTEMPTS,
+    OTPVerifyStatus.INVALID,
+]
+_ISSUE_RESULTS = [OTPIssueStatus.ISSUED, OTPIssueStatus.COOLDOWN, OTPIssueStatus.LIMITED]
+
+
+class RedisOTPStore(OTPStore):
+    """Stores codes in any Redis-protocol server, using Lua scripts for atomicity.
+
+    ``client`` may be any ``redis.asyncio``-compatible client, which lets a local
+    stand-in (e.g. a fakeredis instance) replace a real server.
+    """
+
+    KEY_PREFIX = "otp"
+
+    def __init__(self, url: Optional[str] = None, client=None):
+        if client is None:
+            try:
+                from redis import asyncio as redis_asyncio
+            except ImportError as exc:
+                raise RuntimeError("OTP_STORE_BACKEND=redis requires the 'redis' package") from exc
+            client = redis_asyncio.from_url(url or settings.REDIS_URL)
+        self._client = client
+        self._issue = client.register_script(_ISSUE_SCRIPT)
+        self._verify = client.register_script(_VERIFY_SCRIPT)
+        self._restore = client.register_script(_RESTORE_SCRIPT)
+
+    def _keys(self, identifier: str, purpose: str) -> list:
+        base = f"{self.KEY_PREFIX}:{_purpose_value(purpose)}:{identifier}"
+        return [base, f"{base}:issued"]
+
+    async def issue(
+        self,
+        identifier: str,
+        purpose: str,
+        code: str,
+        ttl_seconds: int,
+        cooldown_seconds: int = 0,
+        max_issues: int = 0,
+        window_seconds: int = 0,
+    ) -> OTPIssueResult:
+        retention_seconds = max(ttl_seconds, window_seconds, cooldown_seconds) + 60
+        status, retry_after_ms = await self._issue(
+            keys=self._keys(identifier, purpose),
+            args=[
+                code,
+                int(time.time() * 1000),
+                ttl_seconds * 1000,
+                cooldown_seconds * 1000,
+                max_issues,
+                window_seconds * 1000,
+                retention_seconds * 1000,
+            ],
+        )
+        retry_after = -(-int(retry_after_ms) // 1000)
+        return OTPIssueResult(_ISSUE_RESULTS[int(status)], retry_after)
+
+    async def verify(
+        self,
+        identifier: str,
+        purpose: str,
+        code: str,
+        max_attempts: int,
+        db: Optional[AsyncSession] = None,
+    ) -> OTPVerification:
+        status, remaining, *consumed = await self._verify(
+            keys=self._keys(identifier, purpose)[:1],
+            args=[code, int(time.time() * 1000), max_attempts],
+        )
+        return OTPVerification(
+            _VERIFY_RESULTS[int(status)], int(remaining), consumed=consumed or None
+        )
+
+    async def restore(self, identifier: str, purpose: str, verification: OTPVerification) -> None:
+        if verification.consumed is None:
+            return
+        pttl, state = verification.consumed
+        await self._restore(keys=self._keys(identifier, purpose)[:1], args=[pttl, *state])
+
+
+def create_otp_store(backend: Optional[str] = None) -> OTPStore:
+    backend = (backend or settings.OTP_STORE_BACKEND).lower()
+    if backend == "sql":
+        return SQLOTPStore()
+    if backend == "memory":
+        return InMemoryOTPStore()
+    if backend == "redis":
+        return RedisOTPStore()
+    raise ValueError(f"Unknown OTP_STORE_BACKEND '{backend}'")
+
+
+otp_store = create_otp_store()
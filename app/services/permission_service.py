@@ -0,0 +1,365 @@
+import base64
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Hashable, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.app import App, Page
+from app.models.permission import Action, Permission
+from app.models.role import UserAppRole
+from app.utils.cache import TTLCache
+
+
+@dataclass(frozen=True)
+class PermissionCatalog:
+    """Bit layout of an app's (page, action) grants.
+
+    Page ``i`` and action ``j`` map to bit ``i * len(actions) + j``. ``version``
+    is derived from the layout itself, so every worker computes the same one.
+    """
+
+    app_id: int
+    app_code: str
+    is_active: bool
+    pages: Dict[str, int]
+    actions: Dict[str, int]
+    page_ids: Dict[int, int]
+    action_ids: Dict[int, int]
+    version: str
+
+    @property
+    def size(self) -> int:
+        return len(self.pages) * len(self.actions)
+
+    def bit(self, page: str, action: str) -> Optional[int]:
+        page_index = self.pages.get(page)
+        action_index = self.actions.get(action)
+        if page_index is None or action_index is None:
+            return None
+        return page_index * len(self.actions) + action_index
+
+
+MASK_ENCODING = "base64url-le"
+
+
+def encode_mask(mask: int) -> str:
+    """Little-endian bitset (bit ``i`` is bit ``i % 8`` of byte ``i // 8``) as
+    unpadded base64url; trailing zero bytes are dropped."""
+    raw = mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_mask(encoded: str) -> int:
+    raw = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4))
+    return int.from_bytes(raw, "little")
+
+
+@dataclass(frozen=True)
+class EffectivePermissions:
+    """A user's materialized grants in one app, packed into an int bitset."""
+
+    catalog: PermissionCatalog
+    mask: int
+
+    def allows(self, page: str, action: str) -> bool:
+        # Inlined PermissionCatalog.bit: this is the hot path
+        catalog = self.catalog
+        page_index = catalog.pages.get(page)
+        action_index = catalog.actions.get(action)
+        if page_index is None or action_index is None:
+            return False
+        return (self.mask >> (page_index * len(catalog.actions) + action_index)) & 1 == 1
+
+    def to_claims(self) -> dict:
+        """Token claims: app code, catalog version and the bitset (see encode_mask)."""
+        return {
+            "app": self.catalog.app_code,
+            "pv": self.catalog.version,
+            "perms": encode_mask(self.mask),
+        }
+
+    def grants(self) -> Dict[str, list]:
+        actions = list(self.catalog.actions)
+        granted: Dict[str, list] = {}
+        for page, page_index in self.catalog.pages.items():
+            base = page_index * len(actions)
+            names = [name for j, name in enumerate(actions) if (self.mask >> (base + j)) & 1]
+            if names:
+                granted[page] = names
+        return granted
+
+
+# (expires_at, catalog generation, permissions, role ids the set was built from)
+_Entry = Tuple[float, int, EffectivePermissions, Tuple[int, ...]]
+
+
+class PermissionResolver:
+    """Answers "can user X do action A on page P of app C" from memory.
+
+    Each (user, app) permission set is built once from ``user_app_roles`` and
+    ``permissions`` and kept as an int bitset, so a warm check is a few dict
+    lookups and a shift with no locking or awaiting. Committed changes to
+    ``UserAppRole`` and ``Permission`` rows invalidate only the affected
+    entries; page, action and app changes rebuild the catalogs. Changes made
+    outside the ORM (or by other processes) are picked up when entries expire.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._catalogs = TTLCache(maxsize=1024, ttl=ttl)
+        self._catalog_generation = 0
+        # Bumped by every invalidation, so a set read before one isn't stored after it
+        self._epoch = 0
+        self._app_codes: Dict[int, str] = {}
+        # (user id, app code) -> entry, in LRU order
+        self._entries: "OrderedDict[Tuple[int, str], _Entry]" = OrderedDict()
+        # role id -> entries built from it; kept in step with _entries by _drop
+        self._role_index: Dict[int, Set[Tuple[int, str]]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def catalog(self, db: AsyncSession, app_code: str) -> Optional[PermissionCatalog]:
+        catalog = self._catalogs.get(app_code)
+        if catalog is not None:
+            return catalog
+
+        generation = self._catalog_generation
+        app = await db.scalar(select(App).where(App.code == app_code))
+        if app is None:
+            return None
+
+        pages = (
+            await db.execute(
+                select(Page.id, Page.route)
+                .where(Page.app_id == app.id, Page.is_active.is_(True))
+                .order_by(Page.id)
+            )
+        ).all()
+        actions = (await db.execute(select(Action.id, Action.name).order_by(Action.id))).all()
+
+        layout = json.dumps([[route for _, route in pages], [name for _, name in actions]])
+        catalog = PermissionCatalog(
+            app_id=app.id,
+            app_code=app.code,
+            is_active=bool(app.is_active),
+            pages={route: i for i, (_, route) in enumerate(pages)},
+            actions={name: j for j, (_, name) in enumerate(actions)},
+            page_ids={page_id: i for i, (page_id, _) in enumerate(pages)},
+            action_ids={action_id: j for j, (action_id, _) in enumerate(actions)},
+            version=hashlib.sha256(layout.encode("utf-8")).hexdigest()[:12],
+        )
+        self._app_codes[app.id] = app.code
+        # Don't cache a catalog that was invalidated while it was being read
+        if generation == self._catalog_generation:
+            self._catalogs.set(app_code, catalog)
+        return catalog
+
+    def cached(self, user_id: int, app_code: str) -> Optional[EffectivePermissions]:
+        """Warm-path lookup; returns None when the set has to be (re)built."""
+        key = (user_id, app_code)
+        entry = self._entries.get(key)
+        if entry is None or entry[1] != self._catalog_generation or entry[0] <= time.monotonic():
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[2]
+
+    def _drop(self, key: Tuple[int, str]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for role_id in entry[3]:
+            keys = self._role_index.get(role_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._role_index[role_id]
+
+    def _store(
+        self,
+        key: Tuple[int, str],
+        epoch: int,
+        permissions: EffectivePermissions,
+        role_ids: Tuple[int, ...],
+    ):
+        if epoch != self._epoch:
+            return
+        self._drop(key)
+        self._entries[key] = (
+            time.monotonic() + self.ttl,
+            self._catalog_generation,
+            permissions,
+            role_ids,
+        )
+        for role_id in role_ids:
+            self._role_index.setdefault(role_id, set()).add(key)
+        # Expired entries are never hit again, so they reach the front and go first
+        while len(self._entries) > self.maxsize:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    async def _materialize(
+        self, db: AsyncSession, user_id: int, catalog: PermissionCatalog
+    ) -> EffectivePermissions:
+        epoch = self._epoch
+        role_ids = (
+            await db.scalars(
+                select(UserAppRole.role_id).where(
+                    UserAppRole.user_id == user_id, UserAppRole.app_id == catalog.app_id
+                )
+            )
+        ).all()
+
+        mask = 0
+        if role_ids and catalog.is_active:
+            grants = await db.execute(
+                select(Permission.page_id, Permission.action_id).where(
+                    Permission.role_id.in_(role_ids)
+                )
+            )
+            width = len(catalog.actions)
+            for page_id, action_id in grants:
+                page_index = catalog.page_ids.get(page_id)
+                action_index = catalog.action_ids.get(action_id)
+                if page_index is not None and action_index is not None:
+                    mask |= 1 << (page_index * width + action_index)
+
+        permissions = EffectivePermissions(catalog, mask)
+        self._store((user_id, catalog.app_code), epoch, permissions, tuple(role_ids))
+        return permissions
+
+    async def permissions(
+        self, db: AsyncSession, user_id: int, app_code: str
+    ) -> Optional[EffectivePermissions]:
+        """Effective permissions of ``user_id`` in ``app_code``, or None for an unknown app."""
+        permissions = self.cached(user_id, app_code)
+        if permissions is not None:
+            return permissions
+
+        catalog = await self.catalog(db, app_code)
+        if catalog is None:
+            return None
+        return await self._materialize(db, user_id, catalog)
+
+    async def check(
+        self, db: AsyncSession, user_id: int, app_code: str, page: str, action: str
+    ) -> bool:
+        permissions = await self.permissions(db, user_id, app_code)
+        return permissions is not None and permissions.allows(page, action)
+
+    async def check_many(
+        self, db: AsyncSession, user_id: int, checks: Iterable[Tuple[str, str, str]]
+    ) -> int:
+        """Answer (app, page, action) checks as a bitset where bit i answers checks[i].
+
+        Each distinct app is resolved once; the rest are in-memory bit tests.
+        """
+        resolved: Dict[str, Optional[EffectivePermissions]] = {}
+        results = 0
+        for i, (app_code, page, action) in enumerate(checks):
+            if app_code not in resolved:
+                resolved[app_code] = await self.permissions(db, user_id, app_code)
+            permissions = resolved[app_code]
+            if permissions is not None and permissions.allows(page, action):
+                results |= 1 << i
+        return results
+
+    def invalidate_user(self, user_id: int, app_id: int) -> None:
+        self._epoch += 1
+        app_code = self._app_codes.get(app_id)
+        if app_code is not None:
+            self._drop((user_id, app_code))
+
+    def invalidate_role(self, role_id: int) -> None:
+        self._epoch += 1
+        for key in self._role_index.pop(role_id, ()):
+            self._drop(key)
+
+    def invalidate_catalogs(self) -> None:
+        # Entries record the generation they were built under and are rebuilt lazily
+        self._catalog_generation += 1
+        self._epoch += 1
+        self._catalogs.clear()
+
+    def invalidate_all(self) -> None:
+        self.invalidate_catalogs()
+        self._entries.clear()
+        self._role_index.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "catalogs": self._catalogs.stats(),
+        }
+
+
+permission_resolver = PermissionResolver(
+    maxsize=settings.PERMISSION_CACHE_SIZE, ttl=settings.PERMISSION_CACHE_TTL_SECONDS
+)
+
+
+# Invalidation: record what a flush touched and apply it once the transaction commits,
+# so a concurrent request can't re-cache the pre-commit state.
+
+_PENDING_KEY = "permission_invalidations"
+
+
+def _values(target, attr: str) -> Set[Hashable]:
+    history = inspect(target).attrs[attr].history
+    values = {getattr(target, attr)}
+    values.update(history.deleted or ())
+    return {value for value in values if value is not None}
+
+
+def _record(mapper, connection, target) -> None:
+    session = inspect(target).session
+    if session is None:
+        return
+
+    pending = session.info.setdefault(_PENDING_KEY, set())
+    if isinstance(target, UserAppRole):
+        for user_id in _values(target, "user_id"):
+            for app_id in _values(target, "app_id"):
+                pending.add(("user", (user_id, app_id)))
+    elif isinstance(target, Permission):
+        for role_id in _values(target, "role_id"):
+            pending.add(("role", role_id))
+    else:
+        pending.add(("catalog", None))
+
+
+for _model in (UserAppRole, Permission, Page, Action, App):
+    for _event in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event, _record)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_invalidations(session: Session) -> None:
+    for kind, value in session.info.pop(_PENDING_KEY, ()):
+        if kind == "user":
+            permission_resolver.invalidate_user(*value)
+        elif kind == "role":
+            permission_resolver.invalidate_role(value)
+        else:
+            permission_resolver.invalidate_catalogs()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_invalidations(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
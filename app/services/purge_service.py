@@ -0,0 +1,134 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import and_, delete, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.email_outbox import EmailOutbox
+from app.models.otp import OTP
+from app.models.revoked_token import RevokedToken
+from app.models.user import RefreshToken
+from app.services.email_queue import FAILED, SENT
+
+logger = logging.getLogger(__name__)
+
+
+class PurgeService:
+    """Deletes expired/used OTPs, expired/revoked refresh tokens, expired access-token
+    revocations, sent emails and emails that failed over EMAIL_FAILED_RETENTION_HOURS ago.
+
+    Rows are removed in small id batches, each in its own short transaction,
+    with a pause between batches so the hot path never waits on a long lock.
+    Rows already locked by another transaction are skipped (Postgres).
+    """
+
+    @staticmethod
+    async def _purge_table(
+        model,
+        condition,
+        session_factory: async_sessionmaker[AsyncSession],
+        batch_size: int,
+        throttle_seconds: float,
+    ) -> int:
+        removed = 0
+        while True:
+            async with session_factory() as db:
+                ids = (
+                    await db.scalars(
+                        select(model.id)
+                        .where(condition)
+                        .limit(batch_size)
+                        .with_for_update(skip_locked=True)
+                    )
+                ).all()
+                if not ids:
+                    return removed
+
+                await db.execute(delete(model).where(model.id.in_(ids)))
+                await db.commit()
+
+            removed += len(ids)
+            if len(ids) < batch_size:
+                return removed
+            await asyncio.sleep(throttle_seconds)
+
+    @staticmethod
+    async def purge_expired(
+        batch_size: Optional[int] = None,
+        throttle_seconds: Optional[float] = None,
+        session_factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal,
+    ) -> dict:
+        batch_size = batch_size or settings.PURGE_BATCH_SIZE
+        if throttle_seconds is None:
+            throttle_seconds = settings.PURGE_THROTTLE_SECONDS
+        now = datetime.now(timezone.utc)
+
+        # The resend cooldown and the OTP_MAX_RESENDS window count recently issued
+        # rows, used or superseded ones included, so those are kept until both
+        # have passed
+        issue_window = max(settings.OTP_EXPIRE_MINUTES * 60, settings.RESEND_COOLDOWN_SECONDS)
+        otps = await PurgeService._purge_table(
+            OTP,
+            and_(
+                or_(OTP.expires_at < now, OTP.is_verified.is_(True)),
+                OTP.created_at < now - timedelta(seconds=issue_window),
+            ),
+            session_factory,
+            batch_size,
+            throttle_seconds,
+        )
+        refresh_tokens = await PurgeService._purge_table(
+            RefreshToken,
+            or_(RefreshToken.expires_at < now, RefreshToken.revoked.is_(True)),
+            session_factory,
+            batch_size,
+            throttle_seconds,
+        )
+
+        revoked_tokens = await PurgeService._purge_table(
+            RevokedToken,
+            RevokedToken.expires_at < now,
+            session_factory,
+            batch_size,
+            throttle_seconds,
+        )
+
+        sent_emails = await PurgeService._purge_table(
+            EmailOutbox,
+            EmailOutbox.status == SENT,
+            session_factory,
+            batch_size,
+            throttle_seconds,
+        )
+
+        failed_before = now - timedelta(hours=settings.EMAIL_FAILED_RETENTION_HOURS)
+        failed_emails = await PurgeService._purge_table(
+            EmailOutbox,
+            and_(EmailOutbox.status == FAILED, EmailOutbox.created_at < failed_before),
+            session_factory,
+            batch_size,
+            throttle_seconds,
+        )
+
+        result = {
+            "otps": otps,
+            "refresh_tokens": refresh_tokens,
+            "revoked_tokens": revoked_tokens,
+            "sent_emails": sent_emails,
+            "failed_emails": failed_emails,
+        }
+        logger.info("Purged expired rows: %s", result)
+        return result
+
+    @staticmethod
+    async def run_forever(interval_seconds: float) -> None:
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await PurgeService.purge_expired()
+            except Exception:
+                logger.exception("Purge run failed")
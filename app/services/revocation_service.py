@@ -0,0 +1,221 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.revoked_token import RevokedToken
+from app.utils.bloom import BloomFilter
+from app.utils.cache import TTLCache
+from app.utils.datetime_utils import ensure_utc
+
+logger = logging.getLogger(__name__)
+
+
+class RevocationStore:
+    """Access-token revocation backed by ``revoked_tokens``.
+
+    Each worker keeps a Bloom filter of revoked jtis, so the common case (token
+    not revoked) is answered in memory; only filter hits are confirmed against
+    the database, and confirmations are cached. User-wide cutoffs are few and
+    kept in a dict. A background task pulls rows written by other workers
+    every REVOCATION_SYNC_INTERVAL_SECONDS and periodically rebuilds the filter
+    from unexpired rows, which ages expired entries out.
+    """
+
+    # Re-read this much history on every sync so rows from transactions that
+    # committed late are not missed
+    SYNC_LOOKBACK_SECONDS = 60
+
+    def __init__(
+        self,
+        capacity: int,
+        error_rate: float,
+        session_factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal,
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._session_factory = session_factory
+        self._bloom = BloomFilter(capacity, error_rate)
+        # user id (as in the sub claim) -> (revoked_before, expires_at), epoch seconds
+        self._user_cutoffs: Dict[str, Tuple[float, float]] = {}
+        self._confirmed = TTLCache(maxsize=10000, ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+        self._synced_until: Optional[datetime] = None
+        self.checks = 0
+        self.filter_hits = 0
+        self.confirmed_revoked = 0
+
+    # Writing
+
+    @staticmethod
+    def revoke(db: AsyncSession, payload: dict) -> RevokedToken:
+        """Add a revocation for one token to ``db``; call ``remember`` after commit."""
+        row = RevokedToken(
+            jti=payload["jti"],
+            user_id=int(payload["sub"]),
+            revoked_at=datetime.now(timezone.utc),
+            expires_at=datetime.fromtimestamp(payload["exp"], timezone.utc),
+        )
+        db.add(row)
+        return row
+
+    @staticmethod
+    def revoke_user(
+        db: AsyncSession, user_id: int, spare_current_second: bool = True
+    ) -> RevokedToken:
+        """Revoke every access token of ``user_id`` issued before now.
+
+        Tokens issued within the current second stay valid (see ``is_revoked``)
+        unless ``spare_current_second`` is False, for users who can't log in again.
+        """
+        revoked_at = datetime.now(timezone.utc)
+        if not spare_current_second:
+            revoked_at += timedelta(seconds=1)
+        row = RevokedToken(
+            user_id=user_id,
+            revoked_at=revoked_at,
+            expires_at=revoked_at + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+        )
+        db.add(row)
+        return row
+
+    def remember(self, row: RevokedToken) -> None:
+        expires_at = ensure_utc(row.expires_at).timestamp()
+        if expires_at <= time.time():
+            return
+
+        if row.jti is not None:
+            self._bloom.add(row.jti)
+            self._confirmed.set(row.jti, True, ttl=expires_at - time.time())
+            return
+
+        key = str(row.user_id)
+        revoked_before = ensure_utc(row.revoked_at).timestamp()
+        current = self._user_cutoffs.get(key)
+        if current is None or current[0] < revoked_before:
+            self._user_cutoffs[key] = (revoked_before, expires_at)
+
+    # Checking
+
+    async def is_revoked(self, payload: dict, db: AsyncSession) -> bool:
+        self.checks += 1
+        cutoff = self._user_cutoffs.get(payload.get("sub"))
+        # Tokens issued in the same second as the cutoff stay valid, so a login
+        # right after a password change isn't rejected
+        if cutoff is not None and payload.get("iat", 0) < int(cutoff[0]):
+            return True
+
+        jti = payload.get("jti")
+        if jti is None or jti not in self._bloom:
+            return False
+
+        self.filter_hits += 1
+        revoked = self._confirmed.get(jti)
+        if revoked is None:
+            revoked = (
+                await db.scalar(select(RevokedToken.id).where(RevokedToken.jti == jti))
+            ) is not None
+            self._confirmed.set(jti, revoked, ttl=payload["exp"] - time.time())
+
+        if revoked:
+            self.confirmed_revoked += 1
+        return revoked
+
+    # Syncing
+
+    async def rebuild(self) -> None:
+        """Reload every unexpired revocation into a fresh filter."""
+        started = datetime.now(timezone.utc)
+        async with self._session_factory() as db:
+            rows = (
+                await db.scalars(select(RevokedToken).where(RevokedToken.expires_at > started))
+            ).all()
+
+        bloom = BloomFilter(max(self.capacity, 2 * len(rows)), self.error_rate)
+        user_cutoffs: Dict[str, Tuple[float, float]] = {}
+        for row in rows:
+            if row.jti is not None:
+                bloom.add(row.jti)
+            else:
+                key = str(row.user_id)
+                revoked_before = ensure_utc(row.revoked_at).timestamp()
+                if key not in user_cutoffs or user_cutoffs[key][0] < revoked_before:
+                    user_cutoffs[key] = (
+                        revoked_before,
+                        ensure_utc(row.expires_at).timestamp(),
+                    )
+
+        self._bloom = bloom
+        self._user_cutoffs = user_cutoffs
+        self._synced_until = started
+
+    async def sync(self) -> int:
+        """Pull revocations recorded since the last sync (by any worker)."""
+        if self._synced_until is None:
+            await self.rebuild()
+            return 0
+
+        started = datetime.now(timezone.utc)
+        since = self._synced_until - timedelta(seconds=self.SYNC_LOOKBACK_SECONDS)
+        async with self._session_factory() as db:
+            rows = (
+                await db.scalars(select(RevokedToken).where(RevokedToken.revoked_at > since))
+            ).all()
+
+        for row in rows:
+            self.remember(row)
+        if self._bloom.count > self._bloom.capacity:
+            await self.rebuild()
+
+        now = time.time()
+        self._user_cutoffs = {
+            key: cutoff for key, cutoff in self._user_cutoffs.items() if cutoff[1] > now
+        }
+        self._synced_until = started
+        return len(rows)
+
+    async def run_forever(
+        self,
+        interval: Optional[float] = None,
+        rebuild_interval: Optional[float] = None,
+    ) -> None:
+        interval = settings.REVOCATION_SYNC_INTERVAL_SECONDS if interval is None else interval
+        rebuild_interval = (
+            settings.REVOCATION_REBUILD_INTERVAL_SECONDS
+            if rebuild_interval is None
+            else rebuild_interval
+        )
+        next_rebuild = time.monotonic() + rebuild_interval
+        while True:
+            try:
+                if time.monotonic() >= next_rebuild:
+                    await self.rebuild()
+                    next_rebuild = time.monotonic() + rebuild_interval
+                else:
+                    await self.sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Revocation sync failed")
+            await asyncio.sleep(interval)
+
+    def stats(self) -> dict:
+        return {
+            "bloom_items": self._bloom.count,
+            "bloom_capacity": self._bloom.capacity,
+            "user_cutoffs": len(self._user_cutoffs),
+            "checks": self.checks,
+            "filter_hits": self.filter_hits,
+            "confirmed_revoked": self.confirmed_revoked,
+        }
+
+
+revocation_store = RevocationStore(
+    capacity=settings.REVOCATION_BLOOM_CAPACITY,
+    error_rate=settings.REVOCATION_BLOOM_ERROR_RATE,
+)
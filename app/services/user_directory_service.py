@@ -0,0 +1,81 @@
+"""Admin views over the users table: paginated listing and NDJSON export.
+
+Both walk ``users`` in primary-key order with keyset conditions
+(``id > :after``) rather than OFFSET, so a page deep into the table costs the
+same as the first one. The export reads through a server-side cursor in
+USER_EXPORT_BATCH_SIZE partitions and writes each partition out before
+fetching the next, so memory stays flat however many rows there are.
+"""
+
+import json
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.replicas import ReadSessionLocal
+from app.models.user import User
+
+LIST_COLUMNS = (
+    User.id,
+    User.username,
+    User.email,
+    User.is_active,
+    User.email_verified,
+    User.created_at,
+)
+
+
+def _export_line(row) -> str:
+    user = row._asdict()
+    if user["created_at"] is not None:
+        user["created_at"] = user["created_at"].isoformat()
+    return json.dumps(user) + "\n"
+
+
+class UserDirectoryService:
+    @staticmethod
+    def _query(is_active: Optional[bool], email_verified: Optional[bool]) -> Select:
+        stmt = select(*LIST_COLUMNS).order_by(User.id)
+        if is_active is not None:
+            stmt = stmt.where(User.is_active.is_(is_active))
+        if email_verified is not None:
+            stmt = stmt.where(User.email_verified.is_(email_verified))
+        return stmt
+
+    @staticmethod
+    async def list_users(
+        db: AsyncSession,
+        limit: int,
+        after: Optional[int] = None,
+        is_active: Optional[bool] = None,
+        email_verified: Optional[bool] = None,
+    ) -> dict:
+        stmt = UserDirectoryService._query(is_active, email_verified)
+        if after is not None:
+            stmt = stmt.where(User.id > after)
+        # One extra row tells whether another page exists
+        rows = (await db.execute(stmt.limit(limit + 1))).all()
+
+        items = [row._asdict() for row in rows[:limit]]
+        return {
+            "items": items,
+            "next_cursor": items[-1]["id"] if len(rows) > limit else None,
+        }
+
+    @staticmethod
+    async def export_ndjson(
+        is_active: Optional[bool] = None,
+        email_verified: Optional[bool] = None,
+        batch_size: Optional[int] = None,
+        session_factory: async_sessionmaker[AsyncSession] = ReadSessionLocal,
+    ) -> AsyncIterator[bytes]:
+        """NDJSON lines of every matching user, one chunk per fetched partition."""
+        stmt = UserDirectoryService._query(is_active, email_verified).execution_options(
+            yield_per=batch_size or settings.USER_EXPORT_BATCH_SIZE
+        )
+        async with session_factory() as db:
+            result = await db.stream(stmt)
+            async for rows in result.partitions():
+                yield "".join(_export_line(row) for row in rows).encode("utf-8")
@@ -0,0 +1,313 @@
+"""Bulk user import from CSV or NDJSON.
+
+The input is consumed as a stream of byte chunks and processed in batches of
+USER_IMPORT_BATCH_SIZE rows, so memory stays bounded by one batch plus the
+emails/usernames already seen (kept to catch duplicates within the file).
+For each batch: rows already registered are found with one set-based query,
+the remaining passwords are hashed across the hasher pool, and the users are
+inserted with COPY on Postgres (INSERT ... ON CONFLICT DO NOTHING elsewhere,
+or when a concurrent signup takes an email mid-batch).
+"""
+
+import codecs
+import csv
+import json
+import logging
+from typing import AsyncIterator, Callable, Dict, List, Optional, Set, Tuple, Union
+
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy import insert, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import USER_IMPORT_ROWS
+from app.core.security import password_hasher
+from app.models.user import User
+from app.schemas.user import UserImportRow
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("csv", "ndjson")
+REQUIRED_COLUMNS = {
+    name for name, field in UserImportRow.model_fields.items() if field.is_required()
+}
+MAX_LINE_LENGTH = 64 * 1024
+COPY_COLUMNS = ("email", "username", "password_hash", "is_active", "email_verified")
+
+CREATED = "created"
+DUPLICATE = "duplicate"
+INVALID = "invalid"
+
+
+class UserImportReport:
+    """Running totals of an import; at most ``max_errors`` row errors are kept."""
+
+    def __init__(self, dry_run: bool, max_errors: int):
+        self.dry_run = dry_run
+        self.max_errors = max_errors
+        self.processed = 0
+        self.created = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.errors: List[Dict[str, Union[int, str]]] = []
+        self.errors_truncated = False
+
+    def add_created(self, count: int) -> None:
+        self.created += count
+        if not self.dry_run:
+            USER_IMPORT_ROWS.labels(CREATED).inc(count)
+
+    def reject(self, line: int, error: str, result: str) -> None:
+        if result == DUPLICATE:
+            self.duplicates += 1
+        else:
+            self.invalid += 1
+        if not self.dry_run:
+            USER_IMPORT_ROWS.labels(result).inc()
+
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line, "error": error})
+        else:
+            self.errors_truncated = True
+
+    def as_dict(self) -> dict:
+        return {
+            "dry_run": self.dry_run,
+            "processed": self.processed,
+            "created": self.created,
+            "duplicates": self.duplicates,
+            "invalid": self.invalid,
+            "errors": self.errors,
+            "errors_truncated": self.errors_truncated,
+        }
+
+
+def _describe(exc: ValidationError) -> str:
+    # Field and message only; the input may be a password
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}"
+        for error in exc.errors()
+    )
+
+
+class UserImportService:
+    @staticmethod
+    async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, str]]:
+        decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        buffer = ""
+        line_no = 0
+        try:
+            async for chunk in chunks:
+                buffer += decoder.decode(chunk)
+                *lines, buffer = buffer.split("\n")
+                for line in lines:
+                    line_no += 1
+                    yield line_no, line.rstrip("\r")
+                if len(buffer) > MAX_LINE_LENGTH:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Line {line_no + 1} is longer than {MAX_LINE_LENGTH} characters",
+                    )
+            buffer += decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Line {line_no + 1} is not valid UTF-8",
+            )
+        if buffer:
+            yield line_no + 1, buffer.rstrip("\r")
+
+    @staticmethod
+    async def _iter_records(
+        chunks: AsyncIterator[bytes], fmt: str
+    ) -> AsyncIterator[Tuple[int, Union[dict, str]]]:
+        """(line number, raw row or error message) for every non-blank data line."""
+        lines = UserImportService._iter_lines(chunks)
+        if fmt == "ndjson":
+            async for line_no, line in lines:
+                if not line.strip():
+                    continue
+                try:
+                    data = json.loads(line)
+                except ValueError:
+                    yield line_no, "Invalid JSON"
+                    continue
+                yield line_no, data if isinstance(data, dict) else "Expected a JSON object"
+            return
+
+        header: Optional[List[str]] = None
+        async for line_no, line in lines:
+            if not line.strip():
+                continue
+            # One record per line: quoted fields can't span lines
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [name.strip().lower() for name in values]
+                missing = REQUIRED_COLUMNS.difference(header)
+                if missing:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"CSV header is missing columns: {', '.join(sorted(missing))}",
+                    )
+                continue
+            if len(values) != len(header):
+                yield line_no, f"Expected {len(header)} columns, got {len(values)}"
+                continue
+            # Empty optional cells fall back to the schema defaults
+            yield line_no, {name: value for name, value in zip(header, values) if value != ""}
+
+    @staticmethod
+    async def _insert(conn: AsyncConnection, records: List[dict]) -> Set[str]:
+        """Insert ``records``, skipping conflicts; returns the emails actually inserted."""
+        if conn.dialect.name == "postgresql":
+            from asyncpg.exceptions import UniqueViolationError
+
+            raw = await conn.get_raw_connection()
+            try:
+                # The savepoint also makes sure a transaction is open before COPY
+                async with conn.begin_nested():
+                    await raw.driver_connection.copy_records_to_table(
+                        User.__tablename__,
+                        records=[
+                            tuple(record[column] for column in COPY_COLUMNS) for record in records
+                        ],
+                        columns=COPY_COLUMNS,
+                    )
+                return {record["email"] for record in records}
+            except UniqueViolationError:
+                # Someone registered one of these since the duplicate check
+                pass
+            stmt = postgresql.insert(User).on_conflict_do_nothing()
+        elif conn.dialect.name == "sqlite":
+            stmt = sqlite.insert(User).on_conflict_do_nothing()
+        else:
+            stmt = insert(User)
+
+        result = await conn.execute(stmt.returning(User.email), records)
+        return set(result.scalars().all())
+
+    @staticmethod
+    async def _import_batch(
+        batch: List[Tuple[int, UserImportRow]],
+        report: UserImportReport,
+        session_factory: async_sessionmaker[AsyncSession],
+    ) -> None:
+        emails = [row.email for _, row in batch]
+        usernames = [row.username for _, row in batch]
+        async with session_factory() as db:
+            taken = (
+                await db.execute(
+                    select(User.email, User.username).where(
+                        or_(User.email.in_(emails), User.username.in_(usernames))
+                    )
+                )
+            ).all()
+        taken_emails = {email for email, _ in taken}
+        taken_usernames = {username for _, username in taken}
+
+        fresh = []
+        for line_no, row in batch:
+            if row.email in taken_emails:
+                report.reject(line_no, "Email already registered", DUPLICATE)
+            elif row.username in taken_usernames:
+                report.reject(line_no, "Username already taken", DUPLICATE)
+            else:
+                fresh.append((line_no, row))
+        if not fresh or report.dry_run:
+            report.add_created(len(fresh))
+            return
+
+        # Hashed outside any transaction, so no connection is held meanwhile
+        hashes = await password_hasher.hash_many([row.password for _, row in fresh])
+        records = [
+            {
+                "email": row.email,
+                "username": row.username,
+                "password_hash": password_hash,
+                "is_active": row.is_active,
+                "email_verified": row.email_verified,
+            }
+            for (_, row), password_hash in zip(fresh, hashes)
+        ]
+        async with session_factory() as db:
+            inserted = await UserImportService._insert(await db.connection(), records)
+            await db.commit()
+
+        report.add_created(len(inserted))
+        for line_no, row in fresh:
+            if row.email not in inserted:
+                report.reject(line_no, "Email or username already registered", DUPLICATE)
+
+    @staticmethod
+    async def import_users(
+        chunks: AsyncIterator[bytes],
+        fmt: str,
+        batch_size: Optional[int] = None,
+        dry_run: bool = False,
+        on_progress: Optional[Callable[[UserImportReport], None]] = None,
+        session_factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal,
+    ) -> UserImportReport:
+        """Import users from ``chunks`` (CSV with a header row, or NDJSON).
+
+        With ``dry_run`` rows are validated and checked for duplicates but
+        nothing is hashed or written. ``on_progress`` is called after each batch.
+        """
+        if fmt not in FORMATS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unsupported import format: {fmt}",
+            )
+        batch_size = batch_size or settings.USER_IMPORT_BATCH_SIZE
+        report = UserImportReport(dry_run, settings.USER_IMPORT_MAX_ERRORS)
+        seen_emails: Set[str] = set()
+        seen_usernames: Set[str] = set()
+        batch: List[Tuple[int, UserImportRow]] = []
+
+        async def flush() -> None:
+            await UserImportService._import_batch(batch, report, session_factory)
+            batch.clear()
+            logger.debug("User import progress: %s", report.as_dict())
+            if on_progress is not None:
+                on_progress(report)
+
+        async for line_no, data in UserImportService._iter_records(chunks, fmt):
+            report.processed += 1
+            if isinstance(data, str):
+                report.reject(line_no, data, INVALID)
+                continue
+            try:
+                row = UserImportRow.model_validate(data)
+            except ValidationError as exc:
+                report.reject(line_no, _describe(exc), INVALID)
+                continue
+
+            if row.email in seen_emails:
+                report.reject(line_no, "Duplicate email in file", DUPLICATE)
+                continue
+            if row.username in seen_usernames:
+                report.reject(line_no, "Duplicate username in file", DUPLICATE)
+                continue
+            seen_emails.add(row.email)
+            seen_usernames.add(row.username)
+
+            batch.append((line_no, row))
+            if len(batch) >= batch_size:
+                await flush()
+
+        if batch:
+            await flush()
+        # Duplicates found by the database are reported after the batch's other errors
+        report.errors.sort(key=lambda error: error["line"])
+
+        logger.info(
+            "User import%s: %d rows, %d created, %d duplicates, %d invalid",
+            " (dry run)" if dry_run else "",
+            report.processed,
+            report.created,
+            report.duplicates,
+            report.invalid,
+        )
+        return report
@@ -0,0 +1,263 @@
+"""Admin search over usernames and emails.
+
+On Postgres (USER_SEARCH_BACKEND=auto or trigram) matching is a substring
+search answered by the pg_trgm GIN indexes on ``lower(username)`` and
+``lower(email)``, ranked exact match > prefix match > trigram similarity,
+with the query capped at USER_SEARCH_TIMEOUT_MS by a transaction-local
+statement_timeout.
+
+Elsewhere each worker keeps a ``UserSearchIndex``: prefix matching over
+lowercased usernames and emails and over every word in them (the part after
+each ``.``, ``_``, ``-``, ``+`` or ``@``, so the email's domain too), loaded at
+startup. That finds ``smith`` in ``john.smith@...`` and ``acme`` in
+``...@acme.com``, but unlike the trigram backend not text in the middle of
+a word (``mit``). Commits in the worker
+(signup, username changes) update it through ORM events as they happen;
+users created or changed by other workers or by bulk import are pulled every
+USER_SEARCH_SYNC_INTERVAL_SECONDS.
+"""
+
+import asyncio
+import logging
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import event, func, inspect, or_, select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, async_engine
+from app.models.user import User
+from app.services.user_directory_service import LIST_COLUMNS
+from app.utils.prefix_index import PrefixIndex
+
+logger = logging.getLogger(__name__)
+
+# SQLSTATE of a statement cancelled by statement_timeout
+QUERY_CANCELED = "57014"
+# Prefix index entries scanned per requested result, per field; bounds the work per search
+CANDIDATES_PER_RESULT = 4
+# A word starts after one of these; the text from there on is indexed as well
+WORD_START = re.compile(r"(?<=[._\-+@])(?=[^._\-+@])")
+
+
+def _word_keys(*values: str) -> Tuple[str, ...]:
+    """Each lowercased value from every word start after the first, e.g.
+    ``smith@acme.com`` and ``acme.com`` for ``john.smith@acme.com``."""
+    keys = []
+    for value in values:
+        for match in WORD_START.finditer(value):
+            start = match.start()
+            keys.append(value[start:])
+    return tuple(keys)
+
+
+def _search_backend() -> str:
+    backend = settings.USER_SEARCH_BACKEND.lower()
+    if backend == "auto":
+        return "trigram" if async_engine.dialect.name == "postgresql" else "prefix"
+    if backend not in ("trigram", "prefix"):
+        raise ValueError(f"Unknown USER_SEARCH_BACKEND: {backend}")
+    return backend
+
+
+SEARCH_BACKEND = _search_backend()
+
+
+class UserSearchIndex:
+    # Re-read this much history on every sync so rows from transactions that
+    # committed late are not missed
+    SYNC_LOOKBACK_SECONDS = 60
+
+    def __init__(
+        self,
+        enabled: bool,
+        session_factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal,
+    ):
+        self.enabled = enabled
+        self._session_factory = session_factory
+        self._usernames = PrefixIndex()
+        self._emails = PrefixIndex()
+        self._words = PrefixIndex()
+        self._synced_until: Optional[datetime] = None
+        self.searches = 0
+
+    def put(self, user_id: int, username: str, email: str) -> None:
+        username, email = username.lower(), email.lower()
+        self._usernames.set(user_id, (username,))
+        self._emails.set(user_id, (email,))
+        self._words.set(user_id, _word_keys(username, email))
+
+    def search(self, query: str, limit: int) -> Tuple[List[int], bool]:
+        """Ids of the best ``limit`` matches, and whether there were more."""
+        self.searches += 1
+        query = query.lower()
+        scan = limit * CANDIDATES_PER_RESULT
+        truncated = False
+        ranks: Dict[int, tuple] = {}
+        for field, index in enumerate((self._usernames, self._emails, self._words)):
+            matches = index.search(query, scan + 1)
+            if len(matches) > scan:
+                truncated = True
+                del matches[scan:]
+            for key, user_id in matches:
+                # Exact match first, then username before email before a later
+                # word, then shortest key. Only whole values count as exact.
+                rank = (key != query or index is self._words, field, len(key), key)
+                if user_id not in ranks or rank < ranks[user_id]:
+                    ranks[user_id] = rank
+
+        ranked = sorted(ranks, key=lambda user_id: (ranks[user_id], user_id))
+        return ranked[:limit], truncated or len(ranked) > limit
+
+    async def rebuild(self) -> None:
+        """Reload every user."""
+        started = datetime.now(timezone.utc)
+        usernames, emails, words = [], [], []
+        async with self._session_factory() as db:
+            result = await db.stream(
+                select(User.id, User.username, User.email).execution_options(yield_per=10000)
+            )
+            async for rows in result.partitions():
+                for user_id, username, email in rows:
+                    username, email = username.lower(), email.lower()
+                    usernames.append((user_id, (username,)))
+                    emails.append((user_id, (email,)))
+                    words.append((user_id, _word_keys(username, email)))
+
+        self._usernames.load(usernames)
+        self._emails.load(emails)
+        self._words.load(words)
+        self._synced_until = started
+
+    async def sync(self) -> int:
+        """Pull users created or updated since the last sync (by any worker)."""
+        if self._synced_until is None:
+            await self.rebuild()
+            return 0
+
+        started = datetime.now(timezone.utc)
+        since = self._synced_until - timedelta(seconds=self.SYNC_LOOKBACK_SECONDS)
+        async with self._session_factory() as db:
+            rows = (
+                await db.execute(
+                    select(User.id, User.username, User.email).where(
+                        or_(User.created_at > since, User.updated_at > since)
+                    )
+                )
+            ).all()
+
+        for user_id, username, email in rows:
+            self.put(user_id, username, email)
+        self._synced_until = started
+        return len(rows)
+
+    async def run_forever(self, interval: Optional[float] = None) -> None:
+        interval = settings.USER_SEARCH_SYNC_INTERVAL_SECONDS if interval is None else interval
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("User search index sync failed")
+
+    def stats(self) -> dict:
+        return {"users": len(self._usernames), "searches": self.searches}
+
+
+user_search_index = UserSearchIndex(enabled=SEARCH_BACKEND == "prefix")
+
+
+class UserSearchService:
+    @staticmethod
+    async def _search_trigram(db: AsyncSession, query: str, limit: int) -> Tuple[list, bool]:
+        query = query.lower()
+        username = func.lower(User.username)
+        email = func.lower(User.email)
+        stmt = (
+            select(*LIST_COLUMNS)
+            .where(
+                or_(
+                    username.contains(query, autoescape=True),
+                    email.contains(query, autoescape=True),
+                )
+            )
+            .order_by(
+                or_(username == query, email == query).desc(),
+                or_(
+                    username.startswith(query, autoescape=True),
+                    email.startswith(query, autoescape=True),
+                ).desc(),
+                func.greatest(
+                    func.similarity(username, query), func.similarity(email, query)
+                ).desc(),
+                User.id,
+            )
+            .limit(limit + 1)
+        )
+
+        # A SELECT, so a read session runs it on the same replica as the search
+        await db.execute(
+            select(func.set_config("statement_timeout", str(settings.USER_SEARCH_TIMEOUT_MS), True))
+        )
+        try:
+            rows = (await db.execute(stmt)).all()
+        except DBAPIError as exc:
+            if getattr(exc.orig, "pgcode", None) != QUERY_CANCELED:
+                raise
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Search took too long. Try a longer query.",
+            )
+        return [row._asdict() for row in rows[:limit]], len(rows) > limit
+
+    @staticmethod
+    async def _search_prefix(db: AsyncSession, query: str, limit: int) -> Tuple[list, bool]:
+        user_ids, truncated = user_search_index.search(query, limit)
+        if not user_ids:
+            return [], truncated
+
+        rows = (await db.execute(select(*LIST_COLUMNS).where(User.id.in_(user_ids)))).all()
+        by_id = {row.id: row._asdict() for row in rows}
+        return [by_id[user_id] for user_id in user_ids if user_id in by_id], truncated
+
+    @staticmethod
+    async def search(db: AsyncSession, query: str, limit: int) -> dict:
+        if SEARCH_BACKEND == "trigram":
+            items, truncated = await UserSearchService._search_trigram(db, query, limit)
+        else:
+            items, truncated = await UserSearchService._search_prefix(db, query, limit)
+        return {"items": items, "truncated": truncated}
+
+
+# Keeping the prefix index current with this worker's commits
+
+_PENDING_KEY = "user_search_pending"
+
+
+def _record_user(mapper, connection, target) -> None:
+    session = inspect(target).session
+    if session is not None:
+        session.info.setdefault(_PENDING_KEY, {})[target.id] = (target.username, target.email)
+
+
+def _apply_pending(session: Session) -> None:
+    for user_id, (username, email) in session.info.pop(_PENDING_KEY, {}).items():
+        user_search_index.put(user_id, username, email)
+
+
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+if user_search_index.enabled:
+    event.listen(User, "after_insert", _record_user)
+    event.listen(User, "after_update", _record_user)
+    event.listen(Session, "after_commit", _apply_pending)
+    event.listen(Session, "after_rollback", _discard_pending)
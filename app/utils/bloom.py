@@ -0,0 +1,52 @@
+import math
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings.
+
+    Sized for ``capacity`` items at ``error_rate`` false positives; never
+    yields false negatives. Items can't be removed, so callers rebuild it to
+    age entries out. Positions come from Python's per-process string hash, so
+    a filter must not be shared between processes.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        # Kirsch-Mitzenmacher: k positions from two base hashes
+        h1 = hash(item)
+        h2 = hash((item, 0x9E3779B9)) | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hash_count)]
+
+    def add(self, item: str) -> bool:
+        """Add ``item``; returns False if it was (probably) already present."""
+        bits = self._bits
+        added = False
+        for position in self._positions(item):
+            mask = 1 << (position & 7)
+            if not bits[position >> 3] & mask:
+                bits[position >> 3] |= mask
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    def __contains__(self, item: str) -> bool:
+        # Inlined _positions so a miss (the common case) stops at the first clear bit
+        bits = self._bits
+        size = self.size
+        h1 = hash(item)
+        h2 = hash((item, 0x9E3779B9)) | 1
+        for i in range(self.hash_count):
+            position = (h1 + i * h2) % size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
@@ -0,0 +1,8 @@
+from datetime import datetime, timezone
+
+
+def ensure_utc(value: datetime) -> datetime:
+    """Attach UTC to naive datetimes (SQLite drops tzinfo from timezone columns)."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
@@ -0,0 +1,60 @@
+import bisect
+from typing import Dict, Iterable, List, Tuple
+
+
+class PrefixIndex:
+    """Sorted ``(key, id)`` pairs answering "keys that start with ..." by binary search.
+
+    An id may have several keys; ``set`` replaces all of them. Lookups cost
+    O(log n + matches); ``set`` / ``remove`` shift the list, which stays well
+    under a millisecond up to a few hundred thousand keys. Callers normalize
+    keys (e.g. lowercase) before adding and searching.
+    """
+
+    def __init__(self):
+        self._entries: List[Tuple[str, int]] = []
+        self._keys: Dict[int, Tuple[str, ...]] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def load(self, items: Iterable[Tuple[int, Iterable[str]]]) -> None:
+        """Replace the whole index with ``(id, keys)`` items."""
+        entries: List[Tuple[str, int]] = []
+        keys: Dict[int, Tuple[str, ...]] = {}
+        for item_id, item_keys in items:
+            keys[item_id] = tuple(set(item_keys))
+            entries.extend((key, item_id) for key in keys[item_id])
+        entries.sort()
+        self._entries = entries
+        self._keys = keys
+
+    def set(self, item_id: int, keys: Iterable[str]) -> None:
+        keys = tuple(set(keys))
+        if self._keys.get(item_id) == keys:
+            return
+        self.remove(item_id)
+        for key in keys:
+            bisect.insort(self._entries, (key, item_id))
+        self._keys[item_id] = keys
+
+    def remove(self, item_id: int) -> None:
+        entries = self._entries
+        for key in self._keys.pop(item_id, ()):
+            position = bisect.bisect_left(entries, (key, item_id))
+            if position < len(entries) and entries[position] == (key, item_id):
+                del entries[position]
+
+    def search(self, prefix: str, limit: int) -> List[Tuple[str, int]]:
+        """Up to ``limit`` ``(key, id)`` pairs whose key starts with ``prefix``, in key order."""
+        entries = self._entries
+        # (prefix,) sorts before every (prefix..., id)
+        position = bisect.bisect_left(entries, (prefix,))
+        matches = []
+        while position < len(entries) and len(matches) < limit:
+            entry = entries[position]
+            if not entry[0].startswith(prefix):
+                break
+            matches.append(entry)
+            position += 1
+        return matches
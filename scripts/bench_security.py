@@ -0,0 +1,302 @@
+"""Microbenchmark the password hashing and JWT primitives in app/core/security.py.
+
+Measures, single-threaded and across N processes:
+  bcrypt    hash / verify per cost factor (the service uses PASSWORD_BCRYPT_ROUNDS)
+  jwt       encode / decode per algorithm and payload size, with keys loaded
+            through app.core.keys like the service does
+  security  create_access_token, create_refresh_token and decode_token
+            (uncached and cached) with the configured SECRET_KEY / ALGORITHM
+
+EdDSA is not supported by python-jose; it is measured as a reference on the
+raw JWS signing input with cryptography's Ed25519, marked as such.
+
+Prints a comparison table and writes a JSON baseline. With --compare, the
+table shows the change in single-thread ops/s against an earlier baseline.
+
+Usage: python -m scripts.bench_security [--rounds 10,11,12,13]
+                                        [--algorithms HS256,RS256,ES256,EdDSA]
+                                        [--payloads small,medium,large]
+                                        [--min-time SECONDS] [--processes N] [--skip-multi]
+                                        [--output FILE] [--compare FILE]
+"""
+
+import argparse
+import base64
+import json
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List
+
+# Claims added on top of sub/exp/type/iat/jti: medium is an app-scoped token (perms
+# bitset) for a 40-page app with 8 actions, large one for a 500-page app
+PAYLOADS = {
+    "small": {},
+    "medium": {"app": "crm", "pv": "c26e9b59e9bb", "perms": "A" * 54},
+    "large": {"app": "erp", "pv": "0f3a6be1d922", "perms": "A" * 667},
+}
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _claims(payload: str) -> dict:
+    claims = {
+        "sub": "12345",
+        "exp": int(time.time()) + 3600,
+        "iat": int(time.time()),
+        "jti": "8c0b5f1c7d3e4f6a9b2c1d0e3f4a5b6c",
+        "type": "access",
+    }
+    claims.update(PAYLOADS[payload])
+    return claims
+
+
+def _jose_keys(algorithm: str):
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ec, rsa
+
+    from app.core.keys import load_signing_key
+
+    if algorithm.startswith("HS"):
+        secret = "x" * 64
+        return secret, secret
+
+    if algorithm.startswith("RS"):
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    else:
+        curves = {"ES256": ec.SECP256R1(), "ES384": ec.SECP384R1(), "ES512": ec.SECP521R1()}
+        private_key = ec.generate_private_key(curves[algorithm])
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    signing_key = load_signing_key("bench", pem)
+    return signing_key.sign_key, signing_key.verify_key
+
+
+def _eddsa_ops(op: str, claims: dict) -> Callable[[], object]:
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+
+    private_key = Ed25519PrivateKey.generate()
+    public_key = private_key.public_key()
+    header = _b64(json.dumps({"alg": "EdDSA", "typ": "JWT"}, separators=(",", ":")).encode())
+
+    def encode() -> str:
+        body = _b64(json.dumps(claims, separators=(",", ":")).encode())
+        signing_input = f"{header}.{body}"
+        return f"{signing_input}.{_b64(private_key.sign(signing_input.encode()))}"
+
+    token = encode()
+
+    def decode() -> dict:
+        signing_input, _, signature = token.rpartition(".")
+        public_key.verify(
+            base64.urlsafe_b64decode(signature + "=" * (-len(signature) % 4)),
+            signing_input.encode(),
+        )
+        body = signing_input.split(".")[1]
+        return json.loads(base64.urlsafe_b64decode(body + "=" * (-len(body) % 4)))
+
+    return encode if op == "encode" else decode
+
+
+def build_op(case: dict) -> Callable[[], object]:
+    """Turn a case spec into a zero-argument callable (also used in worker processes)."""
+    group, op = case["group"], case["op"]
+
+    if group == "bcrypt":
+        import bcrypt
+
+        salt = bcrypt.gensalt(rounds=case["rounds"])
+        password = b"correct horse battery staple"
+        hashed = bcrypt.hashpw(password, salt)
+        if op == "hash":
+            return lambda: bcrypt.hashpw(password, bcrypt.gensalt(rounds=case["rounds"]))
+        return lambda: bcrypt.checkpw(password, hashed)
+
+    if group == "jwt":
+        claims = _claims(case["payload"])
+        if case["algorithm"] == "EdDSA":
+            return _eddsa_ops(op, claims)
+
+        from jose import jwt
+
+        sign_key, verify_key = _jose_keys(case["algorithm"])
+        algorithm = case["algorithm"]
+        token = jwt.encode(claims, sign_key, algorithm=algorithm)
+        if op == "encode":
+            return lambda: jwt.encode(claims, sign_key, algorithm=algorithm)
+        return lambda: jwt.decode(token, verify_key, algorithms=[algorithm])
+
+    if group == "security":
+        from app.core import security
+
+        if op == "create_access_token":
+            return lambda: security.create_access_token({"sub": "12345"})
+        if op == "create_refresh_token":
+            return lambda: security.create_refresh_token({"sub": "12345"})
+
+        token = security.create_access_token({"sub": "12345"})
+        if op == "decode_token_uncached":
+            return lambda: security._verify(token)
+        security.decode_token(token)
+        return lambda: security.decode_token(token)
+
+    raise ValueError(f"Unknown case {case}")
+
+
+def case_name(case: dict) -> str:
+    if case["group"] == "bcrypt":
+        return f"bcrypt.{case['op']} rounds={case['rounds']}"
+    if case["group"] == "jwt":
+        name = f"jwt.{case['op']} {case['algorithm']} payload={case['payload']}"
+        return name + " (reference)" if case["algorithm"] == "EdDSA" else name
+    return f"security.{case['op']}"
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def measure_single(case: dict, min_time: float, min_iterations: int = 5) -> dict:
+    op = build_op(case)
+    op()  # warm-up
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < min_iterations or time.perf_counter() - started < min_time:
+        t0 = time.perf_counter()
+        op()
+        timings.append(time.perf_counter() - t0)
+    total = sum(timings)
+    timings.sort()
+    return {
+        "iterations": len(timings),
+        "ops_per_sec": round(len(timings) / total, 2),
+        "mean_us": round(total / len(timings) * 1e6, 2),
+        "p50_us": round(_percentile(timings, 50) * 1e6, 2),
+        "p99_us": round(_percentile(timings, 99) * 1e6, 2),
+    }
+
+
+def _rate_for(case: dict, seconds: float) -> float:
+    op = build_op(case)
+    op()
+    count = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        op()
+        count += 1
+    return count / (time.perf_counter() - started)
+
+
+def measure_multi(case: dict, min_time: float, processes: int, pool) -> dict:
+    # Workers run over the same window, so their rates add up
+    rates = list(pool.map(_rate_for, [case] * processes, [min_time] * processes))
+    return {"processes": processes, "ops_per_sec": round(sum(rates), 2)}
+
+
+def build_cases(args: argparse.Namespace) -> List[dict]:
+    cases = []
+    for rounds in args.rounds:
+        for op in ("hash", "verify"):
+            cases.append({"group": "bcrypt", "op": op, "rounds": rounds})
+    for algorithm in args.algorithms:
+        for payload in args.payloads:
+            for op in ("encode", "decode"):
+                cases.append({"group": "jwt", "op": op, "algorithm": algorithm, "payload": payload})
+    for op in (
+        "create_access_token",
+        "create_refresh_token",
+        "decode_token_uncached",
+        "decode_token_cached",
+    ):
+        cases.append({"group": "security", "op": op})
+    return cases
+
+
+def print_table(results: Dict[str, dict], baseline: Dict[str, dict]) -> None:
+    header = f"{'case':<48} {'ops/s':>12} {'mean us':>11} {'p99 us':>11} {'multi ops/s':>13}"
+    if baseline:
+        header += f" {'vs base':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, result in results.items():
+        single = result["single"]
+        multi = result.get("multi", {}).get("ops_per_sec")
+        multi = f"{multi:,.1f}" if multi is not None else "-"
+        line = (
+            f"{name:<48} {single['ops_per_sec']:>12,.1f} {single['mean_us']:>11,.1f} "
+            f"{single['p99_us']:>11,.1f} {multi:>13}"
+        )
+        if baseline:
+            previous = baseline.get(name, {}).get("single", {}).get("ops_per_sec")
+            change = f"{(single['ops_per_sec'] / previous - 1) * 100:+.1f}%" if previous else "new"
+            line += f" {change:>9}"
+        print(line)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", default="10,11,12,13")
+    parser.add_argument("--algorithms", default="HS256,RS256,ES256,EdDSA")
+    parser.add_argument("--payloads", default="small,medium,large")
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds per measurement")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--skip-multi", action="store_true", help="single-thread only")
+    parser.add_argument("--output", default="bench_security.json")
+    parser.add_argument("--compare", help="earlier JSON baseline to compare against")
+    args = parser.parse_args()
+    args.rounds = [int(value) for value in args.rounds.split(",") if value]
+    args.algorithms = [value for value in args.algorithms.split(",") if value]
+    args.payloads = [value for value in args.payloads.split(",") if value]
+    unknown = set(args.payloads) - set(PAYLOADS)
+    if unknown:
+        parser.error(f"unknown payloads: {', '.join(sorted(unknown))}")
+    return args
+
+
+def main() -> int:
+    args = parse_args()
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+
+    results: Dict[str, dict] = {}
+    pool = None if args.skip_multi else ProcessPoolExecutor(max_workers=args.processes)
+    try:
+        for case in build_cases(args):
+            name = case_name(case)
+            print(f"  {name}", file=sys.stderr)
+            results[name] = {"case": case, "single": measure_single(case, args.min_time)}
+            if pool is not None:
+                results[name]["multi"] = measure_multi(case, args.min_time, args.processes, pool)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    print_table(results, baseline)
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "min_time": args.min_time,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+        f.write("\n")
+    print(f"\nBaseline written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
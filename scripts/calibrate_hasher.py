@@ -0,0 +1,123 @@
+"""Pick password hashing parameters that hit a target per-hash latency on this machine.
+
+bcrypt: raises the cost factor until the median hash time would exceed the
+target and keeps the last one that fit. argon2id: keeps memory and
+parallelism fixed and raises time_cost the same way; if time_cost=1 is
+already too slow, memory is halved (down to 19 MiB) until it fits.
+
+Measures single hashes on an otherwise idle machine through the same hasher
+classes the service uses; under load the hasher pool adds queueing on top.
+Prints the .env lines for the chosen parameters.
+
+Usage: python -m scripts.calibrate_hasher [--scheme bcrypt|argon2id|all] [--target-ms 250]
+                                          [--samples 5] [--memory-mib 64] [--parallelism 4]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from typing import Callable, Optional, Tuple
+
+PASSWORD = "calibration-password"
+BCRYPT_ROUNDS = range(8, 18)
+ARGON2_MAX_TIME_COST = 10
+# OWASP minimum for argon2id
+ARGON2_MIN_MEMORY_KIB = 19 * 1024
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scheme", choices=("bcrypt", "argon2id", "all"), default="all")
+    parser.add_argument("--target-ms", type=float, default=250.0, help="per-hash latency")
+    parser.add_argument("--samples", type=int, default=5, help="hashes timed per candidate")
+    parser.add_argument("--memory-mib", type=int, default=64, help="argon2id starting memory")
+    parser.add_argument("--parallelism", type=int, default=4, help="argon2id lanes")
+    return parser.parse_args()
+
+
+def median_ms(hash_fn: Callable[[str], str], samples: int) -> float:
+    hash_fn(PASSWORD)  # warm-up
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        hash_fn(PASSWORD)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate_bcrypt(target_ms: float, samples: int) -> Tuple[int, float]:
+    from app.core.hashing import BcryptHasher
+
+    best: Optional[Tuple[int, float]] = None
+    for rounds in BCRYPT_ROUNDS:
+        elapsed = median_ms(BcryptHasher(rounds).hash, samples)
+        print(f"  bcrypt rounds={rounds:<2} {elapsed:9.1f} ms", file=sys.stderr)
+        if elapsed > target_ms:
+            break
+        best = (rounds, elapsed)
+    if best is None:
+        print("  even the lowest cost is over target; using it anyway", file=sys.stderr)
+        best = (BCRYPT_ROUNDS[0], elapsed)
+    return best
+
+
+def calibrate_argon2(
+    target_ms: float, samples: int, memory_kib: int, parallelism: int
+) -> Tuple[int, int, float]:
+    from app.core.hashing import Argon2Hasher
+
+    while True:
+        best: Optional[Tuple[int, int, float]] = None
+        for time_cost in range(1, ARGON2_MAX_TIME_COST + 1):
+            hasher = Argon2Hasher(time_cost, memory_kib, parallelism)
+            elapsed = median_ms(hasher.hash, samples)
+            print(
+                f"  argon2id m={memory_kib // 1024}MiB t={time_cost:<2} p={parallelism}"
+                f" {elapsed:9.1f} ms",
+                file=sys.stderr,
+            )
+            if elapsed > target_ms:
+                break
+            best = (time_cost, memory_kib, elapsed)
+
+        if best is not None:
+            return best
+        if memory_kib // 2 < ARGON2_MIN_MEMORY_KIB:
+            print("  even the smallest setting is over target; using it anyway", file=sys.stderr)
+            return 1, memory_kib, elapsed
+        memory_kib //= 2
+
+
+def main() -> int:
+    args = parse_args()
+    cpus = os.cpu_count() or 1
+    print(f"Target {args.target_ms:.0f} ms per hash on {cpus} CPUs\n", file=sys.stderr)
+
+    if args.scheme in ("bcrypt", "all"):
+        rounds, elapsed = calibrate_bcrypt(args.target_ms, args.samples)
+        print(f"\n# bcrypt: {elapsed:.1f} ms per hash, ~{cpus * 1000 / elapsed:.0f} hashes/s")
+        print("PASSWORD_HASH_SCHEME=bcrypt")
+        print(f"PASSWORD_BCRYPT_ROUNDS={rounds}")
+
+    if args.scheme in ("argon2id", "all"):
+        try:
+            time_cost, memory_kib, elapsed = calibrate_argon2(
+                args.target_ms, args.samples, args.memory_mib * 1024, args.parallelism
+            )
+        except RuntimeError as exc:
+            print(f"\n# argon2id skipped: {exc}")
+        else:
+            # Each hash keeps up to ``parallelism`` threads busy
+            rate = max(1, cpus // args.parallelism) * 1000 / elapsed
+            print(f"\n# argon2id: {elapsed:.1f} ms per hash, ~{rate:.0f} hashes/s")
+            print("PASSWORD_HASH_SCHEME=argon2id")
+            print(f"PASSWORD_ARGON2_TIME_COST={time_cost}")
+            print(f"PASSWORD_ARGON2_MEMORY_COST={memory_kib}")
+            print(f"PASSWORD_ARGON2_PARALLELISM={args.parallelism}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+"""Seed a large dataset and assert every AuthService query is served by an index.
+
+Runs each AuthService flow against a scratch database, captures the SQL it
+issues and EXPLAINs every SELECT/UPDATE/DELETE. Exits non-zero if any of them
+plans a full table scan.
+
+Usage: python -m scripts.check_query_plans [--database-url URL] [--rows N]
+
+The database is dropped and recreated; never point this at real data.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+
+SCANNED_TABLES = {"users", "otps", "refresh_tokens"}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--database-url",
+        default=f"sqlite:///{os.path.join(tempfile.gettempdir(), 'auth_query_plans.db')}",
+    )
+    parser.add_argument("--rows", type=int, default=50000)
+    return parser.parse_args()
+
+
+def seed(engine, rows: int) -> None:
+    from datetime import datetime, timedelta, timezone
+
+    from sqlalchemy import insert, text
+
+    from app.core.constants import OTPPurposeEnum
+    from app.core.database import Base
+    from app.core.security import hash_password, hash_token
+    from app.models.otp import OTP
+    from app.models.user import RefreshToken, User
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    now = datetime.now(timezone.utc)
+    password_hash = hash_password("password123")
+    purposes = [OTPPurposeEnum.SIGNUP, OTPPurposeEnum.PASSWORD_RESET]
+    with engine.begin() as conn:
+        conn.execute(
+            insert(User),
+            [
+                {
+                    "username": f"user{i}",
+                    "email": f"user{i}@example.com",
+                    "password_hash": password_hash,
+                    "is_active": True,
+                    "email_verified": True,
+                }
+                for i in range(rows)
+            ],
+        )
+        conn.execute(
+            insert(OTP),
+            [
+                {
+                    "identifier": f"user{i}@example.com",
+                    "code": "123456",
+                    "purpose": purposes[i % 2],
+                    "attempts": 0,
+                    "is_verified": i % 3 == 0,
+                    "created_at": now - timedelta(hours=i % 48),
+                    "expires_at": now - timedelta(hours=i % 48) + timedelta(minutes=10),
+                }
+                for i in range(10, rows)
+            ],
+        )
+        conn.execute(
+            insert(RefreshToken),
+            [
+                {
+                    "user_id": (i % rows) + 1,
+                    "token_hash": hash_token(f"seed-token-{i}"),
+                    "expires_at": now + timedelta(days=(i % 14) - 7),
+                    "revoked": i % 4 == 0,
+                }
+                for i in range(rows * 2)
+            ],
+        )
+        conn.execute(text("ANALYZE"))
+
+
+async def exercise(captured: list) -> None:
+    from sqlalchemy import select
+
+    from app.core.constants import OTPPurposeEnum
+    from app.core.database import AsyncSessionLocal
+    from app.core.security import decode_token
+    from app.models.otp import OTP
+    from app.services.auth_service import AuthService
+
+    async def latest_code(email: str) -> str:
+        captured.append(("(helper)", None, None))
+        async with AsyncSessionLocal() as db:
+            return await db.scalar(
+                select(OTP.code)
+                .where(OTP.identifier == email, OTP.is_verified.is_(False))
+                .order_by(OTP.created_at.desc())
+                .limit(1)
+            )
+
+    async def step(name: str, call):
+        captured.append((name, None, None))
+        async with AsyncSessionLocal() as db:
+            return await call(db)
+
+    await step(
+        "request_signup_otp",
+        lambda db: AuthService.request_signup_otp("new@example.com", "newuser", db),
+    )
+    code = await latest_code("new@example.com")
+    await step(
+        "verify_otp_and_signup",
+        lambda db: AuthService.verify_otp_and_signup(
+            "new@example.com", code, "password123", "newuser", db
+        ),
+    )
+    login = await step(
+        "login", lambda db: AuthService.login("user1@example.com", "password123", db)
+    )
+    refreshed = await step(
+        "refresh_access_token",
+        lambda db: AuthService.refresh_access_token(login["tokens"]["refresh_token"], db),
+    )
+    await step(
+        "logout",
+        lambda db: AuthService.logout(
+            refreshed["refresh_token"],
+            str(login["user"]["id"]),
+            db,
+            access_payload=decode_token(refreshed["access_token"]),
+        ),
+    )
+    await step(
+        "request_password_reset",
+        lambda db: AuthService.request_password_reset("user2@example.com", db),
+    )
+    code = await latest_code("user2@example.com")
+    await step(
+        "reset_password_with_otp",
+        lambda db: AuthService.reset_password_with_otp(
+            "user2@example.com", code, "newpassword123", db
+        ),
+    )
+    await step(
+        "resend_otp",
+        lambda db: AuthService.resend_otp("user3@example.com", OTPPurposeEnum.PASSWORD_RESET, db),
+    )
+    await step(
+        "change_password",
+        lambda db: AuthService.change_password("4", "password123", "password456", db),
+    )
+
+
+async def full_scans(async_engine, statement: str, parameters) -> list:
+    """Return the tables the plan reads without an index."""
+    async with async_engine.connect() as conn:
+        if async_engine.dialect.name == "postgresql":
+            plan = (
+                await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+            ).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            scans, nodes = [], [plan[0]["Plan"]]
+            while nodes:
+                node = nodes.pop()
+                if node["Node Type"] == "Seq Scan" and node["Relation Name"] in SCANNED_TABLES:
+                    scans.append(node["Relation Name"])
+                nodes.extend(node.get("Plans", []))
+            return scans
+
+        rows = (await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)).all()
+        return [
+            row[-1].split()[1]
+            for row in rows
+            if row[-1].startswith("SCAN ")
+            and "USING" not in row[-1]
+            and row[-1].split()[1] in SCANNED_TABLES
+        ]
+
+
+def main() -> int:
+    args = parse_args()
+    os.environ["DATABASE_URL"] = args.database_url
+
+    from sqlalchemy import create_engine, event
+
+    from app.core.database import async_engine
+    from app.core.security import password_hasher
+
+    async_engine.echo = False
+    engine = create_engine(args.database_url)
+    seed(engine, args.rows)
+
+    captured: list = []
+
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            captured.append((captured[-1][0], statement, parameters))
+
+    async def run() -> list:
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                await exercise(captured)
+
+            results = []
+            for name, statement, parameters in list(captured):
+                if statement is None or name == "(helper)":
+                    continue
+                scans = await full_scans(async_engine, statement, parameters)
+                results.append(
+                    {
+                        "step": name,
+                        "statement": " ".join(statement.split()),
+                        "full_scans": scans,
+                    }
+                )
+            return results
+        finally:
+            password_hasher.shutdown()
+            await async_engine.dispose()
+
+    results = asyncio.run(run())
+    failed = any(result["full_scans"] for result in results)
+
+    json.dump({"passed": not failed, "queries": results}, sys.stdout, indent=2)
+    print()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""Bulk-create users from a CSV (with a header row) or NDJSON file.
+
+Columns / keys: email, username, password and optionally is_active and
+email_verified. The file is streamed and imported in batches, hashing on the
+local hasher pool and inserting straight into DATABASE_URL; progress goes to
+stderr and the final report (with per-row errors) to stdout as JSON.
+
+Usage: python -m scripts.import_users FILE [--format csv|ndjson] [--batch-size N] [--dry-run]
+       (FILE may be - for stdin; the format defaults from the file extension)
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import AsyncIterator, BinaryIO, Optional
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.database import async_engine
+from app.core.security import password_hasher
+from app.services.user_import_service import FORMATS, UserImportReport, UserImportService
+
+CHUNK_SIZE = 64 * 1024
+
+
+async def read_chunks(stream: BinaryIO) -> AsyncIterator[bytes]:
+    while True:
+        chunk = await asyncio.to_thread(stream.read, CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+def guess_format(path: str) -> Optional[str]:
+    if path.endswith(".csv"):
+        return "csv"
+    if path.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return None
+
+
+async def main(path: str, fmt: str, batch_size: int, dry_run: bool) -> int:
+    started = time.perf_counter()
+
+    def on_progress(report: UserImportReport) -> None:
+        elapsed = time.perf_counter() - started
+        print(
+            f"{report.processed} rows, {report.created} created, {report.duplicates} duplicates,"
+            f" {report.invalid} invalid ({report.processed / elapsed:.0f} rows/s)",
+            file=sys.stderr,
+        )
+
+    stream = sys.stdin.buffer if path == "-" else open(path, "rb")
+    try:
+        report = await UserImportService.import_users(
+            read_chunks(stream),
+            fmt,
+            batch_size=batch_size,
+            dry_run=dry_run,
+            on_progress=on_progress,
+        )
+    except HTTPException as exc:
+        print(f"Import failed: {exc.detail}", file=sys.stderr)
+        return 1
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+        password_hasher.shutdown()
+        await async_engine.dispose()
+
+    print(json.dumps(report.as_dict(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("file", help="CSV / NDJSON file, or - for stdin")
+    parser.add_argument("--format", choices=FORMATS, help="defaults from the file extension")
+    parser.add_argument("--batch-size", type=int, default=settings.USER_IMPORT_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="validate and check duplicates only")
+    args = parser.parse_args()
+
+    fmt = args.format or guess_format(args.file)
+    if fmt is None:
+        parser.error("cannot tell the format from the file name; pass --format")
+    sys.exit(asyncio.run(main(args.file, fmt, args.batch_size, args.dry_run)))
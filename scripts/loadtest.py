@@ -0,0 +1,336 @@
+"""Drive concurrent load against the auth endpoints and report latency percentiles.
+
+Boots app.main:app under uvicorn against a scratch database, seeds verified
+users, then runs each scenario for a fixed duration with N concurrent
+clients. Prints one JSON document with throughput and p50/p95/p99 latency per
+endpoint, suitable for diffing between releases.
+
+Scenarios:
+  login    POST /auth/login
+  refresh  POST /auth/refresh, rotating each client's refresh token
+  me       GET /users/me with a long-lived access token
+  signup   POST /auth/signup/request then /auth/signup/verify (OTP read from the DB)
+
+Usage: python -m scripts.loadtest [--database-url URL] [--users N] [--concurrency N]
+                                  [--duration SECONDS] [--scenarios login,refresh,me,signup]
+                                  [--workers N] [--port PORT] [--output FILE]
+       python -m scripts.loadtest --base-url http://host:port --database-url URL ...
+
+The database is dropped and recreated; never point this at real data. With
+--base-url no server is started and --database-url must be the one that
+server uses. Rate limiting is disabled in the booted server unless
+--rate-limit is given.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter, defaultdict
+from typing import Dict, List
+
+SCENARIOS = ("login", "refresh", "me", "signup")
+PASSWORD = "loadtest-password"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--database-url",
+        default=f"sqlite:///{os.path.join(tempfile.gettempdir(), 'auth_loadtest.db')}",
+    )
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per scenario")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--base-url", help="target an already running server instead")
+    parser.add_argument("--rate-limit", action="store_true", help="keep rate limiting on")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    return args
+
+
+def seed(engine, users: int) -> None:
+    from sqlalchemy import insert
+
+    from app.core.database import Base
+    from app.core.security import hash_password
+    from app.models.user import User
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    password_hash = hash_password(PASSWORD)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(User),
+            [
+                {
+                    "username": f"load{i}",
+                    "email": f"load{i}@example.com",
+                    "password_hash": password_hash,
+                    "is_active": True,
+                    "email_verified": True,
+                }
+                for i in range(users)
+            ],
+        )
+
+
+def start_server(args: argparse.Namespace) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        DATABASE_URL=args.database_url,
+        DB_ECHO="false",
+        OTP_STORE_BACKEND="sql",
+        PURGE_INTERVAL_SECONDS="0",
+    )
+    if not args.rate_limit:
+        env["RATE_LIMIT_ENABLED"] = "false"
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--port",
+            str(args.port),
+            "--workers",
+            str(args.workers),
+            "--log-level",
+            "warning",
+            "--no-access-log",
+        ],
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+
+
+async def wait_until_healthy(client, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            status = (await client.get("/health")).status_code
+            if status == 200:
+                return
+            problem = f"/health returned {status}"
+        except Exception as exc:
+            problem = f"/health failed: {exc!r}"
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"Server not healthy after {timeout:g}s ({problem})")
+        await asyncio.sleep(0.2)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    # Nearest-rank percentile
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+
+    async def request(self, client, endpoint: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            status = response.status_code
+        except Exception as exc:
+            response, status = None, type(exc).__name__
+        self.latencies[endpoint].append(time.perf_counter() - started)
+        self.statuses[endpoint][str(status)] += 1
+        return response
+
+    def report(self, elapsed: float) -> dict:
+        endpoints = {}
+        for endpoint, values in self.latencies.items():
+            values.sort()
+            statuses = self.statuses[endpoint]
+            errors = sum(
+                count
+                for status, count in statuses.items()
+                if not (status.isdigit() and int(status) < 400)
+            )
+            endpoints[endpoint] = {
+                "requests": len(values),
+                "errors": errors,
+                "status_counts": dict(statuses),
+                "throughput_rps": round(len(values) / elapsed, 2),
+                "mean_ms": round(sum(values) / len(values) * 1000, 3),
+                "p50_ms": round(percentile(values, 50) * 1000, 3),
+                "p95_ms": round(percentile(values, 95) * 1000, 3),
+                "p99_ms": round(percentile(values, 99) * 1000, 3),
+                "max_ms": round(values[-1] * 1000, 3),
+            }
+        total = sum(len(values) for values in self.latencies.values())
+        return {
+            "duration_s": round(elapsed, 3),
+            "requests": total,
+            "throughput_rps": round(total / elapsed, 2),
+            "endpoints": endpoints,
+        }
+
+
+async def login(client, prefix: str, index: int) -> dict:
+    response = await client.post(
+        f"{prefix}/auth/login",
+        json={"email": f"load{index}@example.com", "password": PASSWORD},
+    )
+    response.raise_for_status()
+    return response.json()["tokens"]
+
+
+async def run_scenario(name: str, client, args: argparse.Namespace, engine) -> dict:
+    from sqlalchemy import text
+
+    prefix = "/api/v1"
+    recorder = Recorder()
+    run_id = uuid.uuid4().hex[:8]
+
+    async def latest_otp(email: str) -> str:
+        def query() -> str:
+            with engine.connect() as conn:
+                return conn.execute(
+                    text(
+                        "SELECT code FROM otps WHERE identifier = :email "
+                        "ORDER BY created_at DESC LIMIT 1"
+                    ),
+                    {"email": email},
+                ).scalar_one()
+
+        return await asyncio.to_thread(query)
+
+    async def client_loop(worker: int, deadline: float) -> None:
+        tokens = None
+        if name in ("refresh", "me"):
+            tokens = await login(client, prefix, worker % args.users)
+
+        iteration = 0
+        while time.monotonic() < deadline:
+            index = (worker + iteration * args.concurrency) % args.users
+            iteration += 1
+
+            if name == "login":
+                await recorder.request(
+                    client,
+                    "POST /auth/login",
+                    "POST",
+                    f"{prefix}/auth/login",
+                    json={"email": f"load{index}@example.com", "password": PASSWORD},
+                )
+            elif name == "refresh":
+                response = await recorder.request(
+                    client,
+                    "POST /auth/refresh",
+                    "POST",
+                    f"{prefix}/auth/refresh",
+                    json={"refresh_token": tokens["refresh_token"]},
+                )
+                if response is not None and response.status_code == 200:
+                    tokens = response.json()
+                else:
+                    tokens = await login(client, prefix, worker % args.users)
+            elif name == "me":
+                await recorder.request(
+                    client,
+                    "GET /users/me",
+                    "GET",
+                    f"{prefix}/users/me",
+                    headers={"Authorization": f"Bearer {tokens['access_token']}"},
+                )
+            elif name == "signup":
+                email = f"signup-{run_id}-{worker}-{iteration}@example.com"
+                response = await recorder.request(
+                    client,
+                    "POST /auth/signup/request",
+                    "POST",
+                    f"{prefix}/auth/signup/request",
+                    json={"email": email, "username": f"s{run_id}w{worker}i{iteration}"},
+                )
+                if response is None or response.status_code != 200:
+                    continue
+                await recorder.request(
+                    client,
+                    "POST /auth/signup/verify",
+                    "POST",
+                    f"{prefix}/auth/signup/verify",
+                    json={"email": email, "otp": await latest_otp(email), "password": PASSWORD},
+                )
+
+    started = time.monotonic()
+    deadline = started + args.duration
+    await asyncio.gather(*(client_loop(worker, deadline) for worker in range(args.concurrency)))
+    return recorder.report(time.monotonic() - started)
+
+
+async def run(args: argparse.Namespace, engine) -> dict:
+    import httpx
+
+    base_url = args.base_url or f"http://127.0.0.1:{args.port}"
+    limits = httpx.Limits(
+        max_connections=args.concurrency, max_keepalive_connections=args.concurrency
+    )
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        await wait_until_healthy(client)
+        results = {}
+        for name in args.scenarios:
+            results[name] = await run_scenario(name, client, args, engine)
+    return results
+
+
+def main() -> int:
+    args = parse_args()
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["DB_ECHO"] = "false"
+
+    from sqlalchemy import create_engine
+
+    engine = create_engine(args.database_url)
+    seed(engine, args.users)
+
+    server = None if args.base_url else start_server(args)
+    try:
+        results = asyncio.run(run(args, engine))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    report = {
+        "config": {
+            "database": engine.url.get_backend_name(),
+            "users": args.users,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "workers": args.workers,
+            "rate_limit": args.rate_limit,
+        },
+        "scenarios": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
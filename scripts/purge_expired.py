@@ -0,0 +1,28 @@
+"""Delete expired/used OTPs and refresh tokens, and old outbox emails.
+
+Usage: python -m scripts.purge_expired [--batch-size N] [--throttle SECONDS]
+"""
+
+import argparse
+import asyncio
+import json
+
+from app.core.config import settings
+from app.core.database import async_engine
+from app.services.purge_service import PurgeService
+
+
+async def main(batch_size: int, throttle: float) -> None:
+    try:
+        result = await PurgeService.purge_expired(batch_size=batch_size, throttle_seconds=throttle)
+    finally:
+        await async_engine.dispose()
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=settings.PURGE_BATCH_SIZE)
+    parser.add_argument("--throttle", type=float, default=settings.PURGE_THROTTLE_SECONDS)
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size, args.throttle))
@@ -0,0 +1,80 @@
+import asyncio
+import os
+import tempfile
+
+# Settings are read at import time, so the environment goes first
+_db_dir = tempfile.mkdtemp(prefix="auth-tests-")
+for name, value in {
+    "PROJECT_NAME": "auth-service-tests",
+    "VERSION": "test",
+    "API_V1_PREFIX": "/api/v1",
+    "DATABASE_URL": f"sqlite:///{_db_dir}/auth.db",
+    "SECRET_KEY": "test-secret-key",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "15",
+    "REFRESH_TOKEN_EXPIRE_DAYS": "7",
+    "OTP_EXPIRE_MINUTES": "10",
+    "RESEND_COOLDOWN_SECONDS": "60",
+    "BACKEND_CORS_ORIGINS": '["*"]',
+    "DB_ECHO": "false",
+    "PASSWORD_BCRYPT_ROUNDS": "4",
+    "PASSWORD_HASH_WORKERS": "1",
+    "RATE_LIMIT_ENABLED": "false",
+    "PURGE_INTERVAL_SECONDS": "0",
+    "QUERY_BUDGET_STRICT": "true",
+    "INTROSPECTION_API_KEYS": '["test-introspection-key"]',
+    # Every request takes the uncached path, the one the budgets are sized for
+    "PRINCIPAL_CACHE_TTL_SECONDS": "0",
+    "PERMISSION_CACHE_TTL_SECONDS": "0",
+    "INTROSPECTION_REFRESH_CACHE_TTL_SECONDS": "0",
+}.items():
+    os.environ.setdefault(name, value)
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from app import models  # noqa: E402,F401
+from app.core.database import ASYNC_DATABASE_URL, Base, SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def tables():
+    Base.metadata.create_all(engine)
+
+
+@pytest.fixture(scope="session")
+def client(tables):
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def run_async(tables):
+    """Run a coroutine function with a session factory of its own.
+
+    The app's engine pools connections on the TestClient's event loop, so
+    service-level tests get a fresh engine on theirs.
+    """
+
+    def run(fn):
+        async def main():
+            async_engine = create_async_engine(ASYNC_DATABASE_URL)
+            try:
+                return await fn(async_sessionmaker(async_engine, expire_on_commit=False))
+            finally:
+                await async_engine.dispose()
+
+        return asyncio.run(main())
+
+    return run
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
@@ -0,0 +1,53 @@
+"""Every way of setting a password rejects what the hashing scheme can't take."""
+
+import pytest
+from pydantic import ValidationError
+
+from app.core.hashing import hasher_registry
+from app.schemas.auth import ChangePasswordRequest, ResetPasswordRequest, VerifyOTPSchema
+from app.schemas.user import UserImportRow
+
+
+def _signup(password: str):
+    return VerifyOTPSchema(email="a@example.com", otp="123456", password=password)
+
+
+def _reset(password: str):
+    return ResetPasswordRequest(email="a@example.com", otp="123456", new_password=password)
+
+
+def _change(password: str):
+    return ChangePasswordRequest(
+        current_password="old-password",
+        new_password=password,
+        confirm_new_password=password,
+    )
+
+
+def _import(password: str):
+    return UserImportRow(email="a@example.com", username="alice", password=password)
+
+
+SETTERS = [_signup, _reset, _change, _import]
+
+
+@pytest.mark.parametrize("set_password", SETTERS)
+def test_accepts_a_password_of_the_longest_hashable_length(set_password):
+    limit = hasher_registry.current.max_password_bytes
+
+    set_password("é" * (limit // 2))
+
+
+@pytest.mark.parametrize("set_password", SETTERS)
+def test_rejects_a_password_longer_than_the_scheme_allows(set_password):
+    limit = hasher_registry.current.max_password_bytes
+
+    # Counted in UTF-8 bytes, not characters
+    with pytest.raises(ValidationError, match=f"at most {limit} bytes"):
+        set_password("é" * (limit // 2) + "a")
+
+
+@pytest.mark.parametrize("set_password", SETTERS)
+def test_rejects_a_short_password(set_password):
+    with pytest.raises(ValidationError, match="at least 8 characters"):
+        set_password("short")
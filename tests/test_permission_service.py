@@ -0,0 +1,51 @@
+from app.services.permission_service import (
+    EffectivePermissions,
+    PermissionCatalog,
+    PermissionResolver,
+)
+
+CATALOG = PermissionCatalog(
+    app_id=1,
+    app_code="app",
+    is_active=True,
+    pages={"/reports": 0},
+    actions={"read": 0},
+    page_ids={1: 0},
+    action_ids={1: 0},
+    version="v1",
+)
+
+
+def _store(resolver: PermissionResolver, user_id: int, role_ids=(1,)) -> None:
+    resolver._store((user_id, "app"), resolver._epoch, EffectivePermissions(CATALOG, 1), role_ids)
+
+
+def test_evicted_entries_leave_the_role_index():
+    resolver = PermissionResolver(maxsize=10, ttl=60)
+
+    for user_id in range(100):
+        _store(resolver, user_id, role_ids=(1, user_id + 1000))
+
+    assert len(resolver._entries) == 10
+    assert resolver._role_index[1] == {(user_id, "app") for user_id in range(90, 100)}
+    assert len(resolver._role_index) == 11
+
+
+def test_expired_entries_leave_the_role_index():
+    resolver = PermissionResolver(maxsize=10, ttl=0)
+    _store(resolver, 1)
+
+    assert resolver.cached(1, "app") is None
+    assert resolver._role_index == {}
+
+
+def test_invalidate_role_drops_its_entries_from_other_roles():
+    resolver = PermissionResolver(maxsize=10, ttl=60)
+    _store(resolver, 1, role_ids=(1, 2))
+    _store(resolver, 2, role_ids=(2,))
+
+    resolver.invalidate_role(1)
+
+    assert resolver.cached(1, "app") is None
+    assert resolver.cached(2, "app") is not None
+    assert resolver._role_index == {2: {(2, "app")}}
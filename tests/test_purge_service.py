@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.core.constants import OTP_MAX_RESENDS
+from app.models.otp import OTP
+from app.services.otp_store import OTPIssueStatus, SQLOTPStore
+from app.services.purge_service import PurgeService
+
+WINDOW_SECONDS = settings.OTP_EXPIRE_MINUTES * 60
+
+
+async def _issue(store: SQLOTPStore, email: str):
+    return await store.issue(
+        email,
+        "signup",
+        "123456",
+        ttl_seconds=WINDOW_SECONDS,
+        max_issues=OTP_MAX_RESENDS,
+        window_seconds=WINDOW_SECONDS,
+    )
+
+
+def test_purge_keeps_otps_counted_by_the_resend_limit(run_async):
+    email = "purge-limit@example.com"
+
+    async def scenario(session_factory):
+        store = SQLOTPStore(session_factory)
+        for _ in range(OTP_MAX_RESENDS):
+            assert (await _issue(store, email)).status == OTPIssueStatus.ISSUED
+
+        # Superseded codes are expired at once; the purge must still leave them
+        await PurgeService.purge_expired(throttle_seconds=0, session_factory=session_factory)
+
+        return (await _issue(store, email)).status
+
+    assert run_async(scenario) == OTPIssueStatus.LIMITED
+
+
+def test_purge_removes_otps_older_than_the_window(run_async):
+    email = "purge-old@example.com"
+
+    async def scenario(session_factory):
+        store = SQLOTPStore(session_factory)
+        await _issue(store, email)
+        async with session_factory() as db:
+            long_ago = datetime.now(timezone.utc) - timedelta(seconds=WINDOW_SECONDS + 60)
+            await db.execute(
+                update(OTP)
+                .where(OTP.identifier == email)
+                .values(created_at=long_ago, expires_at=long_ago)
+            )
+            await db.commit()
+
+        await PurgeService.purge_expired(throttle_seconds=0, session_factory=session_factory)
+
+        return (await _issue(store, email)).status
+
+    assert run_async(scenario) == OTPIssueStatus.ISSUED
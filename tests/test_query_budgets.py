@@ -0,0 +1,264 @@
+"""The budgeted routes, end to end, with QUERY_BUDGET_STRICT on.
+
+A route that runs more queries than its ``query_budget`` raises
+``QueryBudgetExceeded`` here instead of answering, so each test only has to
+go through the route; caches are disabled (see conftest) so the uncached path
+is the one measured.
+"""
+
+import itertools
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select, text
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.query_counter import QueryBudgetExceeded, QueryCountMiddleware, query_budget
+from app.models import App, Page, Permission, Role, UserAppRole
+from app.models.otp import OTP
+from app.models.permission import Action
+
+API = settings.API_V1_PREFIX
+PASSWORD = "password123"
+
+_ids = itertools.count(1)
+
+
+def _otp(db, email: str) -> str:
+    return db.scalar(
+        select(OTP.code).where(OTP.identifier == email).order_by(OTP.id.desc()).limit(1)
+    )
+
+
+def _signup(client, db) -> dict:
+    n = next(_ids)
+    email = f"user{n}@example.com"
+    response = client.post(
+        f"{API}/auth/signup/request", json={"email": email, "username": f"user{n}"}
+    )
+    assert response.status_code == 200, response.text
+
+    response = client.post(
+        f"{API}/auth/signup/verify",
+        json={"email": email, "otp": _otp(db, email), "password": PASSWORD},
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _login(client, email: str, app: str = None) -> dict:
+    response = client.post(
+        f"{API}/auth/login", json={"email": email, "password": PASSWORD, "app": app}
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["tokens"]
+
+
+def _grant(db, user_id: int) -> tuple:
+    """Create an app with one page / action and give ``user_id`` a role allowed it.
+
+    Returns the app code and the action name.
+    """
+    n = next(_ids)
+    app = App(name=f"App {n}", code=f"app{n}")
+    role = Role(name=f"role{n}")
+    action = Action(name=f"action{n}")
+    db.add_all([app, role, action])
+    db.flush()
+    page = Page(app_id=app.id, name="Reports", route="/reports")
+    db.add(page)
+    db.flush()
+    db.add_all(
+        [
+            Permission(role_id=role.id, page_id=page.id, action_id=action.id),
+            UserAppRole(user_id=user_id, app_id=app.id, role_id=role.id),
+        ]
+    )
+    db.commit()
+    return app.code, action.name
+
+
+@pytest.fixture
+def user(client, db) -> dict:
+    return _signup(client, db)
+
+
+@pytest.fixture
+def auth_headers(client, user) -> dict:
+    tokens = _login(client, user["email"])
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+def test_signup(client, db):
+    user = _signup(client, db)
+
+    assert user["email"].endswith("@example.com")
+
+
+def test_login(client, user):
+    assert _login(client, user["email"])["access_token"]
+
+
+def test_login_with_app(client, db, user):
+    app_code, _ = _grant(db, user["user_id"])
+
+    assert _login(client, user["email"], app=app_code)["access_token"]
+
+
+def test_refresh(client, user):
+    tokens = _login(client, user["email"])
+
+    response = client.post(f"{API}/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+
+    assert response.status_code == 200, response.text
+
+
+def test_logout(client, user):
+    tokens = _login(client, user["email"])
+
+    response = client.post(
+        f"{API}/auth/logout",
+        json={"refresh_token": tokens["refresh_token"]},
+        headers={"Authorization": f"Bearer {tokens['access_token']}"},
+    )
+
+    assert response.status_code == 200, response.text
+
+
+def test_password_reset(client, db, user):
+    response = client.post(f"{API}/auth/forgot-password", json={"email": user["email"]})
+    assert response.status_code == 200, response.text
+
+    response = client.post(
+        f"{API}/auth/reset-password",
+        json={
+            "email": user["email"],
+            "otp": _otp(db, user["email"]),
+            "new_password": PASSWORD,
+        },
+    )
+
+    assert response.status_code == 200, response.text
+
+
+def test_resend_otp(client):
+    email = f"user{next(_ids)}@example.com"
+    response = client.post(
+        f"{API}/auth/signup/request", json={"email": email, "username": email.split("@")[0]}
+    )
+    assert response.status_code == 200, response.text
+
+    # Refused by the cooldown, after the store's checks
+    response = client.post(f"{API}/auth/resend_otp", json={"email": email, "purpose": "signup"})
+
+    assert response.status_code == 429, response.text
+
+
+def test_get_me(client, auth_headers):
+    response = client.get(f"{API}/users/me", headers=auth_headers)
+
+    assert response.status_code == 200, response.text
+
+
+def test_update_me(client, auth_headers):
+    response = client.put(
+        f"{API}/users/me", json={"username": f"renamed{next(_ids)}"}, headers=auth_headers
+    )
+
+    assert response.status_code == 200, response.text
+
+
+def _introspect(client, token: str) -> dict:
+    response = client.post(
+        f"{API}/auth/introspect",
+        data={"token": token},
+        headers={"X-API-Key": "test-introspection-key"},
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_introspect(client, user):
+    tokens = _login(client, user["email"])
+
+    assert _introspect(client, tokens["access_token"])["active"] is True
+    assert _introspect(client, tokens["refresh_token"])["active"] is True
+
+
+def test_delete_me(client, user):
+    tokens = _login(client, user["email"])
+
+    response = client.delete(
+        f"{API}/users/me", headers={"Authorization": f"Bearer {tokens['access_token']}"}
+    )
+
+    assert response.status_code == 200, response.text
+    # Deactivating the account revokes the tokens already issued
+    assert _introspect(client, tokens["access_token"])["active"] is False
+    assert _introspect(client, tokens["refresh_token"])["active"] is False
+
+
+def test_permission_check(client, db, user, auth_headers):
+    app_code, action = _grant(db, user["user_id"])
+
+    response = client.get(
+        f"{API}/permissions/check",
+        params={"app": app_code, "page": "/reports", "action": action},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 200, response.text
+    assert response.json()["allowed"] is True
+
+
+def test_permission_check_denied(client, db, user, auth_headers):
+    app_code, _ = _grant(db, user["user_id"])
+
+    response = client.get(
+        f"{API}/permissions/check",
+        params={"app": app_code, "page": "/reports", "action": "missing"},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 200, response.text
+    assert response.json()["allowed"] is False
+
+
+def test_permission_catalog(client, db, user, auth_headers):
+    app_code, _ = _grant(db, user["user_id"])
+
+    response = client.get(f"{API}/permissions/apps/{app_code}/catalog", headers=auth_headers)
+    assert response.status_code == 200, response.text
+    version = response.json()["version"]
+
+    response = client.get(
+        f"{API}/permissions/apps/{app_code}/catalog",
+        params={"version": version},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200, response.text
+
+    # Only the current layout is served; tokens with an older pv get refreshed
+    response = client.get(
+        f"{API}/permissions/apps/{app_code}/catalog",
+        params={"version": "0" * 12},
+        headers=auth_headers,
+    )
+    assert response.status_code == 404, response.text
+
+
+def test_over_budget_fails_the_request(tables):
+    probe = FastAPI()
+    probe.add_middleware(QueryCountMiddleware)
+
+    @probe.get("/probe", dependencies=[Depends(query_budget(1))])
+    def run_two_queries():
+        with SessionLocal() as session:
+            session.execute(text("SELECT 1"))
+            session.execute(text("SELECT 2"))
+        return {}
+
+    with pytest.raises(QueryBudgetExceeded, match="SELECT 2"):
+        TestClient(probe).get("/probe")
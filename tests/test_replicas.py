@@ -0,0 +1,18 @@
+from sqlalchemy import delete, update
+
+from app.core.replicas import _bulk_user_ids
+from app.models.user import User
+
+
+def test_bulk_user_ids_of_statements_keyed_by_id():
+    assert _bulk_user_ids(update(User).where(User.id == 5).values(is_active=False)) == {5}
+    assert _bulk_user_ids(
+        update(User).where(User.id == 7, User.password_hash == "old").values(password_hash="new")
+    ) == {7}
+    assert _bulk_user_ids(delete(User).where(User.id.in_([1, 2]))) == {1, 2}
+
+
+def test_bulk_user_ids_unknown_for_other_statements():
+    assert _bulk_user_ids(update(User).values(is_active=True)) is None
+    assert _bulk_user_ids(update(User).where(User.email == "a@example.com")) is None
+    assert _bulk_user_ids(delete(User).where(User.id > 3)) is None